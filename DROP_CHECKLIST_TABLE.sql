@@ -1,2 +0,0 @@
--- Drop job_checklists table
-DROP TABLE IF EXISTS job_checklists CASCADE;
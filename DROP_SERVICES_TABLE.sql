@@ -1,2 +0,0 @@
--- Drop services table from crew_admin_backend database
-DROP TABLE IF EXISTS services CASCADE;
@@ -0,0 +1,384 @@
+from sqlalchemy import or_, exists, func, text
+from sqlalchemy.orm import Session
+from datetime import datetime, date, timedelta
+from typing import Optional
+from collections import Counter, defaultdict
+from app.database.db import SessionLocal
+from app.models.job import Job
+from app.models.analytics import JobRollupFact, DailyRollup, CrewRollup
+from app.core.lookups import fetch_deposit_payments
+from app.core.reference_data import reference_data
+from app.core.sla import WORK_DONE_STATUSES, compute_deadline
+import os
+import threading
+
+# How often job changes are folded into the rollups
+ANALYTICS_REFRESH_SECONDS = int(os.getenv("ANALYTICS_REFRESH_SECONDS", "60"))
+ANALYTICS_REFRESH_BATCH = 500
+# Postgres advisory lock key, so only one process folds changes in at a time
+ANALYTICS_LOCK_KEY = 7316001
+
+# Statuses at which the deposit has been collected
+DEPOSIT_COLLECTED_STATUSES = ("deposit_paid", "crew_assigned", "crew_arrived", "before_photo", "clearance_in_progress",
+                              "after_photo", "work_completed", "job_verified", "payment_pending", "job_completed")
+
+DAILY_FIELDS = ("jobs_completed", "revenue", "deposits_collected", "remaining_collected", "sla_met", "sla_breached")
+CREW_FIELDS = ("jobs_completed", "rating_sum", "rating_count")
+
+PERIODS = ("day", "week", "month")
+
+
+def build_fact(job: Job, previous: Optional[JobRollupFact], deposit_paid_at) -> dict:
+    """The rollup fact for a job in its current state"""
+    completed = job.status == "job_completed"
+    deposit_collected = job.status in DEPOSIT_COLLECTED_STATUSES
+    changed_at = job.updated_at or job.created_at or datetime.utcnow()
+
+    deposit_day = None
+    if deposit_collected:
+        if deposit_paid_at:
+            deposit_day = deposit_paid_at.date()
+        elif previous and previous.deposit_day:
+            deposit_day = previous.deposit_day
+        else:
+            deposit_day = changed_at.date()
+
+    completed_day = None
+    if completed:
+        completed_day = previous.completed_day if previous and previous.completed_day else changed_at.date()
+
+    work_done_at = None
+    if job.status in WORK_DONE_STATUSES:
+        if job.work_completed_at:
+            work_done_at = job.work_completed_at
+        else:
+            work_done_at = previous.work_done_at if previous and previous.work_done_at else changed_at
+
+    sla_met = None
+    deadline = job.sla_deadline or compute_deadline(job)
+    if completed and work_done_at and deadline:
+        sla_met = work_done_at <= deadline
+
+    return {
+        "status": job.status,
+        "service_type": job.service_type,
+        "crew_id": job.assigned_crew_id,
+        "deposit_day": deposit_day,
+        "completed_day": completed_day,
+        "revenue": (job.quote_amount or 0.0) if completed else 0.0,
+        "deposit_collected": (job.deposit_amount or 0.0) if deposit_collected else 0.0,
+        "remaining_collected": (job.remaining_amount or 0.0) if completed else 0.0,
+        "rating": job.rating,
+        "work_done_at": work_done_at,
+        "sla_met": sla_met,
+        "job_updated_at": job.updated_at,
+    }
+
+
+def add_contribution(daily: dict, crew: dict, fact, sign: int = 1):
+    """Add (or with sign=-1, remove) what a fact contributes to the daily and crew deltas"""
+    get = fact.get if isinstance(fact, dict) else lambda name: getattr(fact, name)
+    service_type = get("service_type") or ""
+
+    if get("deposit_day"):
+        daily[(get("deposit_day"), service_type)]["deposits_collected"] += sign * get("deposit_collected")
+
+    if get("completed_day"):
+        row = daily[(get("completed_day"), service_type)]
+        row["jobs_completed"] += sign
+        row["revenue"] += sign * get("revenue")
+        row["remaining_collected"] += sign * get("remaining_collected")
+        if get("sla_met") is not None:
+            row["sla_met" if get("sla_met") else "sla_breached"] += sign
+
+        if get("crew_id"):
+            crew_row = crew[get("crew_id")]
+            crew_row["jobs_completed"] += sign
+            if get("rating") is not None:
+                crew_row["rating_sum"] += sign * get("rating")
+                crew_row["rating_count"] += sign
+
+
+def _apply(db: Session, model, key_columns, key, deltas: Counter):
+    """row = row + deltas for one rollup row, inserting the row if it does not exist yet"""
+    deltas = {field: value for field, value in deltas.items() if value}
+    if not deltas:
+        return
+    criteria = [column == value for column, value in zip(key_columns, key)]
+    updated = db.query(model).filter(*criteria).update(
+        {getattr(model, field): getattr(model, field) + value for field, value in deltas.items()},
+        synchronize_session=False
+    )
+    if not updated:
+        db.add(model(**{column.key: value for column, value in zip(key_columns, key)}, **deltas))
+        db.flush()
+
+
+def apply_rollup_deltas(db: Session, daily: dict, crew: dict):
+    for key, deltas in daily.items():
+        _apply(db, DailyRollup, (DailyRollup.day, DailyRollup.service_type), key, deltas)
+    for crew_id, deltas in crew.items():
+        _apply(db, CrewRollup, (CrewRollup.crew_id,), (crew_id,), deltas)
+
+
+def _try_lock(db: Session) -> bool:
+    """Take the refresh lock for this transaction (always granted outside Postgres)"""
+    if db.get_bind().dialect.name != "postgresql":
+        return True
+    return db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": ANALYTICS_LOCK_KEY}).scalar()
+
+
+def refresh_rollups(db: Session) -> int:
+    """
+    Fold jobs changed since the last refresh into the rollups
+
+    Each job's last contribution is kept in job_rollup_facts, so a
+    changed job only swaps its old contribution for the new one: the
+    cost depends on how many jobs changed, not on how many exist.
+    Batches commit one at a time, each under the refresh lock.
+
+    Returns:
+        Number of jobs refreshed
+    """
+    stale = db.query(Job).outerjoin(JobRollupFact, JobRollupFact.job_id == Job.id).filter(or_(
+        JobRollupFact.job_id.is_(None),
+        JobRollupFact.status != Job.status,
+        JobRollupFact.job_updated_at < Job.updated_at,
+        JobRollupFact.rating.is_distinct_from(Job.rating)
+    )).order_by(Job.id)
+
+    total = 0
+    last_id = None
+    while True:
+        if not _try_lock(db):
+            db.rollback()
+            break
+        # Walk by id so a job that cannot be brought up to date is never picked up twice
+        page = stale.filter(Job.id > last_id) if last_id else stale
+        jobs = page.limit(ANALYTICS_REFRESH_BATCH).all()
+        if not jobs:
+            db.rollback()
+            break
+
+        facts = {
+            fact.job_id: fact
+            for fact in db.query(JobRollupFact).filter(JobRollupFact.job_id.in_([job.id for job in jobs])).all()
+        }
+        deposits = fetch_deposit_payments(db, [job.id for job in jobs if job.status in DEPOSIT_COLLECTED_STATUSES])
+
+        daily = defaultdict(Counter)
+        crew = defaultdict(Counter)
+        for job in jobs:
+            previous = facts.get(job.id)
+            values = build_fact(job, previous, deposits.get(job.id))
+            if previous is None:
+                previous = JobRollupFact(job_id=job.id)
+                db.add(previous)
+            else:
+                add_contribution(daily, crew, previous, -1)
+            add_contribution(daily, crew, values)
+            for name, value in values.items():
+                setattr(previous, name, value)
+
+        apply_rollup_deltas(db, daily, crew)
+        db.commit()
+        total += len(jobs)
+        last_id = jobs[-1].id
+
+    if _try_lock(db):
+        orphans = db.query(JobRollupFact).filter(~exists().where(Job.id == JobRollupFact.job_id)).all()
+        if orphans:
+            daily = defaultdict(Counter)
+            crew = defaultdict(Counter)
+            for fact in orphans:
+                add_contribution(daily, crew, fact, -1)
+                db.delete(fact)
+            apply_rollup_deltas(db, daily, crew)
+        db.commit()
+    return total
+
+
+def rebuild_rollups(db: Session):
+    """Recompute every rollup row from job_rollup_facts, correcting any drift"""
+    if not _try_lock(db):
+        db.rollback()
+        return
+    daily = defaultdict(Counter)
+    crew = defaultdict(Counter)
+    for fact in db.query(JobRollupFact).yield_per(1000):
+        add_contribution(daily, crew, fact)
+
+    db.query(DailyRollup).delete(synchronize_session=False)
+    db.query(CrewRollup).delete(synchronize_session=False)
+    for (day, service_type), values in daily.items():
+        db.add(DailyRollup(day=day, service_type=service_type, **{f: values[f] for f in DAILY_FIELDS}))
+    for crew_id, values in crew.items():
+        db.add(CrewRollup(crew_id=crew_id, **{f: values[f] for f in CREW_FIELDS}))
+    db.commit()
+
+
+def period_start(day: date, period: str) -> date:
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    if period == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _rate(part: int, whole: int) -> float:
+    return round(part / whole * 100, 1) if whole else 0.0
+
+
+def _daily_rows(db: Session, date_from: Optional[date], date_to: Optional[date], service_type: Optional[str]):
+    query = db.query(DailyRollup)
+    if date_from:
+        query = query.filter(DailyRollup.day >= date_from)
+    if date_to:
+        query = query.filter(DailyRollup.day <= date_to)
+    if service_type:
+        query = query.filter(DailyRollup.service_type == service_type)
+    return query.all()
+
+
+def revenue_series(db: Session, period: str, date_from: Optional[date] = None, date_to: Optional[date] = None,
+                   service_type: Optional[str] = None) -> list:
+    """Revenue, collections and completed jobs per day / week (starting Monday) / month"""
+    buckets = defaultdict(Counter)
+    for row in _daily_rows(db, date_from, date_to, service_type):
+        bucket = buckets[period_start(row.day, period)]
+        for field in DAILY_FIELDS:
+            bucket[field] += getattr(row, field)
+
+    return [
+        {
+            "period_start": start.isoformat(),
+            "jobs_completed": values["jobs_completed"],
+            "revenue": round(values["revenue"], 2),
+            "deposits_collected": round(values["deposits_collected"], 2),
+            "remaining_collected": round(values["remaining_collected"], 2),
+        }
+        for start, values in sorted(buckets.items())
+    ]
+
+
+def revenue_by_service_type(db: Session, date_from: Optional[date] = None, date_to: Optional[date] = None) -> list:
+    query = db.query(
+        DailyRollup.service_type,
+        func.sum(DailyRollup.jobs_completed),
+        func.sum(DailyRollup.revenue),
+        func.sum(DailyRollup.deposits_collected),
+        func.sum(DailyRollup.remaining_collected)
+    )
+    if date_from:
+        query = query.filter(DailyRollup.day >= date_from)
+    if date_to:
+        query = query.filter(DailyRollup.day <= date_to)
+    rows = query.group_by(DailyRollup.service_type).all()
+
+    return sorted((
+        {
+            "service_type": service_type,
+            "service_type_name": reference_data.service_type_name(service_type, service_type),
+            "jobs_completed": int(jobs or 0),
+            "revenue": round(revenue or 0.0, 2),
+            "deposits_collected": round(deposits or 0.0, 2),
+            "remaining_collected": round(remaining or 0.0, 2),
+        }
+        for service_type, jobs, revenue, deposits, remaining in rows
+    ), key=lambda row: row["revenue"], reverse=True)
+
+
+def sla_summary(db: Session, period: Optional[str] = None, date_from: Optional[date] = None,
+                date_to: Optional[date] = None, service_type: Optional[str] = None):
+    """SLA met / breached counts and rates for completed jobs, overall or per period"""
+    buckets = defaultdict(Counter)
+    for row in _daily_rows(db, date_from, date_to, service_type):
+        bucket = buckets[period_start(row.day, period) if period else None]
+        bucket["sla_met"] += row.sla_met
+        bucket["sla_breached"] += row.sla_breached
+
+    def summary(values):
+        measured = values["sla_met"] + values["sla_breached"]
+        return {
+            "sla_met": values["sla_met"],
+            "sla_breached": values["sla_breached"],
+            "met_rate": _rate(values["sla_met"], measured),
+            "breached_rate": _rate(values["sla_breached"], measured),
+        }
+
+    if not period:
+        return summary(buckets[None])
+    return [{"period_start": start.isoformat(), **summary(values)} for start, values in sorted(buckets.items())]
+
+
+def crew_performance(db: Session) -> list:
+    """Completed jobs and average rating per crew member, busiest first"""
+    return [
+        {
+            "crew_id": row.crew_id,
+            "jobs_completed": row.jobs_completed,
+            "rated_jobs": row.rating_count,
+            "average_rating": round(row.rating_sum / row.rating_count, 2) if row.rating_count else None,
+        }
+        for row in db.query(CrewRollup).filter(CrewRollup.jobs_completed > 0)
+        .order_by(CrewRollup.jobs_completed.desc(), CrewRollup.crew_id).all()
+    ]
+
+
+class RollupRefresher:
+    """
+    Background thread running refresh_rollups every ANALYTICS_REFRESH_SECONDS
+
+    The first run after start also rebuilds the rollups from the facts.
+    """
+
+    def __init__(self, interval_seconds: int):
+        self.interval_seconds = interval_seconds
+        self._stopping = threading.Event()
+        self._thread = None
+        self.last_run_at = None
+        self.last_refreshed = 0
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="analytics-rollups", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def run_once(self) -> int:
+        db = SessionLocal()
+        try:
+            self.last_refreshed = refresh_rollups(db)
+            if self.last_run_at is None:
+                # Correct any drift once per process start
+                rebuild_rollups(db)
+            self.last_run_at = datetime.utcnow()
+            return self.last_refreshed
+        except Exception as e:
+            db.rollback()
+            print(f"Analytics rollup refresh failed: {e}")
+            return 0
+        finally:
+            db.close()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self.run_once()
+            self._stopping.wait(self.interval_seconds)
+
+    def stats(self) -> dict:
+        return {
+            "interval_seconds": self.interval_seconds,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "last_refreshed": self.last_refreshed,
+        }
+
+
+# Singleton instance
+rollup_refresher = RollupRefresher(ANALYTICS_REFRESH_SECONDS)
@@ -0,0 +1,245 @@
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from datetime import datetime
+from typing import Optional
+from app.models.crew import Crew
+from app.models.job import Job
+from app.core.job_state import TRANSITIONS, transition_many
+from app.core.crew_recommender import crew_index
+
+# Cost of leaving a job unassigned, and of a pair outside the job's candidates;
+# both far above any real score (km-equivalents)
+UNASSIGNED_COST = 1e6
+EXCLUDED_COST = 1e9
+# Most jobs solved in one automatic batch
+MAX_AUTO_ASSIGN_JOBS = 200
+# Crew offered to each job in an automatic batch (the batch size, up to this many)
+MAX_OFFERS_PER_JOB = 25
+
+
+def min_cost_assignment(costs: list) -> list:
+    """
+    Hungarian algorithm (shortest augmenting paths with potentials), O(n^2 m)
+
+    costs is an n x m matrix with n <= m. Returns the column chosen for
+    each row such that no column is used twice and the total is minimal.
+    """
+    n = len(costs)
+    m = len(costs[0]) if n else 0
+    if n > m:
+        raise ValueError("min_cost_assignment needs at least as many columns as rows")
+    infinity = float("inf")
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    owner = [0] * (m + 1)  # row (1-based) matched to each column, 0 when free
+    way = [0] * (m + 1)
+
+    for row in range(1, n + 1):
+        owner[0] = row
+        column = 0
+        min_slack = [infinity] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[column] = True
+            current_row = owner[column]
+            row_costs = costs[current_row - 1]
+            row_potential = u[current_row]
+            delta = infinity
+            next_column = 0
+            for j in range(1, m + 1):
+                if used[j]:
+                    continue
+                slack = row_costs[j - 1] - row_potential - v[j]
+                if slack < min_slack[j]:
+                    min_slack[j] = slack
+                    way[j] = column
+                if min_slack[j] < delta:
+                    delta = min_slack[j]
+                    next_column = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[owner[j]] += delta
+                    v[j] -= delta
+                else:
+                    min_slack[j] -= delta
+            column = next_column
+            if owner[column] == 0:
+                break
+        while column:
+            previous = way[column]
+            owner[column] = owner[previous]
+            column = previous
+
+    result = [None] * n
+    for j in range(1, m + 1):
+        if owner[j]:
+            result[owner[j] - 1] = j - 1
+    return result
+
+
+def solve_assignments(db: Session, jobs: list) -> dict:
+    """
+    Best crew per job over the whole batch: {job id: (crew candidate, score) or None}
+
+    Each job is offered its best available crew by the recommender's
+    score, as many as there are jobs up to MAX_OFFERS_PER_JOB (a job can
+    only need its k-th best crew if the k - 1 better ones went to other
+    jobs, so for batches up to that size the result is optimal). Each
+    crew member gets at most one job; jobs left without crew map to None.
+    """
+    if not jobs:
+        return {}
+    offered = min(len(jobs), MAX_OFFERS_PER_JOB)
+    offers = {job.id: crew_index.rank(job, offered, db, statuses=("available",)) for job in jobs}
+
+    columns = {}
+    for ranked in offers.values():
+        for _, _, candidate in ranked:
+            columns.setdefault(candidate.id, (len(columns), candidate))
+
+    width = len(columns) + len(jobs)
+    costs = []
+    for row, job in enumerate(jobs):
+        costs_row = [EXCLUDED_COST] * width
+        for value, _, candidate in offers[job.id]:
+            costs_row[columns[candidate.id][0]] = value
+        # One "nobody" column per job, so every row can be matched
+        costs_row[len(columns) + row] = UNASSIGNED_COST
+        costs.append(costs_row)
+
+    by_index = {index: candidate for index, candidate in columns.values()}
+    result = {}
+    for row, column in enumerate(min_cost_assignment(costs)):
+        candidate = by_index.get(column)
+        result[jobs[row].id] = (candidate, costs[row][column]) if candidate else None
+    return result
+
+
+def claim_crew(db: Session, crew: list) -> set:
+    """
+    Mark available crew as assigned, only where they are still available
+
+    One UPDATE ... WHERE id IN (...) AND status = 'available' RETURNING id,
+    so two requests cannot both take the same crew member: the second
+    finds the row already assigned (or waits for the first to commit and
+    then does). The claimed crew's loaded state is updated to match.
+
+    Returns:
+        Ids of the crew that were claimed
+    """
+    if not crew:
+        return set()
+    now = datetime.utcnow()
+    claimed = set(db.execute(
+        update(Crew)
+        .where(Crew.id.in_([member.id for member in crew]), Crew.status == "available")
+        .values(status="assigned", updated_at=now)
+        .returning(Crew.id)
+        .execution_options(synchronize_session=False)
+    ).scalars())
+    for member in crew:
+        if member.id in claimed:
+            set_committed_value(member, "status", "assigned")
+            set_committed_value(member, "updated_at", now)
+    return claimed
+
+
+def release_crew(db: Session, crew_ids) -> None:
+    """Undo claim_crew for crew whose job could not be assigned after all (same transaction)"""
+    if crew_ids:
+        db.execute(
+            update(Crew).where(Crew.id.in_(list(crew_ids))).values(status="available")
+            .execution_options(synchronize_session=False)
+        )
+
+
+def apply_assignments(db: Session, pairs: list, admin_id: str, dry_run: bool = False) -> list:
+    """
+    Validate (job id, crew id) pairs and assign the valid ones in the caller's transaction
+
+    Jobs and crew are loaded with one query each; the jobs go through
+    transition_many, so dashboard rows and events are written in bulk.
+    Each crew member can take one job per batch and must be "available";
+    crew are claimed with claim_crew, so crew taken by another request
+    meanwhile are rejected, as are jobs changed by another request.
+
+    Returns:
+        One {"job_id", "crew_id", "status": "assigned" | "valid" (dry run) | "rejected", "detail"}
+        per pair, in order
+    """
+    job_ids = {job_id for job_id, _ in pairs}
+    crew_ids = {crew_id for _, crew_id in pairs}
+    jobs = {job.id: job for job in db.query(Job).filter(Job.id.in_(job_ids)).all()} if job_ids else {}
+    crew = {
+        member.id: member
+        for member in db.query(Crew).filter(Crew.id.in_(crew_ids), Crew.is_approved == True).all()
+    } if crew_ids else {}
+
+    allowed, _ = TRANSITIONS["assign_crew"]
+    results = []
+    accepted = []
+    seen_jobs = set()
+    seen_crew = set()
+    for job_id, crew_id in pairs:
+        job = jobs.get(job_id)
+        detail = None
+        if job is None:
+            detail = "Job not found"
+        elif job_id in seen_jobs:
+            detail = "Job appears more than once in the batch"
+        elif job.status not in allowed:
+            detail = f"Deposit must be paid before assigning crew (job is {job.status})"
+        elif crew_id not in crew:
+            detail = "Approved crew not found"
+        elif crew_id in seen_crew:
+            detail = "Crew appears more than once in the batch"
+        elif crew[crew_id].status != "available":
+            detail = "Crew is no longer available"
+        seen_jobs.add(job_id)
+        if detail is None:
+            seen_crew.add(crew_id)
+        results.append({
+            "job_id": job_id, "crew_id": crew_id,
+            "status": "rejected" if detail else ("valid" if dry_run else "assigned"), "detail": detail or ""
+        })
+        if detail is None:
+            accepted.append((job, crew[crew_id]))
+
+    if dry_run or not accepted:
+        return results
+
+    claimed = claim_crew(db, [member for _, member in accepted])
+    rejected = {job.id: "Crew is no longer available" for job, member in accepted if member.id not in claimed}
+    accepted = [(job, member) for job, member in accepted if member.id in claimed]
+
+    # The crew is only written to jobs whose compare-and-set succeeds
+    assigned = {job.id for job in transition_many(
+        db, [job for job, _ in accepted], "assign_crew",
+        changes={job.id: {"assigned_crew_id": member.id, "assigned_by": admin_id} for job, member in accepted}
+    )}
+    released = []
+    for job, member in accepted:
+        if job.id not in assigned:
+            # Changed by another request since it was loaded: free the crew again
+            released.append(member.id)
+            rejected[job.id] = "Job was changed by another request"
+            continue
+        if job.latitude is not None and job.longitude is not None:
+            member.last_latitude, member.last_longitude = job.latitude, job.longitude
+    release_crew(db, released)
+    for member_id in released:
+        db.expire(crew[member_id])
+
+    for result in results:
+        if result["status"] == "assigned" and result["job_id"] in rejected:
+            result["status"], result["detail"] = "rejected", rejected[result["job_id"]]
+    return results
+
+
+def unassigned_jobs(db: Session, job_ids: Optional[list] = None) -> list:
+    """deposit_paid jobs with no crew (optionally only those in job_ids), oldest first"""
+    query = db.query(Job).filter(Job.status == "deposit_paid", Job.assigned_crew_id.is_(None))
+    if job_ids:
+        query = query.filter(Job.id.in_(job_ids))
+    return query.order_by(Job.created_at, Job.id).limit(MAX_AUTO_ASSIGN_JOBS).all()
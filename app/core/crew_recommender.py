@@ -0,0 +1,296 @@
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Optional
+from app.database.db import SessionLocal
+from app.models.crew import Crew
+from app.models.job import Job
+from app.models.analytics import CrewRollup
+from app.core.sla import sla_state
+import heapq
+import math
+import os
+import threading
+import time
+
+# Rebuild the index at least this often, to pick up changes made by other processes
+CREW_INDEX_TTL_SECONDS = int(os.getenv("CREW_INDEX_TTL_SECONDS", "60"))
+# After a failed rebuild, keep serving the old index this long before trying again
+CREW_INDEX_RETRY_SECONDS = 30
+# Grid cell size in degrees (0.05 degrees of latitude is about 5.5 km)
+CREW_INDEX_CELL_DEGREES = 0.05
+
+# Crew who can be recommended; "unavailable" crew never are
+CANDIDATE_STATUSES = ("available", "assigned")
+# Job statuses that count towards a crew member's current load
+ACTIVE_JOB_STATUSES = ("crew_assigned", "crew_arrived", "before_photo", "clearance_in_progress", "after_photo")
+
+# Scoring, in km-equivalents (lower is better): each active job costs as much as
+# RECOMMEND_LOAD_KM of extra travel, each rating point above 3 saves RECOMMEND_RATING_KM
+RECOMMEND_LOAD_KM = float(os.getenv("RECOMMEND_LOAD_KM", "15"))
+RECOMMEND_RATING_KM = float(os.getenv("RECOMMEND_RATING_KM", "5"))
+NEUTRAL_RATING = 3.0
+# Distance counts for more the closer the job is to its SLA deadline
+URGENCY_DISTANCE_WEIGHT = {"on_track": 1.0, "at_risk": 2.0, "breached": 3.0}
+# Distance assumed for crew with no known position
+UNKNOWN_DISTANCE_KM = 100.0
+# Nearest crew scored per recommendation, as a multiple of the number asked for
+CANDIDATE_POOL_FACTOR = 4
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle (haversine) distance"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class CrewCandidate:
+    __slots__ = ("id", "full_name", "status", "latitude", "longitude", "location_source", "active_jobs", "rating")
+
+    def __init__(self, id, full_name, status, latitude=None, longitude=None, location_source=None,
+                 active_jobs=0, rating=None):
+        self.id = id
+        self.full_name = full_name
+        self.status = status
+        self.latitude = latitude
+        self.longitude = longitude
+        self.location_source = location_source
+        self.active_jobs = active_jobs
+        self.rating = rating
+
+
+class CrewGrid:
+    """
+    Fixed-size lat/lon grid over crew positions
+
+    nearest() searches rings of cells outwards from the job's cell and
+    stops once no unsearched cell can hold anything closer than the k-th
+    crew found, so it reads a handful of cells however many crew there are.
+    """
+
+    def __init__(self, candidates, cell_degrees: float = CREW_INDEX_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.cells = {}
+        self.located = 0
+        for candidate in candidates:
+            if candidate.latitude is None or candidate.longitude is None:
+                continue
+            self.cells.setdefault(self._cell(candidate.latitude, candidate.longitude), []).append(candidate)
+            self.located += 1
+
+    def _cell(self, latitude: float, longitude: float):
+        return int(math.floor(latitude / self.cell_degrees)), int(math.floor(longitude / self.cell_degrees))
+
+    def _ring(self, row: int, col: int, radius: int):
+        if radius == 0:
+            yield row, col
+            return
+        for dc in range(-radius, radius + 1):
+            yield row - radius, col + dc
+            yield row + radius, col + dc
+        for dr in range(-radius + 1, radius):
+            yield row + dr, col - radius
+            yield row + dr, col + radius
+
+    def nearest(self, latitude: float, longitude: float, k: int, accept=None) -> list:
+        """Up to k (distance km, candidate) pairs, nearest first, of the candidates accept() allows"""
+        if not self.located or k <= 0:
+            return []
+        row, col = self._cell(latitude, longitude)
+        # A cell `radius` rings away is at least (radius - 1) cells of latitude away; longitude
+        # cells are narrower by cos(latitude), so use that as the (smaller) guaranteed gap
+        cell_km = self.cell_degrees * KM_PER_DEGREE * max(math.cos(math.radians(min(abs(latitude), 89.0))), 0.01)
+
+        found = []  # max-heap of (-distance, id, candidate) holding the k nearest so far
+        seen = 0
+        radius = 0
+        while seen < self.located:
+            if len(found) == k and (radius - 1) * cell_km > -found[0][0]:
+                break
+            if 8 * radius > len(self.cells):
+                # Sparse grid: the next ring has more cells than hold crew, so scan the occupied ones instead
+                return self._scan(latitude, longitude, k, accept)
+            for cell in self._ring(row, col, radius):
+                for candidate in self.cells.get(cell, ()):
+                    seen += 1
+                    if accept and not accept(candidate):
+                        continue
+                    distance = distance_km(latitude, longitude, candidate.latitude, candidate.longitude)
+                    entry = (-distance, candidate.id, candidate)
+                    if len(found) < k:
+                        heapq.heappush(found, entry)
+                    elif distance < -found[0][0]:
+                        heapq.heapreplace(found, entry)
+            radius += 1
+        return sorted(((-d, candidate) for d, _, candidate in found), key=lambda pair: pair[0])
+
+    def _scan(self, latitude: float, longitude: float, k: int, accept=None) -> list:
+        pairs = (
+            (distance_km(latitude, longitude, candidate.latitude, candidate.longitude), candidate)
+            for cell in self.cells.values() for candidate in cell
+            if not accept or accept(candidate)
+        )
+        return heapq.nsmallest(k, pairs, key=lambda pair: (pair[0], pair[1].id))
+
+
+def load_candidates(db: Session) -> list:
+    """
+    Every recommendable crew member with position, load and rating (three queries)
+
+    The position is where the crew member was last assigned a job,
+    falling back to their home location.
+    """
+    crew = db.query(
+        Crew.id, Crew.full_name, Crew.status,
+        Crew.last_latitude, Crew.last_longitude, Crew.home_latitude, Crew.home_longitude
+    ).filter(Crew.is_approved == True, Crew.status.in_(CANDIDATE_STATUSES)).all()
+
+    loads = dict(db.query(Job.assigned_crew_id, func.count(Job.id)).filter(
+        Job.assigned_crew_id.isnot(None), Job.status.in_(ACTIVE_JOB_STATUSES)
+    ).group_by(Job.assigned_crew_id).all())
+
+    ratings = {
+        row.crew_id: row.rating_sum / row.rating_count
+        for row in db.query(CrewRollup).filter(CrewRollup.rating_count > 0)
+    }
+
+    candidates = []
+    for row in crew:
+        latitude = longitude = source = None
+        if row.last_latitude is not None and row.last_longitude is not None:
+            latitude, longitude, source = row.last_latitude, row.last_longitude, "last_job"
+        elif row.home_latitude is not None and row.home_longitude is not None:
+            latitude, longitude, source = row.home_latitude, row.home_longitude, "home"
+        candidates.append(CrewCandidate(
+            row.id, row.full_name, row.status, latitude, longitude, source,
+            loads.get(row.id, 0), ratings.get(row.id)
+        ))
+    return candidates
+
+
+def score(distance: Optional[float], candidate: CrewCandidate, urgency: str) -> float:
+    """Lower is better"""
+    travel = (UNKNOWN_DISTANCE_KM if distance is None else distance) * URGENCY_DISTANCE_WEIGHT.get(urgency, 1.0)
+    rating = candidate.rating if candidate.rating is not None else NEUTRAL_RATING
+    return travel + RECOMMEND_LOAD_KM * candidate.active_jobs - RECOMMEND_RATING_KM * (rating - NEUTRAL_RATING)
+
+
+class CrewIndex:
+    """
+    In-process spatial index of recommendable crew
+
+    Rebuilt from the database on first use, after invalidate() (called
+    whenever a crew member's status or location changes here) and once
+    CREW_INDEX_TTL_SECONDS have passed, which bounds staleness for
+    changes made by other processes.
+    """
+
+    def __init__(self, ttl_seconds: int = CREW_INDEX_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._candidates = []
+        self._grid = CrewGrid([])
+        self._expires_at = 0.0
+        self.builds = 0
+        self.last_build_ms = None
+        self.last_built_at = None
+
+    def build(self, candidates: list):
+        """Replace the index contents (used by refresh and by benchmarks)"""
+        grid = CrewGrid(candidates)
+        with self._lock:
+            self._candidates, self._grid = candidates, grid
+            self._expires_at = time.monotonic() + self.ttl_seconds
+
+    def refresh(self, db: Optional[Session] = None):
+        started = time.perf_counter()
+        own_session = db is None
+        db = db or SessionLocal()
+        try:
+            candidates = load_candidates(db)
+        finally:
+            if own_session:
+                db.close()
+        self.build(candidates)
+        self.builds += 1
+        self.last_build_ms = round((time.perf_counter() - started) * 1000, 2)
+        self.last_built_at = datetime.utcnow()
+
+    def invalidate(self):
+        with self._lock:
+            self._expires_at = 0.0
+
+    def _current(self, db: Optional[Session]):
+        if time.monotonic() >= self._expires_at:
+            try:
+                self.refresh(db)
+            except Exception as e:
+                print(f"Error rebuilding crew index: {e}")
+                with self._lock:
+                    self._expires_at = time.monotonic() + CREW_INDEX_RETRY_SECONDS
+        with self._lock:
+            return self._candidates, self._grid
+
+    def rank(self, job: Job, limit: int, db: Optional[Session] = None, statuses=CANDIDATE_STATUSES) -> list:
+        """
+        The `limit` best (score, distance km, candidate) for the job, best first
+
+        Scores the CANDIDATE_POOL_FACTOR * limit crew nearest the job
+        (plus crew with no known position when too few are located). Jobs
+        without coordinates are ranked on load and rating alone.
+        """
+        candidates, grid = self._current(db)
+        urgency = sla_state(job) or "on_track"
+        pool = max(limit * CANDIDATE_POOL_FACTOR, limit)
+        accept = None if set(statuses) >= set(CANDIDATE_STATUSES) else (lambda c: c.status in statuses)
+
+        if job.latitude is not None and job.longitude is not None:
+            nearby = grid.nearest(job.latitude, job.longitude, pool, accept)
+            if len(nearby) < pool:
+                nearby += [
+                    (None, c) for c in candidates
+                    if (c.latitude is None or c.longitude is None) and (not accept or accept(c))
+                ]
+        else:
+            nearby = [(None, c) for c in candidates if not accept or accept(c)]
+
+        scored = ((score(distance, candidate, urgency), distance, candidate) for distance, candidate in nearby)
+        return heapq.nsmallest(limit, scored, key=lambda entry: (entry[0], entry[2].id))
+
+    def recommend(self, job: Job, limit: int = 5, db: Optional[Session] = None) -> list:
+        """The `limit` best crew for the job (see rank), as response rows"""
+        urgency = sla_state(job) or "on_track"
+        return [
+            {
+                "crew_id": candidate.id,
+                "full_name": candidate.full_name,
+                "status": candidate.status,
+                "distance_km": round(distance, 2) if distance is not None else None,
+                "location_source": candidate.location_source,
+                "active_jobs": candidate.active_jobs,
+                "average_rating": round(candidate.rating, 2) if candidate.rating is not None else None,
+                "sla_state": urgency,
+                "score": round(value, 2),
+            }
+            for value, distance, candidate in self.rank(job, limit, db)
+        ]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "crew": len(self._candidates),
+                "located": self._grid.located,
+                "cells": len(self._grid.cells),
+                "builds": self.builds,
+                "last_build_ms": self.last_build_ms,
+                "last_built_at": self.last_built_at.isoformat() if self.last_built_at else None,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+
+# Singleton instance
+crew_index = CrewIndex()
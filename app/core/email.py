@@ -1,6 +1,3 @@
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -13,10 +10,10 @@ if ENV_FILE.exists():
 else:
     load_dotenv(override=True)
 
+from app.core.mail_queue import mail_queue
+
 def send_admin_notification(crew_email: str, crew_name: str):
     admin_email = os.getenv("ADMIN_EMAIL", "admin@example.com")
-    smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
-    smtp_port = int(os.getenv("SMTP_PORT", "587"))
     smtp_user = os.getenv("SMTP_USER", "")
     smtp_password = os.getenv("SMTP_PASSWORD", "")
     
@@ -34,25 +31,9 @@ def send_admin_notification(crew_email: str, crew_name: str):
     Please log in to the admin panel to approve or reject this registration.
     """
     
-    msg = MIMEMultipart()
-    msg['From'] = smtp_user
-    msg['To'] = admin_email
-    msg['Subject'] = subject
-    msg.attach(MIMEText(body, 'plain'))
-    
-    try:
-        server = smtplib.SMTP(smtp_server, smtp_port, timeout=10)
-        server.starttls()
-        server.login(smtp_user, smtp_password)
-        server.send_message(msg)
-        server.quit()
-        print(f"Admin notification sent for {crew_email}")
-    except Exception as e:
-        print(f"Failed to send email: {e}")
+    mail_queue.enqueue(admin_email, subject, body, "Admin notification")
 
 def send_approval_email(crew_email: str, crew_name: str):
-    smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
-    smtp_port = int(os.getenv("SMTP_PORT", "587"))
     smtp_user = os.getenv("SMTP_USER", "")
     smtp_password = os.getenv("SMTP_PASSWORD", "")
     
@@ -72,21 +53,7 @@ def send_approval_email(crew_email: str, crew_name: str):
     Emergency Property Clearance Team
     """
     
-    msg = MIMEMultipart()
-    msg['From'] = smtp_user
-    msg['To'] = crew_email
-    msg['Subject'] = subject
-    msg.attach(MIMEText(body, 'plain'))
-    
-    try:
-        server = smtplib.SMTP(smtp_server, smtp_port, timeout=10)
-        server.starttls()
-        server.login(smtp_user, smtp_password)
-        server.send_message(msg)
-        server.quit()
-        print(f"Approval email sent to {crew_email}")
-    except Exception as e:
-        print(f"Failed to send email: {e}")
+    mail_queue.enqueue(crew_email, subject, body, "Approval email")
 
 def send_otp_email(email: str, otp: str):
     smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
@@ -112,26 +79,9 @@ def send_otp_email(email: str, otp: str):
     Emergency Property Clearance Team
     """
     
-    msg = MIMEMultipart()
-    msg['From'] = smtp_user
-    msg['To'] = email
-    msg['Subject'] = subject
-    msg.attach(MIMEText(body, 'plain'))
-    
-    try:
-        print(f"Attempting to send OTP email to {email}")
-        server = smtplib.SMTP(smtp_server, smtp_port, timeout=10)
-        server.starttls()
-        server.login(smtp_user, smtp_password)
-        server.send_message(msg)
-        server.quit()
-        print(f"OTP email sent successfully to {email}")
-    except Exception as e:
-        print(f"Failed to send OTP email: {e}")
+    mail_queue.enqueue(email, subject, body, "OTP email")
 
 def send_job_otp_email(client_email: str, client_name: str, otp: str, job_id: str):
-    smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
-    smtp_port = int(os.getenv("SMTP_PORT", "587"))
     smtp_user = os.getenv("SMTP_USER", "")
     smtp_password = os.getenv("SMTP_PASSWORD", "")
     
@@ -157,25 +107,9 @@ def send_job_otp_email(client_email: str, client_name: str, otp: str, job_id: st
     Emergency Property Clearance Team
     """
     
-    msg = MIMEMultipart()
-    msg['From'] = smtp_user
-    msg['To'] = client_email
-    msg['Subject'] = subject
-    msg.attach(MIMEText(body, 'plain'))
-    
-    try:
-        server = smtplib.SMTP(smtp_server, smtp_port, timeout=10)
-        server.starttls()
-        server.login(smtp_user, smtp_password)
-        server.send_message(msg)
-        server.quit()
-        print(f"Job OTP email sent to {client_email}")
-    except Exception as e:
-        print(f"Failed to send job OTP email: {e}")
+    mail_queue.enqueue(client_email, subject, body, "Job OTP email")
 
 def send_job_assignment_email(crew_email: str, crew_name: str, job_id: str, property_address: str):
-    smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
-    smtp_port = int(os.getenv("SMTP_PORT", "587"))
     smtp_user = os.getenv("SMTP_USER", "")
     smtp_password = os.getenv("SMTP_PASSWORD", "")
     
@@ -198,25 +132,9 @@ def send_job_assignment_email(crew_email: str, crew_name: str, job_id: str, prop
     Emergency Property Clearance Team
     """
     
-    msg = MIMEMultipart()
-    msg['From'] = smtp_user
-    msg['To'] = crew_email
-    msg['Subject'] = subject
-    msg.attach(MIMEText(body, 'plain'))
-    
-    try:
-        server = smtplib.SMTP(smtp_server, smtp_port, timeout=10)
-        server.starttls()
-        server.login(smtp_user, smtp_password)
-        server.send_message(msg)
-        server.quit()
-        print(f"Job assignment email sent to {crew_email}")
-    except Exception as e:
-        print(f"Failed to send job assignment email: {e}")
+    mail_queue.enqueue(crew_email, subject, body, "Job assignment email")
 
 def send_payment_request_email(client_email: str, job_id: str, final_price: float, deposit_paid: float, remaining_amount: float):
-    smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
-    smtp_port = int(os.getenv("SMTP_PORT", "587"))
     smtp_user = os.getenv("SMTP_USER", "")
     smtp_password = os.getenv("SMTP_PASSWORD", "")
     
@@ -241,18 +159,31 @@ def send_payment_request_email(client_email: str, job_id: str, final_price: floa
     Emergency Property Clearance Team
     """
     
-    msg = MIMEMultipart()
-    msg['From'] = smtp_user
-    msg['To'] = client_email
-    msg['Subject'] = subject
-    msg.attach(MIMEText(body, 'plain'))
-    
-    try:
-        server = smtplib.SMTP(smtp_server, smtp_port, timeout=10)
-        server.starttls()
-        server.login(smtp_user, smtp_password)
-        server.send_message(msg)
-        server.quit()
-        print(f"Payment request email sent to {client_email}")
-    except Exception as e:
-        print(f"Failed to send payment request email: {e}")
+    mail_queue.enqueue(client_email, subject, body, "Payment request email")
+
+def send_sla_escalation_email(escalations: list):
+    """One digest to the admin listing jobs that are at risk of or have breached their SLA"""
+    admin_email = os.getenv("ADMIN_EMAIL", "admin@example.com")
+    smtp_user = os.getenv("SMTP_USER", "")
+    smtp_password = os.getenv("SMTP_PASSWORD", "")
+    
+    if not smtp_user or not smtp_password:
+        print("Email not configured. Skipping SLA escalation email.")
+        return
+    
+    breached = sum(1 for escalation in escalations if escalation["level"] == "breached")
+    subject = f"SLA Alert - {breached} breached, {len(escalations) - breached} at risk"
+    lines = "\n".join(
+        f"    [{escalation['level'].replace('_', ' ').upper()}] Job {escalation['job_id']} - "
+        f"{escalation['property_address']} - due {escalation['sla_deadline']:%d/%m/%Y %H:%M} UTC"
+        for escalation in escalations
+    )
+    body = f"""
+    The following jobs need attention:
+    
+{lines}
+    
+    Please log in to the admin panel to review them.
+    """
+    
+    mail_queue.enqueue(admin_email, subject, body, "SLA escalation email")
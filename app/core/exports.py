@@ -0,0 +1,82 @@
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from datetime import datetime
+from itertools import islice
+from app.database.db import SessionLocal
+import csv
+import io
+import json
+import os
+
+# Rows fetched from the server-side cursor (and written to the response) at a time
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def batched(rows, size: int = EXPORT_BATCH_SIZE):
+    """Lists of up to `size` rows from an iterator, without reading ahead"""
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _encode(fmt: str, columns, batch, header: bool) -> str:
+    buffer = io.StringIO()
+    if fmt == "csv":
+        writer = csv.writer(buffer)
+        if header:
+            writer.writerow(columns)
+        for row in batch:
+            writer.writerow(["" if row.get(column) is None else _value(row.get(column)) for column in columns])
+    else:
+        for row in batch:
+            buffer.write(json.dumps({column: _value(row.get(column)) for column in columns}, default=str))
+            buffer.write("\n")
+    return buffer.getvalue()
+
+
+def stream_export(fmt: str, columns, rows_factory, session_factory=SessionLocal):
+    """
+    Encoded chunks of an export, one chunk per batch of rows
+
+    rows_factory(db) must yield row dicts from a streaming query
+    (yield_per / stream_results), so only one batch is in memory at a
+    time. The generator opens its own session: the request's session is
+    already closed by the time a streaming body is sent.
+    """
+    db: Session = session_factory()
+    try:
+        header = True
+        for batch in batched(rows_factory(db)):
+            yield _encode(fmt, columns, batch, header)
+            header = False
+        if header and fmt == "csv":
+            yield _encode(fmt, columns, [], True)
+    finally:
+        db.rollback()
+        db.close()
+
+
+def export_response(name: str, fmt: str, columns, rows_factory, session_factory=SessionLocal) -> StreamingResponse:
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    filename = f"{name}-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt}"
+    return StreamingResponse(
+        stream_export(fmt, columns, rows_factory, session_factory),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -3,8 +3,14 @@ from reportlab.pdfgen import canvas
 from io import BytesIO
 from datetime import datetime
 
-def generate_invoice_pdf(job, invoice_number, db):
-    """Generate invoice PDF and return as bytes"""
+def render_invoice_pdf(data: dict) -> bytes:
+    """
+    Render an invoice PDF from plain data and return it as bytes
+
+    Takes no ORM objects or sessions so it can run in a worker process.
+    Expected keys: invoice_number, job_id, date, client (dict or None),
+    property_address, preferred_date, preferred_time, amount.
+    """
     buffer = BytesIO()
     c = canvas.Canvas(buffer, pagesize=letter)
     width, height = letter
@@ -15,41 +21,32 @@ def generate_invoice_pdf(job, invoice_number, db):
     
     # Invoice details
     c.setFont("Helvetica", 12)
-    c.drawString(50, height - 100, f"Invoice Number: {invoice_number}")
-    c.drawString(50, height - 120, f"Job ID: {job.id}")
-    c.drawString(50, height - 140, f"Date: {datetime.utcnow().strftime('%d/%m/%Y')}")
+    c.drawString(50, height - 100, f"Invoice Number: {data['invoice_number']}")
+    c.drawString(50, height - 120, f"Job ID: {data['job_id']}")
+    c.drawString(50, height - 140, f"Date: {data['date']}")
     
     # Client details
-    if job.client_id:
-        from sqlalchemy import text
-        try:
-            client_result = db.execute(
-                text("SELECT full_name, company_name, email, phone_number FROM clients WHERE id = :id"),
-                {"id": job.client_id}
-            ).fetchone()
-            if client_result:
-                c.setFont("Helvetica-Bold", 12)
-                c.drawString(50, height - 180, "Bill To:")
-                c.setFont("Helvetica", 11)
-                c.drawString(50, height - 200, f"{client_result[0]}")
-                c.drawString(50, height - 215, f"{client_result[1]}")
-                c.drawString(50, height - 230, f"{client_result[2]}")
-                c.drawString(50, height - 245, f"{client_result[3]}")
-        except:
-            pass
+    client = data.get("client")
+    if client:
+        c.setFont("Helvetica-Bold", 12)
+        c.drawString(50, height - 180, "Bill To:")
+        c.setFont("Helvetica", 11)
+        c.drawString(50, height - 200, f"{client.get('full_name')}")
+        c.drawString(50, height - 215, f"{client.get('company_name')}")
+        c.drawString(50, height - 230, f"{client.get('email')}")
+        c.drawString(50, height - 245, f"{client.get('phone_number')}")
     
     # Job details
     c.setFont("Helvetica-Bold", 12)
     c.drawString(50, height - 285, "Job Details:")
     c.setFont("Helvetica", 11)
-    c.drawString(50, height - 305, f"Property Address: {job.property_address}")
-    c.drawString(50, height - 320, f"Scheduled Date: {job.preferred_date if job.preferred_date else 'N/A'}")
-    c.drawString(50, height - 335, f"Scheduled Time: {job.preferred_time if job.preferred_time else 'N/A'}")
+    c.drawString(50, height - 305, f"Property Address: {data['property_address']}")
+    c.drawString(50, height - 320, f"Scheduled Date: {data['preferred_date'] if data['preferred_date'] else 'N/A'}")
+    c.drawString(50, height - 335, f"Scheduled Time: {data['preferred_time'] if data['preferred_time'] else 'N/A'}")
     
     # Amount
     c.setFont("Helvetica-Bold", 16)
-    amount = job.quote_amount if job.quote_amount else 0.0
-    c.drawString(50, height - 385, f"Total Amount: £{float(amount):.2f}")
+    c.drawString(50, height - 385, f"Total Amount: £{float(data['amount']):.2f}")
     
     # Footer
     c.setFont("Helvetica", 10)
@@ -59,3 +56,40 @@ def generate_invoice_pdf(job, invoice_number, db):
     c.save()
     buffer.seek(0)
     return buffer.getvalue()
+
+def invoice_client(job, db):
+    """Client details for the "Bill To" block, or None"""
+    if not job.client_id:
+        return None
+    from sqlalchemy import text
+    try:
+        client_result = db.execute(
+            text("SELECT full_name, company_name, email, phone_number FROM clients WHERE id = :id"),
+            {"id": job.client_id}
+        ).fetchone()
+    except:
+        return None
+    if not client_result:
+        return None
+    return {
+        "full_name": client_result[0],
+        "company_name": client_result[1],
+        "email": client_result[2],
+        "phone_number": client_result[3]
+    }
+
+def invoice_data(job, invoice_number, client, date=None) -> dict:
+    return {
+        "invoice_number": invoice_number,
+        "job_id": job.id,
+        "date": date or datetime.utcnow().strftime('%d/%m/%Y'),
+        "client": client,
+        "property_address": job.property_address,
+        "preferred_date": job.preferred_date,
+        "preferred_time": job.preferred_time,
+        "amount": float(job.quote_amount) if job.quote_amount else 0.0
+    }
+
+def generate_invoice_pdf(job, invoice_number, db):
+    """Generate invoice PDF and return as bytes"""
+    return render_invoice_pdf(invoice_data(job, invoice_number, invoice_client(job, db)))
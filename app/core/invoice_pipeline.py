@@ -0,0 +1,296 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.database.db import SessionLocal
+from app.models.invoice import Invoice
+from app.models.job import Job
+from app.core.invoice_generator import render_invoice_pdf, invoice_data
+from app.core.lookups import fetch_clients, client_key
+from app.core.storage import storage
+
+# reportlab rendering is CPU-bound, so it runs in separate processes
+INVOICE_RENDER_WORKERS = int(os.getenv("INVOICE_RENDER_WORKERS", "2"))
+# Background generation jobs (DB, render wait, upload) queued from request handlers
+INVOICE_QUEUE_WORKERS = int(os.getenv("INVOICE_QUEUE_WORKERS", "2"))
+# Rendered PDFs kept in memory per process, keyed by content hash
+INVOICE_CACHE_SIZE = int(os.getenv("INVOICE_CACHE_SIZE", "64"))
+
+# Job statuses an invoice is issued for
+INVOICE_STATUSES = ("payment_pending", "job_completed")
+
+# Jobs loaded and rendered per batch when regenerating a date range
+INVOICE_BATCH_SIZE = 50
+
+# Fields that only label a rendering and are left out of the content hash
+_UNHASHED_FIELDS = ("invoice_number", "date")
+
+
+def content_hash(data: dict) -> str:
+    """sha256 of the invoice content, ignoring the invoice number and issue date"""
+    content = {key: value for key, value in data.items() if key not in _UNHASHED_FIELDS}
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def invoice_number_for(job) -> str:
+    return f"INV-{job.id.replace('-', '')[:12].upper()}"
+
+
+def latest_invoice(db: Session, job_id: str) -> Optional[Invoice]:
+    return db.query(Invoice).filter(Invoice.job_id == job_id).order_by(Invoice.generated_at.desc()).first()
+
+
+class InvoicePipeline:
+    """
+    Invoice generation: render in a process pool, upload, persist
+
+    Each invoice carries a hash of its content. A job whose content is
+    unchanged since the last rendering reuses the stored PDF; only new or
+    changed invoices are rendered. Recently rendered PDFs are also kept in
+    an in-memory LRU so downloads right after generation skip the object
+    store.
+    """
+
+    def __init__(self, render_workers: int, queue_workers: int, cache_size: int):
+        self.render_workers = render_workers
+        self.queue_workers = queue_workers
+        self.cache_size = cache_size
+        self._render_pool = None
+        self._queue = None
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self.rendered = 0
+        self.reused = 0
+        self.failed = 0
+        self.cache_hits = 0
+
+    @property
+    def render_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._render_pool is None:
+                # spawn rather than fork: the server process has live threads and DB connections
+                self._render_pool = ProcessPoolExecutor(
+                    max_workers=self.render_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._render_pool
+
+    @property
+    def queue(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._queue is None:
+                self._queue = ThreadPoolExecutor(max_workers=self.queue_workers, thread_name_prefix="invoice")
+            return self._queue
+
+    def _reset_render_pool(self):
+        with self._lock:
+            pool, self._render_pool = self._render_pool, None
+        if pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, data: dict):
+        try:
+            return self.render_pool.submit(render_invoice_pdf, data)
+        except BrokenProcessPool:
+            self._reset_render_pool()
+            return self.render_pool.submit(render_invoice_pdf, data)
+
+    def _render(self, future, data: dict) -> bytes:
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM killed); render this one inline and start a fresh pool next time
+            self._reset_render_pool()
+            return render_invoice_pdf(data)
+
+    def _cache_get(self, digest: str) -> Optional[bytes]:
+        with self._lock:
+            pdf = self._cache.get(digest)
+            if pdf is not None:
+                self._cache.move_to_end(digest)
+                self.cache_hits += 1
+            return pdf
+
+    def _cache_put(self, digest: str, pdf: bytes):
+        with self._lock:
+            self._cache[digest] = pdf
+            self._cache.move_to_end(digest)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _prepare(self, db: Session, jobs) -> list:
+        """(job, current invoice or None, render data, content hash) for each job"""
+        clients = fetch_clients(db, [job.client_id for job in jobs])
+        invoices = {}
+        if jobs:
+            # Ascending generated_at, so the latest invoice per job wins
+            for invoice in db.query(Invoice).filter(
+                Invoice.job_id.in_([job.id for job in jobs])
+            ).order_by(Invoice.generated_at).all():
+                invoices[invoice.job_id] = invoice
+
+        prepared = []
+        for job in jobs:
+            invoice = invoices.get(job.id)
+            number = invoice.invoice_number if invoice else invoice_number_for(job)
+            data = invoice_data(job, number, clients.get(client_key(job.client_id)))
+            prepared.append((job, invoice, data, content_hash(data)))
+        return prepared
+
+    def _store(self, db: Session, job, invoice: Optional[Invoice], digest: str, pdf: bytes,
+               generated_by: str) -> Invoice:
+        invoice_number = invoice.invoice_number if invoice else invoice_number_for(job)
+        self._cache_put(digest, pdf)
+        pdf_path = storage.upload_invoice_pdf(pdf, invoice_number)
+        if not pdf_path:
+            raise RuntimeError(f"Failed to upload invoice {invoice_number}")
+
+        if invoice is None:
+            invoice = Invoice(job_id=job.id, invoice_number=invoice_number)
+            db.add(invoice)
+        invoice.client_id = job.client_id
+        invoice.amount = job.quote_amount or 0.0
+        invoice.pdf_path = pdf_path
+        invoice.content_hash = digest
+        invoice.status = "generated"
+        invoice.generated_by = generated_by
+        invoice.generated_at = datetime.now(timezone.utc)
+        db.flush()
+        return invoice
+
+    def generate_many(self, db: Session, jobs, generated_by: str, force: bool = False) -> dict:
+        """
+        Generate invoices for many jobs, rendering them in parallel
+
+        Jobs whose stored invoice already matches their content are skipped
+        unless force is set. The caller commits.
+
+        Returns:
+            {"generated": [invoice numbers], "unchanged": n, "failed": {job_id: error}}
+        """
+        result = {"generated": [], "unchanged": 0, "failed": {}}
+        pending = []
+        for job, invoice, data, digest in self._prepare(db, list(jobs)):
+            if not force and invoice and invoice.pdf_path and invoice.content_hash == digest:
+                result["unchanged"] += 1
+                continue
+            pending.append((job, invoice, data, digest, self._submit(data)))
+
+        for job, invoice, data, digest, future in pending:
+            try:
+                pdf = self._render(future, data)
+                invoice = self._store(db, job, invoice, digest, pdf, generated_by)
+            except Exception as e:
+                with self._lock:
+                    self.failed += 1
+                print(f"Failed to generate invoice for job {job.id}: {e}")
+                result["failed"][job.id] = str(e)
+                continue
+            result["generated"].append(invoice.invoice_number)
+
+        with self._lock:
+            self.rendered += len(result["generated"])
+            self.reused += result["unchanged"]
+        return result
+
+    def generate(self, db: Session, job, generated_by: str, force: bool = False) -> Optional[Invoice]:
+        """Generate (or reuse) the invoice for one job; the caller commits"""
+        result = self.generate_many(db, [job], generated_by, force=force)
+        if job.id in result["failed"]:
+            return None
+        return latest_invoice(db, job.id)
+
+    def regenerate_range(self, db: Session, date_from, date_to, generated_by: str, force: bool = False) -> dict:
+        """
+        Regenerate invoices for invoiced jobs last updated within [date_from, date_to]
+
+        Jobs are processed and committed in batches of INVOICE_BATCH_SIZE,
+        each batch rendered in parallel on the process pool.
+        """
+        job_ids = [row[0] for row in db.query(Job.id).filter(
+            Job.status.in_(INVOICE_STATUSES),
+            Job.updated_at >= date_from,
+            Job.updated_at <= date_to
+        ).order_by(Job.updated_at, Job.id).all()]
+
+        summary = {"jobs": len(job_ids), "generated": [], "unchanged": 0, "failed": {}}
+        for start in range(0, len(job_ids), INVOICE_BATCH_SIZE):
+            batch = db.query(Job).filter(Job.id.in_(job_ids[start:start + INVOICE_BATCH_SIZE])).all()
+            result = self.generate_many(db, batch, generated_by, force=force)
+            db.commit()
+            summary["generated"].extend(result["generated"])
+            summary["unchanged"] += result["unchanged"]
+            summary["failed"].update(result["failed"])
+        return summary
+
+    def enqueue(self, job_id: str, generated_by: str = "system"):
+        """Generate the job's invoice in the background, on its own session"""
+        self.queue.submit(self._generate_in_background, job_id, generated_by)
+
+    def _generate_in_background(self, job_id: str, generated_by: str):
+        db = SessionLocal()
+        try:
+            job = db.query(Job).filter(Job.id == job_id).first()
+            if not job:
+                return
+            self.generate(db, job, generated_by)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Background invoice generation failed for job {job_id}: {e}")
+        finally:
+            db.close()
+
+    def pdf_for(self, db: Session, job, generated_by: str):
+        """
+        The job's current invoice PDF without re-rendering when possible
+
+        Returns:
+            (pdf bytes, None) from the in-memory cache or a fresh rendering,
+            (None, stored pdf url) when the stored object is current, or
+            (None, None) if generation failed
+        """
+        ((_, invoice, _, digest),) = self._prepare(db, [job])
+        pdf = self._cache_get(digest)
+        if pdf is not None:
+            return pdf, None
+        if invoice and invoice.pdf_path and invoice.content_hash == digest:
+            with self._lock:
+                self.reused += 1
+            return None, invoice.pdf_path
+
+        invoice = self.generate(db, job, generated_by, force=True)
+        db.commit()
+        pdf = self._cache_get(digest)
+        if pdf is not None:
+            return pdf, None
+        return None, invoice.pdf_path if invoice else None
+
+    def shutdown(self):
+        with self._lock:
+            queue, self._queue = self._queue, None
+        if queue:
+            queue.shutdown(wait=True)
+        self._reset_render_pool()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rendered": self.rendered,
+                "reused": self.reused,
+                "failed": self.failed,
+                "cache_hits": self.cache_hits,
+                "cached_pdfs": len(self._cache),
+                "render_workers": self.render_workers,
+            }
+
+
+# Singleton instance
+invoice_pipeline = InvoicePipeline(INVOICE_RENDER_WORKERS, INVOICE_QUEUE_WORKERS, INVOICE_CACHE_SIZE)
@@ -0,0 +1,181 @@
+import asyncio
+import itertools
+import json
+import os
+import select
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from app.database.db import engine
+
+# "local" fans events out within this process only; "postgres" sends them through
+# LISTEN/NOTIFY so every worker process receives every event
+JOB_EVENTS_BACKEND = os.getenv("JOB_EVENTS_BACKEND", "local")
+JOB_EVENTS_CHANNEL = "job_events"
+# Events buffered per subscriber; a slow client loses the oldest events first
+JOB_EVENTS_QUEUE_SIZE = int(os.getenv("JOB_EVENTS_QUEUE_SIZE", "100"))
+
+
+class Subscription:
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+
+class JobEventBus:
+    """
+    In-process pub/sub for job status changes
+
+    Publishers are request threads; subscribers are streaming responses
+    on the event loop, so events are handed over with
+    call_soon_threadsafe. Events are only published once the
+    transaction that produced them commits.
+    """
+
+    def __init__(self, backend: str, queue_size: int):
+        self.backend = backend
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def emit(self, db: Session, payload: dict):
+        """Queue an event on the session; it is delivered when the session commits"""
+        if self.backend == "postgres":
+            # pg_notify is transactional: listeners only see it if the transaction commits
+            db.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": JOB_EVENTS_CHANNEL, "payload": json.dumps(payload, default=str)}
+            )
+        else:
+            db.info.setdefault("job_events", []).append(payload)
+
+    def publish_local(self, payload: dict):
+        """Fan an event out to every subscriber in this process"""
+        message = {"id": next(self._ids), **payload}
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self.published += 1
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(self._offer, subscription, message)
+            except RuntimeError:
+                # Event loop already closed
+                self.unsubscribe(subscription)
+
+    def _offer(self, subscription: Subscription, message: dict):
+        if subscription.queue.full():
+            subscription.queue.get_nowait()
+            subscription.dropped += 1
+            self.dropped += 1
+        subscription.queue.put_nowait(message)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "subscribers": len(self._subscribers),
+                "published": self.published,
+                "dropped": self.dropped,
+            }
+
+
+class PostgresEventListener:
+    """LISTENs on the job events channel and republishes notifications in-process"""
+
+    def __init__(self, bus: JobEventBus):
+        self.bus = bus
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="job-events-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _connect(self):
+        import psycopg2
+        conn = psycopg2.connect(
+            **engine.url.translate_connect_args(username="user", database="dbname"),
+            **engine.url.query
+        )
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {JOB_EVENTS_CHANNEL}")
+        return conn
+
+    def _run(self):
+        conn = None
+        while not self._stopping.is_set():
+            try:
+                if conn is None:
+                    conn = self._connect()
+                if select.select([conn], [], [], 5) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    self.bus.publish_local(json.loads(notify.payload))
+            except Exception as e:
+                print(f"Job events listener error: {e}")
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+                    conn = None
+                time.sleep(5)
+        if conn is not None:
+            conn.close()
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed_events(session):
+    for payload in session.info.pop("job_events", []):
+        job_events.publish_local(payload)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_events(session):
+    session.info.pop("job_events", None)
+
+
+def job_status_event(job, previous_status: str, event_name: str, status_label: str, action: str) -> dict:
+    return {
+        "type": "job_status",
+        "job_id": job.id,
+        "event": event_name,
+        "previous_status": previous_status,
+        "status": job.status,
+        "status_label": status_label,
+        "action": action,
+        "assigned_crew_id": job.assigned_crew_id,
+        "at": datetime.utcnow().isoformat(),
+    }
+
+
+# Singleton instances
+job_events = JobEventBus(JOB_EVENTS_BACKEND, JOB_EVENTS_QUEUE_SIZE)
+job_events_listener = PostgresEventListener(job_events)
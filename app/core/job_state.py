@@ -0,0 +1,376 @@
+from fastapi import HTTPException
+from sqlalchemy import or_, exists, func, update, tuple_
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from datetime import datetime
+from typing import Optional
+from app.database.db import SessionLocal
+from app.models.job import Job
+from app.models.job_dashboard import JobDashboard, DashboardCounter
+from app.core.lookups import fetch_clients, fetch_crew, client_key
+from app.core.job_events import job_events, job_status_event
+from app.core.sla import ensure_deadline, backfill_deadlines
+from collections import Counter
+import os
+import threading
+
+# How often jobs changed outside this service (client backend) are re-projected
+DASHBOARD_RECONCILE_SECONDS = int(os.getenv("DASHBOARD_RECONCILE_SECONDS", "30"))
+DASHBOARD_RECONCILE_BATCH = 500
+# How often the summary counters are recounted from the projection, to correct any drift
+DASHBOARD_COUNTER_REBUILD_SECONDS = int(os.getenv("DASHBOARD_COUNTER_REBUILD_SECONDS", "3600"))
+
+# Jobs that no longer appear on the active dashboard
+CLOSED_STATUSES = ("job_completed", "cancelled")
+
+# Transitions owned by this service: event -> (allowed current statuses, new status).
+# quote_accepted, deposit_paid and job_completed are set by the client backend.
+TRANSITIONS = {
+    "send_quote": (("job_created",), "quote_sent"),
+    "assign_crew": (("deposit_paid",), "crew_assigned"),
+    "crew_arrive": (("crew_assigned",), "crew_arrived"),
+    "upload_before_photos": (("crew_arrived",), "before_photo"),
+    "upload_after_photos": (("before_photo",), "after_photo"),
+    "complete_work": (("after_photo",), "work_completed"),
+    "approve_verification": (("work_completed",), "job_verified"),
+    "reject_verification": (("work_completed",), "clearance_in_progress"),
+    "send_payment_request": (("job_verified",), "payment_pending"),
+}
+
+# Dashboard (status label, action) per job status
+DASHBOARD_LABELS = {
+    "job_created": ("Needs Quote", "Create Quote"),
+    "quote_sent": ("Quote Sent", "No action needed"),
+    "quote_accepted": ("Awaiting Deposit", "Wait for Payment"),
+    "deposit_paid": ("Deposit Paid", "Assign Crew"),
+    "crew_assigned": ("Crew Assigned", "No action needed"),
+    "crew_arrived": ("Work In Progress", "No action needed"),
+    "before_photo": ("Work In Progress", "No action needed"),
+    "clearance_in_progress": ("Work In Progress", "No action needed"),
+    "after_photo": ("Work In Progress", "No action needed"),
+    "work_completed": ("Work Done - Set Price", "Set Final Price"),
+}
+
+# Admin dashboard summary buckets, in display order
+SUMMARY_BUCKETS = ("needs_quote", "awaiting_deposit", "ready_to_assign", "pending_verification", "payment_pending")
+
+
+def dashboard_label(status: str, assigned_crew_id: Optional[str] = None):
+    """(status label, action) shown for a job on the admin dashboard"""
+    if status == "job_created" and assigned_crew_id:
+        return status, "Review"
+    return DASHBOARD_LABELS.get(status, (status, "Review"))
+
+
+def summary_bucket(status: str, assigned_crew_id: Optional[str] = None) -> Optional[str]:
+    """The dashboard summary bucket a job is counted in, if any"""
+    if status == "job_created":
+        return None if assigned_crew_id else "needs_quote"
+    return {
+        "quote_accepted": "awaiting_deposit",
+        "deposit_paid": "ready_to_assign",
+        "work_completed": "pending_verification",
+        "payment_pending": "payment_pending",
+    }.get(status)
+
+
+def apply_counter_deltas(db: Session, deltas: Counter):
+    """Adjust the summary counters in place (count = count + delta), one UPDATE per bucket"""
+    # In bucket order, so concurrent transactions lock the counter rows in the same order
+    for bucket, delta in sorted((bucket, delta) for bucket, delta in deltas.items() if bucket and delta):
+        db.query(DashboardCounter).filter(DashboardCounter.bucket == bucket).update(
+                {DashboardCounter.count: DashboardCounter.count + delta},
+                synchronize_session=False
+            )
+
+
+def rebuild_counters(db: Session):
+    """Recount every summary bucket from the dashboard projection"""
+    # Lock the counters first: a transaction still projecting jobs either
+    # committed before the count below (and is counted) or applies its
+    # deltas after this commit, on top of the recount
+    existing = {
+        row.bucket: row
+        for row in db.query(DashboardCounter).order_by(DashboardCounter.bucket).with_for_update().populate_existing()
+    }
+    counts = Counter()
+    rows = db.query(
+        JobDashboard.status, JobDashboard.assigned_crew_id.isnot(None), func.count()
+    ).group_by(JobDashboard.status, JobDashboard.assigned_crew_id.isnot(None)).all()
+    for status, assigned, count in rows:
+        counts[summary_bucket(status, "assigned" if assigned else None)] += count
+
+    for bucket in SUMMARY_BUCKETS:
+        row = existing.get(bucket)
+        if row is None:
+            row = DashboardCounter(bucket=bucket)
+            db.add(row)
+        row.count = counts[bucket]
+    db.commit()
+
+
+def summary_counts(db: Session) -> dict:
+    """{bucket: count} for every summary bucket, from the counters table"""
+    counts = dict(db.query(DashboardCounter.bucket, DashboardCounter.count).all())
+    return {bucket: counts.get(bucket, 0) for bucket in SUMMARY_BUCKETS}
+
+
+def check_transition(job: Job, event: str, error: Optional[str] = None):
+    """Raise 400 unless the job's current status allows the event"""
+    allowed, _ = TRANSITIONS[event]
+    if job.status not in allowed:
+        raise HTTPException(
+            status_code=400,
+            detail=error or f"Cannot {event.replace('_', ' ')} for a job in {job.status} status"
+        )
+
+
+def compare_and_set_status(db: Session, jobs, event: str, now: datetime) -> set:
+    """
+    Move jobs to the event's status only where nobody has changed them since they were read
+
+    One UPDATE ... WHERE (id, status, version) IN (...) RETURNING id for
+    all the jobs, so the check and the write are a single round trip and
+    the rows stay locked until the caller's transaction ends. Matching
+    status as well as version also catches status changes made by the
+    client backend, which does not bump version. The changed jobs'
+    loaded state is updated to match.
+
+    Returns:
+        Ids of the jobs that were changed
+    """
+    new_status = TRANSITIONS[event][1]
+    keys = [(job.id, job.status, job.version) for job in jobs]
+    if not keys:
+        return set()
+    changed = set(db.execute(
+        update(Job)
+        .where(tuple_(Job.id, Job.status, Job.version).in_(keys))
+        .values(status=new_status, version=Job.version + 1, updated_at=now)
+        .returning(Job.id)
+        .execution_options(synchronize_session=False)
+    ).scalars())
+    for job in jobs:
+        if job.id in changed:
+            set_committed_value(job, "status", new_status)
+            set_committed_value(job, "version", job.version + 1)
+            set_committed_value(job, "updated_at", now)
+    return changed
+
+
+def _after_event(job: Job, event: str, now: datetime):
+    ensure_deadline(job)
+    if event == "complete_work":
+        job.work_completed_at = now
+
+
+def transition(db: Session, job: Job, event: str, error: Optional[str] = None) -> Job:
+    """
+    Apply a workflow event to the job and update its dashboard row
+
+    The status change is a compare-and-set (see compare_and_set_status):
+    if another request changed the job after it was read, this raises
+    409 instead of overwriting it. The job's other pending changes are
+    flushed before its dashboard row is written. Everything is left in
+    the caller's transaction, so it is committed (or rolled back) together; the live
+    job board event is published once that transaction commits.
+    """
+    check_transition(job, event, error)
+    previous_status = job.status
+    now = datetime.utcnow()
+    if job.id not in compare_and_set_status(db, [job], event, now):
+        # Drop the caller's pending changes to it, so nothing of this request is flushed onto the newer row
+        db.expire(job)
+        raise HTTPException(status_code=409, detail="Job was changed by another request. Reload it and try again.")
+    _after_event(job, event, now)
+    # Write the job's other pending changes first, so the dashboard row records the
+    # updated_at they leave behind and the reconciler does not see the job as stale
+    db.flush()
+    project_jobs(db, [job])
+    job_events.emit(db, job_status_event(job, previous_status, event, *dashboard_label(job.status, job.assigned_crew_id)))
+    return job
+
+
+def transition_many(db: Session, jobs, event: str, changes: Optional[dict] = None) -> list:
+    """
+    transition() for many jobs, with one UPDATE and one dashboard projection for all of them
+
+    Every job is checked before any is changed. Jobs changed by another
+    request since they were read are left alone and not returned: they
+    are expired first, so no pending change to them is flushed.
+
+    Args:
+        changes: Optional {job id: {attribute: value}} to set on the jobs
+            that are transitioned (and only on those), before their
+            dashboard rows are written
+
+    Returns:
+        The jobs that were transitioned
+    """
+    jobs = list(jobs)
+    for job in jobs:
+        check_transition(job, event)
+    previous_statuses = {job.id: job.status for job in jobs}
+    now = datetime.utcnow()
+    changed = compare_and_set_status(db, jobs, event, now)
+    for job in jobs:
+        if job.id not in changed:
+            db.expire(job)
+    jobs = [job for job in jobs if job.id in changed]
+    for job in jobs:
+        for attribute, value in (changes or {}).get(job.id, {}).items():
+            setattr(job, attribute, value)
+        _after_event(job, event, now)
+    db.flush()
+    project_jobs(db, jobs)
+    for job in jobs:
+        job_events.emit(
+            db, job_status_event(job, previous_statuses[job.id], event, *dashboard_label(job.status, job.assigned_crew_id))
+        )
+    return jobs
+
+
+def project_jobs(db: Session, jobs) -> int:
+    """
+    Write the dashboard rows for the given jobs (one query per referenced table)
+
+    Summary counters are adjusted for every job whose bucket changes. The
+    existing rows are locked (FOR UPDATE) and re-read before the deltas
+    are taken from them, so the reconciler and a request projecting the
+    same job cannot both count the same change.
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return 0
+
+    clients = fetch_clients(db, [job.client_id for job in jobs])
+    crew = fetch_crew(db, [job.assigned_crew_id for job in jobs])
+    rows = {
+        row.job_id: row
+        for row in db.query(JobDashboard).filter(JobDashboard.job_id.in_([job.id for job in jobs]))
+        .order_by(JobDashboard.job_id).with_for_update().populate_existing()
+    }
+
+    deltas = Counter()
+    for job in jobs:
+        row = rows.get(job.id)
+        if row is None:
+            row = JobDashboard(job_id=job.id)
+            db.add(row)
+        else:
+            deltas[summary_bucket(row.status, row.assigned_crew_id)] -= 1
+        deltas[summary_bucket(job.status, job.assigned_crew_id)] += 1
+
+        client = clients.get(client_key(job.client_id))
+        assigned = crew.get(job.assigned_crew_id) if job.assigned_crew_id else None
+
+        row.status = job.status
+        row.status_label, row.action = dashboard_label(job.status, job.assigned_crew_id)
+        row.client_name = client["full_name"] if client and client.get("full_name") else "Client"
+        row.crew_name = assigned.full_name if assigned else "Not assigned"
+        row.property_address = job.property_address
+        row.assigned_crew_id = job.assigned_crew_id
+        row.created_at = job.created_at
+        row.job_updated_at = job.updated_at
+
+    apply_counter_deltas(db, deltas)
+    return len(jobs)
+
+
+def reconcile_projection(db: Session) -> int:
+    """
+    Bring the dashboard in line with jobs changed outside transition()
+
+    Finds jobs with no dashboard row, a different status or a newer
+    updated_at (anti-join on the projection), re-projects them in batches
+    and drops rows whose job no longer exists.
+
+    Returns:
+        Number of jobs re-projected
+    """
+    stale = db.query(Job).outerjoin(JobDashboard, JobDashboard.job_id == Job.id).filter(or_(
+        JobDashboard.job_id.is_(None),
+        JobDashboard.status != Job.status,
+        JobDashboard.job_updated_at < Job.updated_at
+    )).order_by(Job.id)
+
+    total = 0
+    last_id = None
+    while True:
+        # Walk by id so a job that cannot be brought up to date is never picked up twice
+        page = stale.filter(Job.id > last_id) if last_id else stale
+        jobs = page.limit(DASHBOARD_RECONCILE_BATCH).all()
+        if not jobs:
+            break
+        total += project_jobs(db, jobs)
+        last_id = jobs[-1].id
+        db.commit()
+
+    orphans = db.query(JobDashboard).filter(~exists().where(Job.id == JobDashboard.job_id)).all()
+    if orphans:
+        deltas = Counter()
+        for row in orphans:
+            deltas[summary_bucket(row.status, row.assigned_crew_id)] -= 1
+            db.delete(row)
+        apply_counter_deltas(db, deltas)
+        db.commit()
+    return total
+
+
+class ProjectionReconciler:
+    """
+    Background thread running reconcile_projection every DASHBOARD_RECONCILE_SECONDS
+
+    Each run also stores SLA deadlines for jobs created by the client
+    backend. The first run after start, and then one run every
+    DASHBOARD_COUNTER_REBUILD_SECONDS, also rebuilds the summary counters.
+    """
+
+    def __init__(self, interval_seconds: int, rebuild_seconds: int):
+        self.interval_seconds = interval_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self._stopping = threading.Event()
+        self._thread = None
+        self.last_run_at = None
+        self.last_reprojected = 0
+        self.last_rebuilt_at = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="dashboard-projection", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def run_once(self) -> int:
+        db = SessionLocal()
+        try:
+            self.last_reprojected = reconcile_projection(db)
+            backfill_deadlines(db)
+            now = datetime.utcnow()
+            if self.last_rebuilt_at is None or (now - self.last_rebuilt_at).total_seconds() >= self.rebuild_seconds:
+                # Correct any counter drift, e.g. from jobs changed while no process was running
+                rebuild_counters(db)
+                self.last_rebuilt_at = now
+            self.last_run_at = datetime.utcnow()
+            return self.last_reprojected
+        except Exception as e:
+            db.rollback()
+            print(f"Dashboard projection reconcile failed: {e}")
+            return 0
+        finally:
+            db.close()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self.run_once()
+            self._stopping.wait(self.interval_seconds)
+
+
+# Singleton instance
+projection_reconciler = ProjectionReconciler(DASHBOARD_RECONCILE_SECONDS, DASHBOARD_COUNTER_REBUILD_SECONDS)
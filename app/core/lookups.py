@@ -0,0 +1,222 @@
+from sqlalchemy import text, bindparam, func, case
+from sqlalchemy.orm import Session
+from app.models.crew import Admin, Crew
+from app.models.job import Job
+from app.models.photo import JobPhoto
+from app.core.reference_data import reference_data
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+def _distinct_ids(values) -> list:
+    """Distinct, non-empty ids as strings"""
+    return sorted({str(v) for v in values if v})
+
+
+def _fetch_optional(db: Session, what: str, statement, params) -> list:
+    """
+    Rows from a table owned by the client backend, or [] if it cannot be read
+
+    Runs inside a SAVEPOINT, so a failure (e.g. the table is missing)
+    rolls back only this statement and the rest of the request's
+    transaction stays usable.
+    """
+    try:
+        with db.begin_nested():
+            return db.execute(statement, params).fetchall()
+    except Exception:
+        logger.exception("Error loading %s", what)
+        return []
+
+
+def client_key(client_id):
+    """Normalise a job's client_id to the form clients.id is returned in"""
+    if not client_id:
+        return None
+    try:
+        return str(uuid.UUID(str(client_id)))
+    except ValueError:
+        return None
+
+
+def fetch_clients(db: Session, client_ids) -> dict:
+    """
+    Resolve many clients in a single query
+
+    Returns:
+        Dict of client id -> {"full_name", "company_name", "email", "phone_number"}
+    """
+    ids = _distinct_ids(client_key(client_id) for client_id in client_ids)
+    if not ids:
+        return {}
+
+    rows = _fetch_optional(
+        db, "clients",
+        text("SELECT id, full_name, company_name, email, phone_number FROM clients WHERE id IN :ids")
+        .bindparams(bindparam("ids", expanding=True)),
+        {"ids": ids}
+    )
+
+    return {
+        str(r[0]): {"full_name": r[1], "company_name": r[2], "email": r[3], "phone_number": r[4]}
+        for r in rows
+    }
+
+
+def fetch_crew(db: Session, crew_ids) -> dict:
+    """Dict of crew id -> Crew for many ids in a single query"""
+    ids = _distinct_ids(crew_ids)
+    if not ids:
+        return {}
+    return {crew.id: crew for crew in db.query(Crew).filter(Crew.id.in_(ids)).all()}
+
+
+def fetch_admins(db: Session, admin_ids) -> dict:
+    """Dict of admin id -> Admin for many ids in a single query"""
+    ids = _distinct_ids(admin_ids)
+    if not ids:
+        return {}
+    return {admin.id: admin for admin in db.query(Admin).filter(Admin.id.in_(ids)).all()}
+
+
+def fetch_crew_job_counts(db: Session, crew_ids) -> dict:
+    """Dict of crew id -> (total jobs, completed jobs) for many crew in a single query"""
+    ids = _distinct_ids(crew_ids)
+    if not ids:
+        return {}
+    completed_jobs = func.sum(case((Job.status == "job_completed", 1), else_=0))
+    rows = db.query(Job.assigned_crew_id, func.count(Job.id), completed_jobs).filter(
+        Job.assigned_crew_id.in_(ids)
+    ).group_by(Job.assigned_crew_id).all()
+    return {crew_id: (total, int(completed or 0)) for crew_id, total, completed in rows}
+
+
+def crew_with_job_counts(db: Session, *criteria) -> list:
+    """
+    Crew matching criteria together with their job counts, in one query
+
+    A LEFT JOIN onto jobs grouped by crew, so crew with no jobs are
+    included with zero counts.
+
+    Returns:
+        List of (Crew, total_jobs, completed_jobs)
+    """
+    total_jobs = func.count(Job.id)
+    completed_jobs = func.coalesce(func.sum(case((Job.status == "job_completed", 1), else_=0)), 0)
+
+    rows = db.query(Crew, total_jobs, completed_jobs).outerjoin(
+        Job, Job.assigned_crew_id == Crew.id
+    ).filter(*criteria).group_by(Crew.id).order_by(Crew.full_name).all()
+
+    return [(crew, total, int(completed)) for crew, total, completed in rows]
+
+
+def available_crew_with_job_counts(db: Session) -> list:
+    """Approved, available crew with their job counts (see crew_with_job_counts)"""
+    return crew_with_job_counts(db, Crew.is_approved == True, Crew.status == "available")
+
+
+def fetch_photo_counts(db: Session, job_ids) -> dict:
+    """Dict of job id -> number of photos, for many jobs in a single query"""
+    ids = _distinct_ids(job_ids)
+    if not ids:
+        return {}
+    rows = db.query(JobPhoto.job_id, func.count(JobPhoto.id)).filter(
+        JobPhoto.job_id.in_(ids)
+    ).group_by(JobPhoto.job_id).all()
+    return {job_id: count for job_id, count in rows}
+
+
+def fetch_deposit_payments(db: Session, job_ids) -> dict:
+    """
+    Resolve succeeded deposit payments for many jobs in a single query
+
+    Returns:
+        Dict of job id -> paid_at
+    """
+    ids = _distinct_ids(job_ids)
+    if not ids:
+        return {}
+
+    rows = _fetch_optional(
+        db, "deposit payments",
+        text(
+            "SELECT job_id, paid_at FROM payments "
+            "WHERE job_id IN :ids AND payment_type = 'deposit' AND payment_status = 'succeeded'"
+        ).bindparams(bindparam("ids", expanding=True)),
+        {"ids": ids}
+    )
+
+    return {str(r[0]): r[1] for r in rows}
+
+
+class JobRefs:
+    """
+    Batched reference resolution for a page of jobs
+
+    Every table is queried at most once, on first use, with an IN (...) over
+    all ids referenced by the page, so building N rows costs one query per
+    table instead of one query per table per row. Service type and urgency
+    names come from the in-process reference data cache.
+    """
+
+    def __init__(self, db: Session, jobs):
+        self.db = db
+        self.jobs = list(jobs)
+        self._loaded = {}
+
+    def _load(self, name, loader, ids):
+        # ids is a callable, so the id list is only built on the first lookup
+        if name not in self._loaded:
+            self._loaded[name] = loader(self.db, ids())
+        return self._loaded[name]
+
+    def clients(self) -> dict:
+        return self._load("clients", fetch_clients, lambda: [job.client_id for job in self.jobs])
+
+    def crew(self) -> dict:
+        return self._load("crew", fetch_crew, lambda: [job.assigned_crew_id for job in self.jobs])
+
+    def admins(self) -> dict:
+        return self._load("admins", fetch_admins, lambda: [job.assigned_by for job in self.jobs])
+
+    def photo_counts(self) -> dict:
+        return self._load("photo_counts", fetch_photo_counts, lambda: [job.id for job in self.jobs])
+
+    def deposit_payments(self) -> dict:
+        return self._load("deposit_payments", fetch_deposit_payments, lambda: [job.id for job in self.jobs])
+
+    def client_field(self, job, field: str, default: str = "") -> str:
+        client = self.clients().get(client_key(job.client_id))
+        if client and client.get(field):
+            return client[field]
+        return default
+
+    def service_type_name(self, job) -> str:
+        return reference_data.service_type_name(job.service_type, job.service_type)
+
+    def urgency(self, job):
+        """(urgency name, "<sla>hr") for the job, or ("", "") when unknown"""
+        urgency = reference_data.urgency_level(job.urgency_level)
+        if not urgency:
+            return "", ""
+        return urgency["name"], f"{urgency['sla_hours']}hr"
+
+    def crew_name(self, job, default: str) -> str:
+        crew = self.crew().get(job.assigned_crew_id) if job.assigned_crew_id else None
+        return crew.full_name if crew else default
+
+    def admin_name(self, job, default: str = "Admin") -> str:
+        admin = self.admins().get(job.assigned_by) if job.assigned_by else None
+        return admin.full_name if admin and admin.full_name else default
+
+    def photo_count(self, job) -> int:
+        return self.photo_counts().get(job.id, 0)
+
+    def deposit_paid(self, job) -> bool:
+        return job.id in self.deposit_payments()
+
+    def deposit_paid_at(self, job):
+        return self.deposit_payments().get(job.id)
@@ -0,0 +1,300 @@
+import smtplib
+import sqlite3
+import threading
+import queue
+import time
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+from pathlib import Path
+from typing import Optional
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+MAIL_SPOOL_PATH = os.getenv("MAIL_SPOOL_PATH", str(BASE_DIR / "mail_spool.db"))
+MAIL_POOL_SIZE = int(os.getenv("MAIL_POOL_SIZE", "2"))
+MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", "6"))
+MAIL_RETRY_BASE_SECONDS = float(os.getenv("MAIL_RETRY_BASE_SECONDS", "15"))
+MAIL_RETRY_MAX_SECONDS = float(os.getenv("MAIL_RETRY_MAX_SECONDS", "1800"))
+MAIL_BATCH_SIZE = 20
+# A claimed message is retried by another worker if not settled within this time
+MAIL_CLAIM_SECONDS = 120
+# Idle SMTP connections older than this are closed instead of reused
+SMTP_IDLE_SECONDS = 60
+
+
+def smtp_settings() -> dict:
+    return {
+        "server": os.getenv("SMTP_SERVER", "smtp.gmail.com"),
+        "port": int(os.getenv("SMTP_PORT", "587")),
+        "user": os.getenv("SMTP_USER", ""),
+        "password": os.getenv("SMTP_PASSWORD", ""),
+    }
+
+
+class MailSpool:
+    """
+    SQLite-backed outbox so queued messages survive restarts
+
+    Messages are claimed inside an IMMEDIATE transaction, so several
+    processes can share one spool file without sending a message twice.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    to_addr TEXT NOT NULL,
+                    subject TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    label TEXT,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    claimed_until REAL,
+                    last_error TEXT,
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(status, next_attempt_at)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def add(self, to_addr: str, subject: str, body: str, label: str) -> int:
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO outbox (to_addr, subject, body, label, next_attempt_at, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (to_addr, subject, body, label, now, now)
+            )
+            return cursor.lastrowid
+
+    def claim_due(self, limit: int) -> list:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    "SELECT id, to_addr, subject, body, label, attempts FROM outbox "
+                    "WHERE status = 'pending' AND next_attempt_at <= ? "
+                    "AND (claimed_until IS NULL OR claimed_until < ?) "
+                    "ORDER BY next_attempt_at LIMIT ?",
+                    (now, now, limit)
+                ).fetchall()
+                if rows:
+                    conn.executemany(
+                        "UPDATE outbox SET claimed_until = ? WHERE id = ?",
+                        [(now + MAIL_CLAIM_SECONDS, row[0]) for row in rows]
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return rows
+
+    def mark_sent(self, message_id: int):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM outbox WHERE id = ?", (message_id,))
+
+    def mark_failed(self, message_id: int, attempts: int, error: str):
+        if attempts >= MAIL_MAX_ATTEMPTS:
+            status, next_attempt_at = "dead", time.time()
+        else:
+            delay = min(MAIL_RETRY_BASE_SECONDS * (2 ** (attempts - 1)), MAIL_RETRY_MAX_SECONDS)
+            status, next_attempt_at = "pending", time.time() + delay
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, claimed_until = NULL, last_error = ? WHERE id = ?",
+                (status, attempts, next_attempt_at, error[:500], message_id)
+            )
+
+    def counts(self) -> dict:
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+
+
+class SMTPConnectionPool:
+    """
+    Reusable authenticated SMTP connections
+
+    Connections are opened (connect + STARTTLS + login) on demand, returned
+    to the pool after a successful send and dropped after any error or once
+    they have been idle for SMTP_IDLE_SECONDS.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def _open(self):
+        settings = smtp_settings()
+        server = smtplib.SMTP(settings["server"], settings["port"], timeout=10)
+        server.starttls()
+        server.login(settings["user"], settings["password"])
+        return server
+
+    @staticmethod
+    def _close(server):
+        try:
+            server.quit()
+        except Exception:
+            pass
+
+    @contextmanager
+    def connection(self, fresh: bool = False):
+        """A pooled connection, or with fresh=True a newly opened one (returned to the pool all the same)"""
+        server = self._open() if fresh else None
+        while server is None:
+            try:
+                candidate, idle_since = self._idle.get_nowait()
+            except queue.Empty:
+                server = self._open()
+                break
+            if time.monotonic() - idle_since > SMTP_IDLE_SECONDS:
+                self._close(candidate)
+            else:
+                server = candidate
+
+        try:
+            yield server
+        except Exception:
+            self._close(server)
+            raise
+
+        try:
+            self._idle.put_nowait((server, time.monotonic()))
+        except queue.Full:
+            self._close(server)
+
+    def close_all(self):
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(server)
+
+
+class MailQueue:
+    """
+    Outbound mail queue: request handlers enqueue, a background thread sends
+
+    Messages are written to the spool first, then a dispatcher thread
+    delivers them through the SMTP connection pool, retrying failures with
+    exponential backoff up to MAIL_MAX_ATTEMPTS before marking them dead.
+    """
+
+    def __init__(self, spool_path: str, pool_size: int):
+        self.spool_path = spool_path
+        self.pool_size = pool_size
+        self._spool = None
+        self._pool = SMTPConnectionPool(pool_size)
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+
+    @property
+    def spool(self) -> MailSpool:
+        with self._lock:
+            if self._spool is None:
+                self._spool = MailSpool(self.spool_path)
+            return self._spool
+
+    def enqueue(self, to_addr: str, subject: str, body: str, label: str = "email") -> Optional[int]:
+        try:
+            message_id = self.spool.add(to_addr, subject, body, label)
+        except Exception as e:
+            print(f"Failed to queue {label} to {to_addr}: {e}")
+            return None
+        self._wakeup.set()
+        return message_id
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="mail-queue", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self._pool.close_all()
+
+    def _run(self):
+        with ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="mail-send") as executor:
+            while not self._stopping.is_set():
+                try:
+                    batch = self.spool.claim_due(MAIL_BATCH_SIZE)
+                except Exception as e:
+                    print(f"Mail queue error: {e}")
+                    batch = []
+                if batch:
+                    list(executor.map(self._deliver, batch))
+                    continue
+                self._wakeup.wait(timeout=5)
+                self._wakeup.clear()
+
+    def _deliver(self, row):
+        message_id, to_addr, subject, body, label, attempts = row
+        settings = smtp_settings()
+
+        msg = MIMEMultipart()
+        msg['From'] = settings["user"]
+        msg['To'] = to_addr
+        msg['Subject'] = subject
+        msg.attach(MIMEText(body, 'plain'))
+
+        try:
+            try:
+                with self._pool.connection() as server:
+                    server.send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                # A pooled connection was dropped by the server (and has been discarded).
+                # The other idle ones may be just as stale, so retry once on a new one.
+                with self._pool.connection(fresh=True) as server:
+                    server.send_message(msg)
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            print(f"Failed to send {label} to {to_addr} (attempt {attempts + 1}): {e}")
+            self.spool.mark_failed(message_id, attempts + 1, str(e))
+            return
+
+        with self._lock:
+            self.sent += 1
+        self.spool.mark_sent(message_id)
+        print(f"{label} sent to {to_addr}")
+
+    def stats(self) -> dict:
+        try:
+            spooled = self.spool.counts()
+        except Exception:
+            spooled = {}
+        return {
+            "pending": spooled.get("pending", 0),
+            "dead": spooled.get("dead", 0),
+            "sent": self.sent,
+            "failed_attempts": self.failed,
+            "worker_running": bool(self._thread and self._thread.is_alive()),
+        }
+
+
+# Singleton instance
+mail_queue = MailQueue(MAIL_SPOOL_PATH, MAIL_POOL_SIZE)
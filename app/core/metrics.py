@@ -0,0 +1,259 @@
+from fastapi import Request
+from sqlalchemy import event
+from starlette.routing import Match
+from contextvars import ContextVar
+from typing import Optional
+import threading
+import time
+
+# Upper bounds of the request latency histogram buckets (seconds)
+REQUEST_DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds of the queries-per-request histogram buckets; a route whose requests
+# land in the high buckets is running a query per row (N+1)
+QUERIES_PER_REQUEST_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Route label for requests that matched no route, so unknown paths cannot add series
+UNMATCHED_ROUTE = "unmatched"
+# Label for queries run outside any request (background workers)
+BACKGROUND_ROUTE = "background"
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, buckets: tuple):
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def copy(self) -> "Histogram":
+        copy = Histogram(())
+        copy.counts, copy.sum, copy.count = list(self.counts), self.sum, self.count
+        return copy
+
+    def observe(self, buckets: tuple, value: float):
+        index = next((n for n, bound in enumerate(buckets) if value <= bound), len(buckets))
+        self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RequestStats:
+    """Queries and DB time of the request in progress (see query_stats)"""
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+# Set by the metrics middleware for the duration of each request; sync handlers
+# run in the thread pool with a copy of the context, so they see the same object
+query_stats: ContextVar[Optional[RequestStats]] = ContextVar("query_stats", default=None)
+
+
+def route_label(request: Request) -> str:
+    """The matched route's path template (e.g. /api/admin/jobs/{job_id}), never the raw path"""
+    route = request.scope.get("route")
+    if route is None:
+        route = next(
+            (r for r in request.app.router.routes if r.matches(request.scope)[0] == Match.FULL), None
+        )
+    template = getattr(route, "path", None)
+    if not template:
+        return UNMATCHED_ROUTE
+    # Routes of included routers may carry their path without the router prefix
+    try:
+        concrete = route.path_format.format(**request.scope.get("path_params", {}))
+    except (AttributeError, KeyError, IndexError):
+        return template
+    path = request.scope.get("path", "")
+    if concrete != path and path.endswith(concrete):
+        return path[:-len(concrete)] + template
+    return template
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _bound(value) -> str:
+    return "+Inf" if value is None else repr(float(value))
+
+
+class AppMetrics:
+    """
+    Per-route request counts, latency and database work, in Prometheus text format
+
+    The middleware in main.py calls observe_request once per request;
+    the cursor hooks attribute every query's count and time to the
+    request that ran it; queries by background workers are counted under
+    BACKGROUND_ROUTE. Queries made after the response has started
+    (streaming exports) are not counted. Series only exist for matched
+    route templates.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}  # (method, route, status) -> count
+        self.durations = {}  # (method, route) -> Histogram of seconds
+        self.queries = {}  # (method, route) -> Histogram of queries per request
+        self.db_seconds = {}  # (method, route) -> total seconds in queries
+        self.background_queries = 0
+        self.background_db_seconds = 0.0
+
+    # ---- SQLAlchemy hooks ----
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started_at"].pop()
+        elapsed = time.perf_counter() - started
+        stats = query_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+            return
+        with self._lock:
+            self.background_queries += 1
+            self.background_db_seconds += elapsed
+
+    def _handle_error(self, context):
+        if context.connection is not None:
+            started = context.connection.info.get("query_started_at")
+            if started:
+                started.pop()
+
+    def attach(self, engine):
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine, "handle_error", self._handle_error)
+
+    # ---- Requests ----
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        key = (method, route)
+        with self._lock:
+            counter = (method, route, status)
+            self.requests[counter] = self.requests.get(counter, 0) + 1
+            self.durations.setdefault(key, Histogram(REQUEST_DURATION_BUCKETS)).observe(
+                REQUEST_DURATION_BUCKETS, seconds
+            )
+            self.queries.setdefault(key, Histogram(QUERIES_PER_REQUEST_BUCKETS)).observe(
+                QUERIES_PER_REQUEST_BUCKETS, stats.queries
+            )
+            self.db_seconds[key] = self.db_seconds.get(key, 0.0) + stats.db_seconds
+
+    # ---- Exposition ----
+
+    @staticmethod
+    def _histogram_lines(name: str, buckets: tuple, histograms: dict, label_names: tuple) -> list:
+        lines = []
+        for key, histogram in sorted(histograms.items()):
+            labels = dict(zip(label_names, key))
+            total = 0
+            for bound, count in zip(buckets + (None,), histogram.counts):
+                total += count
+                lines.append(f"{name}_bucket{_labels(**labels, le=_bound(bound))} {total}")
+            lines.append(f"{name}_sum{_labels(**labels)} {histogram.sum}")
+            lines.append(f"{name}_count{_labels(**labels)} {histogram.count}")
+        return lines
+
+    def render(self) -> list:
+        with self._lock:
+            requests = dict(self.requests)
+            durations = {key: h.copy() for key, h in self.durations.items()}
+            queries = {key: h.copy() for key, h in self.queries.items()}
+            db_seconds = dict(self.db_seconds)
+            background_queries, background_db_seconds = self.background_queries, self.background_db_seconds
+
+        lines = [
+            "# HELP http_requests_total Requests by route template and status code",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route, status), count in sorted(requests.items()):
+            lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+
+        lines += [
+            "# HELP http_request_duration_seconds Time to the start of the response",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        lines += self._histogram_lines(
+            "http_request_duration_seconds", REQUEST_DURATION_BUCKETS, durations, ("method", "route")
+        )
+
+        lines += [
+            "# HELP http_request_db_queries Database queries per request",
+            "# TYPE http_request_db_queries histogram",
+        ]
+        lines += self._histogram_lines(
+            "http_request_db_queries", QUERIES_PER_REQUEST_BUCKETS, queries, ("method", "route")
+        )
+
+        lines += [
+            "# HELP db_queries_total Database queries by the route that ran them",
+            "# TYPE db_queries_total counter",
+        ]
+        for (method, route), histogram in sorted(queries.items()):
+            lines.append(f"db_queries_total{_labels(method=method, route=route)} {int(histogram.sum)}")
+        lines.append(f"db_queries_total{_labels(method='', route=BACKGROUND_ROUTE)} {background_queries}")
+
+        lines += [
+            "# HELP db_query_duration_seconds_total Time spent in database queries by the route that ran them",
+            "# TYPE db_query_duration_seconds_total counter",
+        ]
+        for (method, route), seconds in sorted(db_seconds.items()):
+            lines.append(f"db_query_duration_seconds_total{_labels(method=method, route=route)} {seconds}")
+        lines.append(
+            f"db_query_duration_seconds_total{_labels(method='', route=BACKGROUND_ROUTE)} {background_db_seconds}"
+        )
+        return lines
+
+
+POOL_METRICS = (
+    ("db_pool_size", "gauge", "pool_size", "Connections the pool keeps open"),
+    ("db_pool_max_overflow", "gauge", "max_overflow", "Connections allowed beyond the pool size"),
+    ("db_pool_in_use", "gauge", "in_use", "Connections checked out"),
+    ("db_pool_idle", "gauge", "idle", "Connections idle in the pool"),
+    ("db_pool_overflow", "gauge", "overflow", "Connections open beyond the pool size"),
+    ("db_pool_peak_in_use", "gauge", "peak_in_use", "Most connections checked out at once"),
+    ("db_pool_checkouts_total", "counter", "checkouts", "Connection checkouts"),
+    ("db_pool_overflow_checkouts_total", "counter", "overflow_checkouts", "Checkouts beyond the pool size"),
+    ("db_pool_timeouts_total", "counter", "timeouts", "Checkouts that timed out waiting"),
+    ("db_pool_connects_total", "counter", "connects", "New connections opened"),
+    ("db_pool_invalidations_total", "counter", "invalidations", "Connections invalidated"),
+)
+
+
+def pool_lines(pools: dict) -> list:
+    """Connection pool metrics (see app.database.pool_metrics) for {database label: PoolMetrics}"""
+    stats = {database: metrics.stats() for database, metrics in pools.items()}
+    lines = []
+    for name, kind, key, help_text in POOL_METRICS:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        for database, values in stats.items():
+            if values[key] is not None:
+                lines.append(f"{name}{_labels(database=database)} {values[key]}")
+
+    lines += [
+        "# HELP db_pool_checkout_wait_seconds Time waiting for a connection",
+        "# TYPE db_pool_checkout_wait_seconds histogram",
+    ]
+    for database, metrics in pools.items():
+        histogram = metrics.wait_histogram()
+        for bound, count in histogram:
+            le = "+Inf" if bound is None else repr(bound / 1000)
+            lines.append(f"db_pool_checkout_wait_seconds_bucket{_labels(database=database, le=le)} {count}")
+        labels = _labels(database=database)
+        lines.append(f"db_pool_checkout_wait_seconds_sum{labels} {stats[database]['wait_seconds_total']}")
+        lines.append(f"db_pool_checkout_wait_seconds_count{labels} {histogram[-1][1]}")
+    return lines
+
+
+# Singleton instance
+app_metrics = AppMetrics()
@@ -0,0 +1,118 @@
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_
+from datetime import datetime
+from typing import Optional
+import base64
+import os
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+
+# Response header carrying the cursor of the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(sort_value, row_id) -> str:
+    # A NULL sort value is encoded as an empty string
+    if sort_value is None:
+        sort_value = ""
+    elif isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    raw = f"{sort_value}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    """
+    Decode a cursor produced by encode_cursor
+
+    Returns:
+        (sort value or None, row id) of the last row of the previous page
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        sort_value, row_id = raw.split("|", 1)
+        return (datetime.fromisoformat(sort_value) if sort_value else None), row_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(query, sort_column, id_column, cursor: Optional[str], limit: int):
+    """
+    Keyset pagination over (sort_column, id_column), newest first
+
+    Rows after the cursor are selected with an indexed range comparison
+    instead of an OFFSET scan. One extra row is fetched to know whether a
+    next page exists. Rows whose sort value is NULL come first (as in a
+    Postgres DESC index), ordered by id.
+
+    Returns:
+        (rows of this page, cursor of the next page or None)
+    """
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        if sort_value is None:
+            query = query.filter(or_(
+                sort_column.isnot(None),
+                and_(sort_column.is_(None), id_column < row_id)
+            ))
+        else:
+            query = query.filter(or_(
+                sort_column < sort_value,
+                and_(sort_column == sort_value, id_column < row_id)
+            ))
+
+    rows = query.order_by(sort_column.desc().nulls_first(), id_column.desc()).limit(limit + 1).all()
+
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+
+
+def keyset_sql(sort_column: str, id_column: str, cursor: Optional[str]):
+    """
+    Raw SQL equivalent of paginate()'s cursor filter, for queries ordered
+    by "{sort_column} DESC NULLS FIRST, {id_column} DESC"
+
+    Returns:
+        ("AND (...)" fragment or "", bind params for it)
+    """
+    if not cursor:
+        return "", {}
+
+    sort_value, row_id = decode_cursor(cursor)
+    if sort_value is None:
+        clause = (
+            f"AND ({sort_column} IS NOT NULL "
+            f"OR ({sort_column} IS NULL AND {id_column} < :cursor_id))"
+        )
+        return clause, {"cursor_id": row_id}
+
+    clause = (
+        f"AND ({sort_column} < :cursor_sort "
+        f"OR ({sort_column} = :cursor_sort AND {id_column} < :cursor_id))"
+    )
+    return clause, {"cursor_sort": sort_value, "cursor_id": row_id}
+
+
+def next_cursor_sql(rows, limit: int, sort_index: int, id_index: int):
+    """
+    Trim a raw SQL result fetched with LIMIT limit + 1
+
+    Returns:
+        (rows of this page, cursor of the next page or None)
+    """
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last[sort_index], last[id_index])
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
@@ -0,0 +1,96 @@
+from sqlalchemy import text
+from app.database.db import engine
+from typing import Optional
+import os
+import threading
+import time
+
+REFERENCE_DATA_TTL_SECONDS = int(os.getenv("REFERENCE_DATA_TTL_SECONDS", "600"))
+# After a failed load, wait this long before hitting the database again
+REFERENCE_DATA_RETRY_SECONDS = 30
+
+REFERENCE_TABLES = {
+    "service_types": "SELECT id, name FROM service_types",
+    "urgency_levels": "SELECT id, name, sla_hours FROM urgency_levels",
+    "service_levels": "SELECT id, name, sla_hours FROM service_levels",
+}
+
+
+class ReferenceDataCache:
+    """
+    In-process cache of the small lookup tables owned by the client backend
+
+    Each table is loaded whole, on first use and again once the TTL expires,
+    on its own connection so a missing table never aborts the caller's
+    transaction. Call invalidate() after editing a table to reload it on
+    the next lookup.
+    """
+
+    def __init__(self, ttl_seconds: int = REFERENCE_DATA_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._tables = {}
+        self._expires_at = {}
+        self._stats = {name: {"hits": 0, "misses": 0, "loads": 0, "errors": 0} for name in REFERENCE_TABLES}
+
+    def _load(self, name: str) -> dict:
+        stats = self._stats[name]
+        stats["loads"] += 1
+        try:
+            with engine.connect() as conn:
+                rows = conn.execute(text(REFERENCE_TABLES[name])).mappings().all()
+        except Exception as e:
+            stats["errors"] += 1
+            print(f"Error loading reference table {name}: {e}")
+            self._expires_at[name] = time.monotonic() + REFERENCE_DATA_RETRY_SECONDS
+            return self._tables.get(name, {})
+
+        self._expires_at[name] = time.monotonic() + self.ttl_seconds
+        return {str(row["id"]): dict(row) for row in rows}
+
+    def _table(self, name: str) -> dict:
+        with self._lock:
+            if time.monotonic() < self._expires_at.get(name, 0):
+                self._stats[name]["hits"] += 1
+            else:
+                self._stats[name]["misses"] += 1
+                self._tables[name] = self._load(name)
+            return self._tables[name]
+
+    def get(self, name: str, row_id) -> Optional[dict]:
+        if row_id is None or row_id == "":
+            return None
+        return self._table(name).get(str(row_id))
+
+    def ids(self, name: str) -> list:
+        """Ids (as strings) of every row in the table"""
+        return list(self._table(name))
+
+    def service_type_name(self, service_type_id, default=None):
+        service_type = self.get("service_types", service_type_id)
+        return service_type["name"] if service_type else default
+
+    def urgency_level(self, urgency_level_id) -> Optional[dict]:
+        """{"id", "name", "sla_hours"} for the urgency level, or None"""
+        return self.get("urgency_levels", urgency_level_id)
+
+    def service_level(self, service_level_id) -> Optional[dict]:
+        """{"id", "name", "sla_hours"} for the service level, or None"""
+        return self.get("service_levels", service_level_id)
+
+    def invalidate(self, name: Optional[str] = None):
+        """Drop one table (or all of them) so the next lookup reloads it"""
+        with self._lock:
+            for table in ([name] if name else list(REFERENCE_TABLES)):
+                self._expires_at.pop(table, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                name: {**counters, "rows": len(self._tables.get(name, {}))}
+                for name, counters in self._stats.items()
+            }
+
+
+# Singleton instance
+reference_data = ReferenceDataCache()
@@ -1,25 +1,146 @@
 from passlib.context import CryptContext
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
-from fastapi import HTTPException, Depends
+from fastapi import HTTPException, Depends, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.orm import Session
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+from app.database.db import get_db
+from app.models.crew import Admin, Crew
 import os
+import threading
+import time
 
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
+# Stream tokens travel in the URL (EventSource cannot send headers), so they only allow connecting briefly
+STREAM_TOKEN_EXPIRE_SECONDS = int(os.getenv("STREAM_TOKEN_EXPIRE_SECONDS", "60"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Resolved principals are reused for this long, so most requests skip the DB for auth
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "2048"))
+
+# bcrypt cost factor; hashes made with any other cost are rehashed on the next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Concurrent bcrypt computations, so a burst of logins cannot take every CPU
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(max(1, min(4, (os.cpu_count() or 2) - 1)))))
+# Password operations allowed to wait for a worker before new ones are turned away
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "64"))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS
+)
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a small dedicated pool instead of the request thread
+
+    The calling request thread waits for the result, but at most
+    `workers` hashes run at once, leaving CPU for every other request.
+    When more than `queue_limit` operations are already waiting, new ones
+    are rejected with 503 rather than queueing without bound.
+    """
+
+    def __init__(self, context: CryptContext, workers: int, queue_limit: int):
+        self.context = context
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self._wait_seconds = 0.0
+        self._run_seconds = 0.0
+
+    def _timed(self, enqueued_at: float, fn, *args):
+        started = time.perf_counter()
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+            self._wait_seconds += started - enqueued_at
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+                self._run_seconds += time.perf_counter() - started
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HTTPException(status_code=503, detail="Too many authentication requests, please retry")
+        try:
+            with self._lock:
+                self.queued += 1
+            return self._executor.submit(self._timed, time.perf_counter(), fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password: str) -> str:
+        return self._run(self.context.hash, password)
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        return self._run(self.context.verify, password, hashed_password)
+
+    def verify_and_update(self, password: str, hashed_password: str):
+        """
+        Returns:
+            (password matches, new hash if the stored one uses outdated settings else None)
+        """
+        valid, new_hash = self._run(self.context.verify_and_update, password, hashed_password)
+        if new_hash:
+            with self._lock:
+                self.rehashed += 1
+        return valid, new_hash
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "bcrypt_rounds": BCRYPT_ROUNDS,
+                "queued": self.queued,
+                "active": self.active,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "rehashed": self.rehashed,
+                "avg_wait_ms": round(self._wait_seconds / self.completed * 1000, 2) if self.completed else 0.0,
+                "avg_run_ms": round(self._run_seconds / self.completed * 1000, 2) if self.completed else 0.0,
+            }
+
+
+password_hasher = PasswordHasher(pwd_context, PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_LIMIT)
 
 def hash_password(password: str) -> str:
     # Truncate password to 72 bytes for bcrypt compatibility
-    return pwd_context.hash(password[:72])
+    return password_hasher.hash(password[:72])
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     # Truncate password to 72 bytes for bcrypt compatibility
-    return pwd_context.verify(plain_password[:72], hashed_password)
+    return password_hasher.verify(plain_password[:72], hashed_password)
+
+def verify_password_and_update(plain_password: str, hashed_password: str):
+    """verify_password that also returns a replacement hash when BCRYPT_ROUNDS has changed"""
+    # Truncate password to 72 bytes for bcrypt compatibility
+    return password_hasher.verify_and_update(plain_password[:72], hashed_password)
 
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
@@ -33,6 +154,13 @@ def create_refresh_token(data: dict) -> str:
     to_encode.update({"exp": expire, "type": "refresh"})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
+def create_stream_token(data: dict) -> str:
+    """Short-lived token for opening an event stream with ?token=, where no Authorization header can be sent"""
+    to_encode = data.copy()
+    expire = datetime.utcnow() + timedelta(seconds=STREAM_TOKEN_EXPIRE_SECONDS)
+    to_encode.update({"exp": expire, "type": "stream"})
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
 def verify_refresh_token(token: str) -> dict:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -50,3 +178,138 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
         return payload
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated admin or crew member behind an access token"""
+    id: str
+    email: str
+    role: str
+    full_name: Optional[str]
+    is_approved: bool
+
+
+class PrincipalCache:
+    """
+    Short-TTL LRU of resolved principals keyed by (role, token subject)
+
+    Entries are dropped with invalidate() whenever the account changes
+    (approval, rejection, profile edits); the TTL bounds staleness for
+    changes made outside this process.
+    """
+
+    def __init__(self, ttl_seconds: int, max_size: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, role: str, subject: str) -> Optional[Principal]:
+        key = (role, subject)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.monotonic() < entry[1]:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+    def put(self, principal: Principal):
+        key = (principal.role, principal.email)
+        with self._lock:
+            self._entries[key] = (principal, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, subject: Optional[str] = None):
+        """Drop one account's cached principal (or all of them)"""
+        with self._lock:
+            if subject is None:
+                self._entries.clear()
+                return
+            for role in ("Admin", "Crew"):
+                self._entries.pop((role, subject), None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses,
+                    "ttl_seconds": self.ttl_seconds}
+
+
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_TTL_SECONDS, PRINCIPAL_CACHE_SIZE)
+
+
+def _load_principal(db: Session, role: str, subject: str) -> Optional[Principal]:
+    if role == "Admin":
+        row = db.query(Admin.id, Admin.email, Admin.full_name).filter(Admin.email == subject).first()
+        return Principal(row[0], row[1], "Admin", row[2], True) if row else None
+    if role == "Crew":
+        row = db.query(Crew.id, Crew.email, Crew.full_name, Crew.is_approved).filter(Crew.email == subject).first()
+        return Principal(row[0], row[1], "Crew", row[2], bool(row[3])) if row else None
+    return None
+
+def _resolve_principal(db: Session, current_user: dict) -> Principal:
+    subject = current_user.get("sub")
+    role = current_user.get("role")
+    if not subject or role not in ("Admin", "Crew"):
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    principal = principal_cache.get(role, subject)
+    if principal is None:
+        principal = _load_principal(db, role, subject)
+        if principal is None:
+            raise HTTPException(status_code=403, detail=f"{role} access required")
+        principal_cache.put(principal)
+    return principal
+
+def get_current_principal(
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> Principal:
+    """
+    Resolve the token's subject to an account, from the principal cache when possible
+
+    The role claim picks the table to look in, so a miss costs one query.
+    """
+    return _resolve_principal(db, current_user)
+
+def get_stream_admin(
+    token: Optional[str] = Query(None, description="Stream token from POST /api/admin/events/token"),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: Session = Depends(get_db)
+) -> Principal:
+    """
+    get_current_admin for event streams: a bearer access token, or a stream token as ?token=
+
+    Browsers' EventSource cannot set an Authorization header, so it opens
+    the stream with a stream token (create_stream_token) in the URL instead.
+    """
+    if credentials is not None:
+        expected_type, encoded = "access", credentials.credentials
+    elif token is not None:
+        expected_type, encoded = "stream", token
+    else:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    try:
+        payload = jwt.decode(encoded, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if payload.get("type") != expected_type:
+        raise HTTPException(status_code=401, detail="Invalid token type")
+    return get_current_admin(_resolve_principal(db, payload))
+
+def get_current_admin(principal: Principal = Depends(get_current_principal)) -> Principal:
+    if principal.role != "Admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return principal
+
+def get_current_crew(principal: Principal = Depends(get_current_principal)) -> Principal:
+    if principal.role != "Crew" or not principal.is_approved:
+        raise HTTPException(status_code=403, detail="Crew access required")
+    return principal
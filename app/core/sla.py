@@ -0,0 +1,301 @@
+from fastapi import HTTPException
+from sqlalchemy import and_, bindparam, case, exists, or_, text, update
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from typing import Optional
+from app.database.db import SessionLocal
+from app.models.job import Job
+from app.models.sla import SlaEscalation
+from app.core.reference_data import reference_data
+from app.core.email import send_sla_escalation_email
+import asyncio
+import os
+
+# SLA used when a job has no (known) urgency level
+DEFAULT_SLA_HOURS = 24
+# Open jobs whose deadline is this close are reported as at risk
+SLA_AT_RISK_HOURS = int(os.getenv("SLA_AT_RISK_HOURS", "4"))
+SLA_BACKFILL_BATCH = 500
+
+# How often the monitor looks for jobs to escalate
+SLA_ESCALATION_SECONDS = int(os.getenv("SLA_ESCALATION_SECONDS", "60"))
+SLA_ESCALATION_BATCH = 200
+# Deadlines further in the past than this are never escalated (e.g. after a long outage)
+SLA_ESCALATION_LOOKBACK_HOURS = int(os.getenv("SLA_ESCALATION_LOOKBACK_HOURS", "24"))
+# Postgres advisory lock key, so only one process escalates at a time
+SLA_ESCALATION_LOCK_KEY = 7316002
+
+# Statuses at which the crew's work is done, which stops the SLA clock
+WORK_DONE_STATUSES = ("work_completed", "job_verified", "payment_pending", "job_completed")
+# Jobs in these statuses are never at risk or breached. Must match the
+# predicate of ix_jobs_open_sla_deadline (migrations/versions/0005_sla_deadlines.py)
+SLA_STOPPED_STATUSES = WORK_DONE_STATUSES + ("cancelled",)
+
+SLA_STATES = ("on_track", "at_risk", "breached", "met")
+# States that can be queried with sla_filter
+SLA_FILTER_STATES = ("at_risk", "breached")
+
+
+def sla_hours(job: Job) -> int:
+    """SLA hours for the job's urgency level"""
+    urgency = reference_data.urgency_level(job.urgency_level)
+    return urgency["sla_hours"] if urgency else DEFAULT_SLA_HOURS
+
+
+def compute_deadline(job: Job) -> Optional[datetime]:
+    if job.created_at is None:
+        return None
+    return job.created_at + timedelta(hours=sla_hours(job))
+
+
+def ensure_deadline(job: Job) -> Optional[datetime]:
+    """Store the job's SLA deadline if it has none yet, and return it"""
+    if job.sla_deadline is None:
+        job.sla_deadline = compute_deadline(job)
+    return job.sla_deadline
+
+
+def backfill_deadlines(db: Session) -> int:
+    """
+    Set sla_deadline on jobs that have none (created by the client backend)
+
+    A plain UPDATE that keeps updated_at as it is, so the backfill does
+    not look like a change to the reconcilers and rollups. Jobs whose
+    urgency level is not in the reference data (yet) are not read at
+    all rather than given the default SLA: a later run picks them up
+    once the level has been added, and until then they cost nothing.
+
+    Returns:
+        Number of jobs updated
+    """
+    table = Job.__table__
+    missing = db.query(Job.id, Job.created_at, Job.urgency_level).filter(
+        Job.sla_deadline.is_(None),
+        Job.created_at.isnot(None),
+        or_(
+            Job.urgency_level.is_(None),
+            Job.urgency_level == "",
+            Job.urgency_level.in_(reference_data.ids("urgency_levels"))
+        )
+    ).order_by(Job.id)
+
+    total = 0
+    last_id = None
+    while True:
+        page = missing.filter(Job.id > last_id) if last_id else missing
+        jobs = page.limit(SLA_BACKFILL_BATCH).all()
+        if not jobs:
+            db.rollback()
+            return total
+        last_id = jobs[-1].id
+        db.connection().execute(
+            update(table).where(table.c.id == bindparam("job_id")).values(
+                sla_deadline=bindparam("deadline"), updated_at=table.c.updated_at
+            ),
+            [{"job_id": job.id, "deadline": compute_deadline(job)} for job in jobs]
+        )
+        db.commit()
+        total += len(jobs)
+
+
+# ---- Shared query filters (indexed by ix_jobs_open_sla_deadline) ----
+
+def open_sla_filter():
+    """Jobs whose SLA clock is still running"""
+    return and_(Job.status.notin_(SLA_STOPPED_STATUSES), Job.sla_deadline.isnot(None))
+
+
+def check_sla_filter(state: Optional[str]):
+    """Raise 400 unless state is None or one of SLA_FILTER_STATES"""
+    if state is not None and state not in SLA_FILTER_STATES:
+        raise HTTPException(status_code=400, detail=f"sla state must be one of: {', '.join(SLA_FILTER_STATES)}")
+
+
+def sla_filter(state: str, now: Optional[datetime] = None):
+    """Filter for open jobs that are "at_risk" or "breached" at `now`"""
+    now = now or datetime.utcnow()
+    if state == "breached":
+        return and_(open_sla_filter(), Job.sla_deadline <= now)
+    if state == "at_risk":
+        return and_(
+            open_sla_filter(),
+            Job.sla_deadline > now,
+            Job.sla_deadline <= now + timedelta(hours=SLA_AT_RISK_HOURS)
+        )
+    raise ValueError(f"Unknown SLA filter state: {state}")
+
+
+# ---- Per-job state, for jobs already loaded ----
+
+def work_completed_at(job: Job) -> Optional[datetime]:
+    """When the SLA clock stopped, if it has (updated_at for jobs finished before work_completed_at existed)"""
+    if job.status not in WORK_DONE_STATUSES:
+        return None
+    return job.work_completed_at or job.updated_at
+
+
+def sla_state(job: Job, now: Optional[datetime] = None) -> Optional[str]:
+    """One of SLA_STATES, or None for a cancelled job or one without a deadline"""
+    deadline = job.sla_deadline or compute_deadline(job)
+    if deadline is None or job.status == "cancelled":
+        return None
+    stopped_at = work_completed_at(job)
+    if stopped_at is not None:
+        return "met" if stopped_at <= deadline else "breached"
+    now = now or datetime.utcnow()
+    if deadline <= now:
+        return "breached"
+    if deadline <= now + timedelta(hours=SLA_AT_RISK_HOURS):
+        return "at_risk"
+    return "on_track"
+
+
+def _hours_minutes(delta: timedelta) -> str:
+    seconds = int(delta.total_seconds())
+    return f"{seconds // 3600}h {(seconds % 3600) // 60}m"
+
+
+def countdown(job: Job, now: Optional[datetime] = None):
+    """
+    (time remaining, countdown label) shown to the crew
+
+    ("SLA Met", "On Time") or ("SLA Breached", "Overdue") once the work is
+    done, otherwise "5h 12m" / "On Time" or "-1h 3m" / "Overdue".
+    """
+    state = sla_state(job, now)
+    if state is None:
+        return "", ""
+    if work_completed_at(job) is not None:
+        return ("SLA Met", "On Time") if state == "met" else ("SLA Breached", "Overdue")
+    now = now or datetime.utcnow()
+    deadline = job.sla_deadline or compute_deadline(job)
+    if state == "breached":
+        return f"-{_hours_minutes(now - deadline)}", "Overdue"
+    return _hours_minutes(deadline - now), "On Time"
+
+
+# ---- Escalations ----
+
+def _try_lock(db: Session) -> bool:
+    """Take the escalation lock for this transaction (always granted outside Postgres)"""
+    if db.get_bind().dialect.name != "postgresql":
+        return True
+    return db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": SLA_ESCALATION_LOCK_KEY}).scalar()
+
+
+def due_escalations(db: Session, now: datetime):
+    """(id, property_address, sla_deadline, level) of open jobs due an escalation they have not had"""
+    level = case((Job.sla_deadline <= now, "breached"), else_="at_risk")
+    return db.query(Job.id, Job.property_address, Job.sla_deadline, level.label("level")).filter(
+        open_sla_filter(),
+        Job.sla_deadline > now - timedelta(hours=SLA_ESCALATION_LOOKBACK_HOURS),
+        Job.sla_deadline <= now + timedelta(hours=SLA_AT_RISK_HOURS),
+        ~exists().where(SlaEscalation.job_id == Job.id, SlaEscalation.level == level)
+    ).order_by(Job.sla_deadline, Job.id)
+
+
+def escalate_due_jobs(db: Session, now: Optional[datetime] = None) -> Optional[int]:
+    """
+    Record and notify escalations for jobs that became at risk or breached
+
+    Only deadlines between SLA_ESCALATION_LOOKBACK_HOURS ago and the end
+    of the at-risk window are read (a range on ix_jobs_open_sla_deadline),
+    less those already escalated at that level, so a tick costs O(due
+    jobs) whatever the size of jobs. Each batch is committed before its
+    digest email is queued.
+
+    Returns:
+        Number of escalations, or None when another process holds the lock
+    """
+    now = now or datetime.utcnow()
+    due = due_escalations(db, now)
+
+    total = 0
+    while True:
+        if not _try_lock(db):
+            db.rollback()
+            return total or None
+        rows = due.limit(SLA_ESCALATION_BATCH).all()
+        if not rows:
+            db.rollback()
+            return total
+        for row in rows:
+            db.add(SlaEscalation(job_id=row.id, level=row.level, sla_deadline=row.sla_deadline, escalated_at=now))
+        db.commit()
+        send_sla_escalation_email([dict(row._mapping, job_id=row.id) for row in rows])
+        total += len(rows)
+
+
+class SlaEscalationMonitor:
+    """
+    Event loop task running escalate_due_jobs every SLA_ESCALATION_SECONDS
+
+    The task only sleeps on the loop: each run (blocking DB queries and
+    email queueing) happens on a worker thread via asyncio.to_thread, so
+    it holds no thread while idle and never blocks the loop. Every worker
+    process runs one; the advisory lock makes only one of them the leader
+    for a given tick, and the others skip it.
+    """
+
+    def __init__(self, interval_seconds: int):
+        self.interval_seconds = interval_seconds
+        self._stopping = None
+        self._task = None
+        self.last_run_at = None
+        self.last_escalated = 0
+        self.total_escalated = 0
+        self.is_leader = False
+
+    def start(self):
+        """Start the task on the running event loop (call from an async startup handler)"""
+        if self._task and not self._task.done():
+            return
+        self._stopping = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run(), name="sla-escalations")
+
+    async def stop(self, timeout: float = 10):
+        if self._task is None:
+            return
+        self._stopping.set()
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def run_once(self) -> int:
+        db = SessionLocal()
+        try:
+            escalated = escalate_due_jobs(db)
+            self.is_leader = escalated is not None
+            self.last_escalated = escalated or 0
+            self.total_escalated += self.last_escalated
+            self.last_run_at = datetime.utcnow()
+            return self.last_escalated
+        except Exception as e:
+            db.rollback()
+            print(f"SLA escalation run failed: {e}")
+            return 0
+        finally:
+            db.close()
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            await asyncio.to_thread(self.run_once)
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "interval_seconds": self.interval_seconds,
+            "running": bool(self._task and not self._task.done()),
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "is_leader": self.is_leader,
+            "last_escalated": self.last_escalated,
+            "total_escalated": self.total_escalated,
+        }
+
+
+# Singleton instance
+sla_monitor = SlaEscalationMonitor(SLA_ESCALATION_SECONDS)
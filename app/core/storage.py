@@ -1,13 +1,23 @@
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.client import Config
 from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
 import os
+import threading
 from dotenv import load_dotenv
-from typing import Optional
+from typing import Optional, List, Dict
 import uuid
 
 load_dotenv()
 
+MB = 1024 * 1024
+# Parallel uploads across files (per process)
+UPLOAD_MAX_WORKERS = int(os.getenv("UPLOAD_MAX_WORKERS", "8"))
+# Files larger than this are sent as multipart uploads, in chunks of UPLOAD_CHUNK_SIZE_MB
+UPLOAD_MULTIPART_THRESHOLD_MB = int(os.getenv("UPLOAD_MULTIPART_THRESHOLD_MB", "8"))
+UPLOAD_CHUNK_SIZE_MB = int(os.getenv("UPLOAD_CHUNK_SIZE_MB", "8"))
+
 class UthoStorage:
     def __init__(self):
         self.access_key = os.getenv("UTHO_ACCESS_KEY")
@@ -22,13 +32,30 @@ class UthoStorage:
             aws_secret_access_key=self.secret_key,
             endpoint_url=self.endpoint_url,
             region_name=self.region,
-            config=Config(signature_version='s3v4')
+            config=Config(signature_version='s3v4', max_pool_connections=UPLOAD_MAX_WORKERS * 2)
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=UPLOAD_MULTIPART_THRESHOLD_MB * MB,
+            multipart_chunksize=UPLOAD_CHUNK_SIZE_MB * MB,
+            max_concurrency=2
         )
+        self._executor = None
+        self._executor_lock = threading.Lock()
+    
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=UPLOAD_MAX_WORKERS, thread_name_prefix="upload")
+            return self._executor
     
     def upload_file(self, file_data, folder: str, filename: str) -> Optional[str]:
         """
         Upload file to Utho object storage
         
+        File-like objects are streamed in chunks rather than read into
+        memory, switching to a multipart upload above the multipart threshold.
+        
         Args:
             file_data: File content (bytes or file-like object)
             folder: Folder path in bucket (e.g., 'crew_documents/crew_id_123')
@@ -40,18 +67,21 @@ class UthoStorage:
         try:
             object_key = f"{folder}/{filename}"
             
-            # Read file content
             if hasattr(file_data, 'read'):
-                content = file_data.read()
+                self.s3_client.upload_fileobj(
+                    file_data,
+                    self.bucket_name,
+                    object_key,
+                    ExtraArgs={'ACL': 'public-read'},
+                    Config=self.transfer_config
+                )
             else:
-                content = file_data
-            
-            self.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=object_key,
-                Body=content,
-                ACL='public-read'
-            )
+                self.s3_client.put_object(
+                    Bucket=self.bucket_name,
+                    Key=object_key,
+                    Body=file_data,
+                    ACL='public-read'
+                )
             
             file_url = f"{self.endpoint_url}/{self.bucket_name}/{object_key}"
             return file_url
@@ -103,6 +133,44 @@ class UthoStorage:
         unique_filename = f"{photo_type}_{uuid.uuid4().hex[:8]}_{filename}"
         return self.upload_file(file_data, folder, unique_filename)
     
+    def upload_job_photos(self, files: List[tuple], job_id: str, photo_type: str) -> List[Dict]:
+        """
+        Upload many job photos concurrently
+        
+        Args:
+            files: List of (file_data, filename)
+            job_id: Job ID
+            photo_type: 'before' or 'after'
+            
+        Returns:
+            One {"filename", "url"} per file, in input order; url is None if that upload failed
+        """
+        futures = [
+            self.executor.submit(self.upload_job_photo, file_data, job_id, photo_type, filename)
+            for file_data, filename in files
+        ]
+        return [
+            {"filename": filename, "url": future.result()}
+            for (_, filename), future in zip(files, futures)
+        ]
+    
+    def upload_crew_documents(self, documents: Dict[str, tuple], crew_id: str) -> Dict[str, Optional[str]]:
+        """
+        Upload crew registration documents concurrently
+        
+        Args:
+            documents: Dict of doc_type -> (file_data, filename)
+            crew_id: Crew member ID
+            
+        Returns:
+            Dict of doc_type -> public URL (None if that upload failed)
+        """
+        futures = {
+            doc_type: self.executor.submit(self.upload_crew_document, file_data, crew_id, doc_type, filename)
+            for doc_type, (file_data, filename) in documents.items()
+        }
+        return {doc_type: future.result() for doc_type, future in futures.items()}
+    
     def upload_crew_profile_photo(self, file_data, crew_id: str, filename: str) -> Optional[str]:
         """
         Upload crew profile photo
@@ -136,6 +204,16 @@ class UthoStorage:
         except Exception as e:
             print(f"Error deleting file: {e}")
             return False
+    
+    def delete_files(self, file_urls: List[str]) -> int:
+        """
+        Delete many files concurrently (e.g. uploads whose database changes were rolled back)
+        
+        Returns:
+            Number of files deleted
+        """
+        futures = [self.executor.submit(self.delete_file, file_url) for file_url in file_urls]
+        return sum(1 for future in futures if future.result())
 
 # Singleton instance
 storage = UthoStorage()
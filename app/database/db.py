@@ -1,6 +1,7 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from app.database.pool_metrics import MeteredQueuePool, ReplicaQueuePool, pool_metrics, replica_pool_metrics
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -24,14 +25,39 @@ if not DATABASE_URL:
 
 print(f"Using DATABASE_URL: {DATABASE_URL[:50]}...")
 
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=3600,
-    pool_size=5,
-    max_overflow=10,
-    connect_args={"connect_timeout": 10} if "postgresql" in DATABASE_URL else {}
-)
+# Connections per process: pool_size kept open plus up to max_overflow more under load.
+# Size against THREADPOOL_SIZE and the PgBouncer pool, using /api/admin/system/db-pool
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Seconds a request waits for a free connection before failing
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+
+# Optional streaming replica that read-only endpoints can use (see app.database.replica)
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+
+
+def _create_engine(url: str, poolclass):
+    return create_engine(
+        url,
+        poolclass=poolclass,
+        pool_pre_ping=True,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        connect_args={"connect_timeout": 10} if "postgresql" in url else {}
+    )
+
+
+engine = _create_engine(DATABASE_URL, MeteredQueuePool)
+pool_metrics.attach(engine)
+
+replica_engine = _create_engine(DATABASE_REPLICA_URL, ReplicaQueuePool) if DATABASE_REPLICA_URL else None
+if replica_engine is not None:
+    replica_pool_metrics.attach(replica_engine)
+    print(f"Using DATABASE_REPLICA_URL: {DATABASE_REPLICA_URL[:50]}...")
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -0,0 +1,141 @@
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+import threading
+import time
+
+# Upper bounds (ms) of the checkout wait histogram buckets
+CHECKOUT_WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class PoolMetrics:
+    """
+    Checkout waits, connections in use and overflow for the engine's pool
+
+    Waits are timed by MeteredQueuePool and include opening a new
+    connection when the pool has none idle; the rest comes from pool
+    event listeners. All counters are totals since the process started.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._engine = None
+        self.checkouts = 0
+        self.checkins = 0
+        self.overflow_checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.peak_in_use = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+        self._wait_buckets = [0] * (len(CHECKOUT_WAIT_BUCKETS_MS) + 1)
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        milliseconds = seconds * 1000
+        bucket = next(
+            (n for n, bound in enumerate(CHECKOUT_WAIT_BUCKETS_MS) if milliseconds <= bound),
+            len(CHECKOUT_WAIT_BUCKETS_MS)
+        )
+        with self._lock:
+            self._wait_buckets[bucket] += 1
+            self._wait_seconds += seconds
+            self._max_wait_seconds = max(self._max_wait_seconds, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        pool = self._engine.pool
+        in_use = pool.checkedout()
+        with self._lock:
+            self.checkouts += 1
+            self.peak_in_use = max(self.peak_in_use, in_use)
+            if in_use > pool.size():
+                self.overflow_checkouts += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checkins += 1
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def attach(self, engine):
+        """Listen to the engine's pool (the listeners follow it across engine.dispose())"""
+        self._engine = engine
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "invalidate", self._on_invalidate)
+
+    def wait_histogram(self) -> list:
+        """Cumulative (upper bound ms or None for +Inf, checkouts) pairs"""
+        with self._lock:
+            buckets = list(self._wait_buckets)
+        return self._cumulative(buckets)
+
+    @staticmethod
+    def _cumulative(buckets: list) -> list:
+        total = 0
+        histogram = []
+        for bound, count in zip(CHECKOUT_WAIT_BUCKETS_MS + (None,), buckets):
+            total += count
+            histogram.append((bound, total))
+        return histogram
+
+    def stats(self) -> dict:
+        pool = self._engine.pool if self._engine else None
+        with self._lock:
+            waits = sum(self._wait_buckets)
+            return {
+                "pool_size": pool.size() if pool else None,
+                "max_overflow": getattr(pool, "_max_overflow", None),
+                "timeout_seconds": pool.timeout() if pool and hasattr(pool, "timeout") else None,
+                "in_use": pool.checkedout() if pool else 0,
+                "idle": pool.checkedin() if pool else 0,
+                "overflow": max(pool.overflow(), 0) if pool and hasattr(pool, "overflow") else 0,
+                "peak_in_use": self.peak_in_use,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "overflow_checkouts": self.overflow_checkouts,
+                "timeouts": self.timeouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "avg_wait_ms": round(self._wait_seconds / waits * 1000, 2) if waits else 0.0,
+                "max_wait_ms": round(self._max_wait_seconds * 1000, 2),
+                "wait_seconds_total": round(self._wait_seconds, 6),
+                "wait_histogram_ms": {
+                    (str(bound) if bound is not None else "+Inf"): count
+                    for bound, count in self._cumulative(self._wait_buckets)
+                },
+            }
+
+
+# Singleton instances: the primary's pool, and the read replica's when one is configured
+pool_metrics = PoolMetrics()
+replica_pool_metrics = PoolMetrics()
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool that reports how long each checkout waited to its metrics"""
+
+    metrics = pool_metrics
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        self.metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+
+class ReplicaQueuePool(MeteredQueuePool):
+    metrics = replica_pool_metrics
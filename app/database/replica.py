@@ -0,0 +1,184 @@
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.sql.elements import TextClause
+from collections import OrderedDict
+from typing import Optional
+from app.database.db import SessionLocal, engine, replica_engine
+import hashlib
+import os
+import threading
+import time
+
+# Reads fall back to the primary while the replica is further behind than this
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+# A client's reads stay on the primary this long after it made a write, so it
+# always sees its own changes; keep it above REPLICA_MAX_LAG_SECONDS
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "10"))
+# How long a replica lag measurement is reused
+REPLICA_LAG_CHECK_SECONDS = 5
+# Most recent writers remembered for stickiness
+REPLICA_STICKY_CLIENTS = 10000
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Seconds the replica is behind: 0 when it has replayed everything it received,
+# otherwise the age of the last transaction it replayed
+POSTGRES_LAG_SQL = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+def _is_read(clause) -> bool:
+    if isinstance(clause, TextClause):
+        return clause.text.lstrip().upper().startswith("SELECT")
+    return bool(getattr(clause, "is_select", False))
+
+
+class ReplicaSession(Session):
+    """
+    Session that runs SELECTs on the replica and everything else on the primary
+
+    Flushes, DML and any statement that is not plainly a SELECT go to the
+    session's own bind (the primary), so a read-only endpoint that does
+    write something still writes to the right database.
+    """
+
+    def __init__(self, *args, replica=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replica = replica
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.replica is not None and not self._flushing and _is_read(clause):
+            return self.replica
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+
+ReplicaSessionLocal = sessionmaker(
+    class_=ReplicaSession, autocommit=False, autoflush=False, bind=engine, replica=replica_engine
+)
+
+
+def client_key(request: Request) -> Optional[str]:
+    """Who is asking, for read-after-write stickiness (a digest of their bearer token)"""
+    authorization = request.headers.get("authorization")
+    if not authorization:
+        return None
+    return hashlib.sha256(authorization.encode()).hexdigest()
+
+
+class ReplicaRouter:
+    """
+    Decides per request whether reads can go to the replica
+
+    Reads use the primary when no replica is configured, while the
+    replica is more than max_lag_seconds behind (or cannot be reached),
+    and for sticky_seconds after the same client made a write. Writes are
+    recorded by the middleware in main.py; they are remembered per
+    process, which is enough while each client's requests share a worker.
+    """
+
+    def __init__(self, replica, max_lag_seconds: float, sticky_seconds: float):
+        self.replica = replica
+        self.max_lag_seconds = max_lag_seconds
+        self.sticky_seconds = sticky_seconds
+        self._lock = threading.Lock()
+        self._lag_lock = threading.Lock()
+        self._writes = OrderedDict()  # client key -> monotonic time of their last write
+        self._lag = None
+        self._lag_checked_at = 0.0
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.sticky_reads = 0
+        self.lagging_reads = 0
+        self.lag_check_errors = 0
+
+    def record_write(self, key: Optional[str]):
+        if self.replica is None or key is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._writes[key] = now
+            self._writes.move_to_end(key)
+            while self._writes and (
+                len(self._writes) > REPLICA_STICKY_CLIENTS
+                or next(iter(self._writes.values())) < now - self.sticky_seconds
+            ):
+                self._writes.popitem(last=False)
+
+    def _measure_lag(self) -> float:
+        with self.replica.connect() as conn:
+            if conn.dialect.name != "postgresql":
+                return 0.0
+            return float(conn.execute(text(POSTGRES_LAG_SQL)).scalar() or 0.0)
+
+    def lag_seconds(self) -> Optional[float]:
+        """Replica lag, measured at most every REPLICA_LAG_CHECK_SECONDS; None when it cannot be measured"""
+        due = time.monotonic() - self._lag_checked_at >= REPLICA_LAG_CHECK_SECONDS
+        # One thread measures; the others use the previous value meanwhile
+        if due and self._lag_lock.acquire(blocking=False):
+            try:
+                self._lag = self._measure_lag()
+            except Exception as e:
+                print(f"Error checking replica lag: {e}")
+                self._lag = None
+                self.lag_check_errors += 1
+            finally:
+                self._lag_checked_at = time.monotonic()
+                self._lag_lock.release()
+        return self._lag
+
+    def use_replica(self, key: Optional[str]) -> bool:
+        if self.replica is None:
+            return False
+        with self._lock:
+            written_at = self._writes.get(key) if key else None
+            sticky = written_at is not None and time.monotonic() - written_at < self.sticky_seconds
+            if sticky:
+                self.sticky_reads += 1
+                self.primary_reads += 1
+                return False
+        lag = self.lag_seconds()
+        with self._lock:
+            if lag is None or lag > self.max_lag_seconds:
+                self.lagging_reads += 1
+                self.primary_reads += 1
+                return False
+            self.replica_reads += 1
+            return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.replica is not None,
+                "max_lag_seconds": self.max_lag_seconds,
+                "sticky_seconds": self.sticky_seconds,
+                "lag_seconds": round(self._lag, 3) if self._lag is not None else None,
+                "replica_reads": self.replica_reads,
+                "primary_reads": self.primary_reads,
+                "sticky_reads": self.sticky_reads,
+                "lagging_reads": self.lagging_reads,
+                "lag_check_errors": self.lag_check_errors,
+                "sticky_clients": len(self._writes),
+            }
+
+
+# Singleton instance
+replica_router = ReplicaRouter(replica_engine, REPLICA_MAX_LAG_SECONDS, REPLICA_STICKY_SECONDS)
+
+
+def read_session_factory(request: Request):
+    """ReplicaSessionLocal when this request's reads can go to the replica, else SessionLocal"""
+    return ReplicaSessionLocal if replica_router.use_replica(client_key(request)) else SessionLocal
+
+
+def get_read_db(request: Request):
+    """get_db for read-only endpoints: SELECTs go to the replica when replica_router allows it"""
+    db = read_session_factory(request)()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,48 @@
+from sqlalchemy import Column, String, DateTime, Date, Integer, Float, Boolean
+from datetime import datetime
+from app.database.db import Base
+
+class JobRollupFact(Base):
+    """What one job currently contributes to the analytics rollups, maintained by app.core.analytics"""
+    __tablename__ = "job_rollup_facts"
+
+    job_id = Column(String, primary_key=True)
+    status = Column(String, nullable=False)
+    service_type = Column(String, nullable=True)
+    crew_id = Column(String, nullable=True)
+    deposit_day = Column(Date, nullable=True)
+    completed_day = Column(Date, nullable=True)
+    revenue = Column(Float, nullable=False, default=0.0)
+    deposit_collected = Column(Float, nullable=False, default=0.0)
+    remaining_collected = Column(Float, nullable=False, default=0.0)
+    rating = Column(Float, nullable=True)
+    # When the job was first seen with the work done (work_completed or later)
+    work_done_at = Column(DateTime, nullable=True)
+    sla_met = Column(Boolean, nullable=True)
+    job_updated_at = Column(DateTime, nullable=True)
+
+
+class DailyRollup(Base):
+    """Money and throughput per day and service type"""
+    __tablename__ = "analytics_daily"
+
+    day = Column(Date, primary_key=True)
+    service_type = Column(String, primary_key=True)
+    jobs_completed = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+    deposits_collected = Column(Float, nullable=False, default=0.0)
+    remaining_collected = Column(Float, nullable=False, default=0.0)
+    sla_met = Column(Integer, nullable=False, default=0)
+    sla_breached = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class CrewRollup(Base):
+    """Completed jobs and ratings per crew member"""
+    __tablename__ = "analytics_crew"
+
+    crew_id = Column(String, primary_key=True)
+    jobs_completed = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Float, nullable=False, default=0.0)
+    rating_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, Index, text
 from datetime import datetime
 from app.database.db import Base
 import uuid
@@ -19,6 +19,12 @@ class Crew(Base):
     right_to_work = Column(String)
     is_approved = Column(Boolean, default=False)
     status = Column(String, default="available")  # available, assigned, unavailable
+    # Where the crew member is based, and the location of the last job they were assigned
+    # (used by app.core.crew_recommender)
+    home_latitude = Column(Float, nullable=True)
+    home_longitude = Column(Float, nullable=True)
+    last_latitude = Column(Float, nullable=True)
+    last_longitude = Column(Float, nullable=True)
     reset_otp = Column(String, nullable=True)
     reset_otp_expiry = Column(DateTime, nullable=True)
     reset_token = Column(String, nullable=True)
@@ -26,6 +32,17 @@ class Crew(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_crew_approved_status_name", is_approved, status, full_name),
+        Index(
+            "ix_crew_pending_created_at",
+            created_at.desc(), id.desc(),
+            postgresql_where=text("is_approved = false")
+        ),
+        Index("ix_crew_reset_token", reset_token, postgresql_where=text("reset_token IS NOT NULL")),
+        Index("ix_crew_phone_number", phone_number, postgresql_where=text("phone_number IS NOT NULL")),
+    )
+
 class Admin(Base):
     __tablename__ = "admins"
 
@@ -44,3 +61,8 @@ class Admin(Base):
     reset_token_expiry = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_admins_reset_token", reset_token, postgresql_where=text("reset_token IS NOT NULL")),
+        Index("ix_admins_phone_number", phone_number, postgresql_where=text("phone_number IS NOT NULL")),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Float, DateTime
+from sqlalchemy import Column, String, Float, DateTime, ForeignKey, Index
 from sqlalchemy.types import Numeric
 from sqlalchemy.dialects.postgresql import UUID
 from datetime import datetime, timezone
@@ -9,11 +9,18 @@ class Invoice(Base):
     __tablename__ = "invoices"
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    job_id = Column(String, nullable=False)
-    client_id = Column(UUID(as_uuid=True), nullable=True)
+    job_id = Column(String, ForeignKey("jobs.id", name="fk_invoices_job_id"), nullable=False)
+    client_id = Column(UUID(as_uuid=True), ForeignKey("clients.id", name="fk_invoices_client_id", ondelete="SET NULL"), nullable=True)
     invoice_number = Column(String, unique=True, nullable=False)
     pdf_path = Column(String, nullable=True)
     amount = Column(Numeric(10, 2), nullable=False)
     status = Column(String, default="generated")
     generated_by = Column(String, nullable=False)
     generated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    # sha256 of the rendered invoice content; unchanged hash means the stored PDF is current
+    content_hash = Column(String, nullable=True)
+
+    __table_args__ = (
+        Index("idx_invoices_client_id", client_id),
+        Index("ix_invoices_job_id_generated_at", job_id, generated_at.desc()),
+    )
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, String, Text, DateTime, Integer, Float, Boolean
+from sqlalchemy import Column, String, Text, DateTime, Integer, Float, Boolean, ForeignKey, Index, text
+from sqlalchemy.dialects.postgresql import UUID
 from datetime import datetime
 from app.database.db import Base
 import uuid
@@ -7,7 +8,7 @@ class Job(Base):
     __tablename__ = "jobs"
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    client_id = Column(String, nullable=True)
+    client_id = Column(UUID(as_uuid=True), ForeignKey("clients.id", name="fk_jobs_client_id", ondelete="SET NULL"), nullable=True)
     service_type = Column(String, nullable=False)
     property_address = Column(Text, nullable=False)
     preferred_date = Column(String, nullable=False)
@@ -30,5 +31,31 @@ class Job(Base):
     rating = Column(Float, nullable=True)
     latitude = Column(Float, nullable=True)
     longitude = Column(Float, nullable=True)
+    sla_deadline = Column(DateTime, nullable=True)
+    work_completed_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Bumped by every update made here, which is made conditional on it (see app.core.job_state)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+    # Matched to the router queries (see migrations/versions/0002_query_indexes.py)
+    __table_args__ = (
+        Index("idx_jobs_client_id", client_id),
+        Index("ix_jobs_status_created_at", status, created_at.desc(), id.desc()),
+        Index("ix_jobs_status_updated_at", status, updated_at.desc(), id.desc()),
+        Index("ix_jobs_assigned_crew_created_at", assigned_crew_id, created_at.desc()),
+        Index(
+            "ix_jobs_unassigned_deposit_paid",
+            created_at.desc(),
+            postgresql_where=text("status = 'deposit_paid' AND assigned_crew_id IS NULL")
+        ),
+        # At risk / breached lookups (see app.core.sla); only jobs whose SLA clock is running
+        Index(
+            "ix_jobs_open_sla_deadline",
+            sla_deadline,
+            postgresql_where=text(
+                "status NOT IN ('work_completed', 'job_verified', 'payment_pending', 'job_completed', 'cancelled')"
+            )
+        ),
+    )
+    __mapper_args__ = {"version_id_col": version}
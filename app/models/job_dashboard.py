@@ -0,0 +1,36 @@
+from sqlalchemy import Column, String, Text, DateTime, Integer, Index, text
+from datetime import datetime
+from app.database.db import Base
+
+class JobDashboard(Base):
+    """Denormalized admin dashboard row per job, maintained by app.core.job_state"""
+    __tablename__ = "job_dashboard"
+
+    job_id = Column(String, primary_key=True)
+    status = Column(String, nullable=False)
+    status_label = Column(String, nullable=False)
+    action = Column(String, nullable=False)
+    client_name = Column(String, nullable=False)
+    crew_name = Column(String, nullable=False)
+    property_address = Column(Text, nullable=True)
+    assigned_crew_id = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=True)
+    job_updated_at = Column(DateTime, nullable=True)
+    projected_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index(
+            "idx_job_dashboard_open",
+            created_at.desc(), job_id.desc(),
+            postgresql_where=text("status NOT IN ('job_completed', 'cancelled')")
+        ),
+    )
+
+
+class DashboardCounter(Base):
+    """Number of jobs per dashboard summary bucket, kept in step with job_dashboard"""
+    __tablename__ = "dashboard_counters"
+
+    bucket = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
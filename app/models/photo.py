@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime
+from sqlalchemy import Column, String, DateTime, Index
 from datetime import datetime
 from app.database.db import Base
 import uuid
@@ -11,3 +11,7 @@ class JobPhoto(Base):
     photo_url = Column(String, nullable=False)
     type = Column(String, nullable=False)  # "before" or "after"
     timestamp = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_job_photos_job_id_type", job_id, type),
+    )
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, String, DateTime, ForeignKey, Index, UniqueConstraint
+from datetime import datetime
+from app.database.db import Base
+import uuid
+
+class SlaEscalation(Base):
+    """One admin notification per job and SLA level ("at_risk", "breached"), written by app.core.sla"""
+    __tablename__ = "sla_escalations"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    job_id = Column(String, ForeignKey("jobs.id", name="fk_sla_escalations_job_id", ondelete="CASCADE"), nullable=False)
+    level = Column(String, nullable=False)
+    sla_deadline = Column(DateTime, nullable=False)
+    escalated_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Also answers the monitor's "already escalated?" anti-join
+        UniqueConstraint("job_id", "level", name="uq_sla_escalations_job_level"),
+        Index("ix_sla_escalations_escalated_at", escalated_at.desc(), id.desc()),
+    )
@@ -1,14 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import RedirectResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from app.database.db import get_db
+from app.database.replica import get_read_db, read_session_factory, replica_router
+from app.database.pool_metrics import pool_metrics, replica_pool_metrics
 from app.models.crew import Admin, Crew
 from app.models.job import Job
 from app.models.photo import JobPhoto
-from app.core.security import get_current_user
-from sqlalchemy import text
+from app.models.job_dashboard import JobDashboard
+from app.models.sla import SlaEscalation
+from app.core.security import (
+    Principal, STREAM_TOKEN_EXPIRE_SECONDS, create_stream_token, get_current_admin, get_stream_admin,
+    principal_cache, password_hasher
+)
+from app.core.lookups import JobRefs, available_crew_with_job_counts, client_key, fetch_clients, fetch_crew_job_counts
+from app.core.job_state import check_transition, transition, summary_counts, CLOSED_STATUSES
+from app.core.job_events import job_events
+from app.core.reference_data import reference_data, REFERENCE_TABLES
+from app.core.mail_queue import mail_queue
+from app.core.invoice_pipeline import invoice_pipeline, INVOICE_STATUSES
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate, keyset_sql, next_cursor_sql, set_next_cursor
+from app.core.exports import EXPORT_BATCH_SIZE, batched, export_response
+from app.core.crew_recommender import crew_index
+from app.core.assignment import apply_assignments, claim_crew, solve_assignments, unassigned_jobs
+from app.core.sla import SLA_FILTER_STATES, check_sla_filter, sla_filter, sla_state, countdown, sla_monitor
+from sqlalchemy import text, func
 from pydantic import BaseModel
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
+import asyncio
+import json
 
 router = APIRouter()
 
@@ -126,97 +147,262 @@ class ApproveJobRequest(BaseModel):
 class SendFinalPriceRequest(BaseModel):
     remaining_amount: float
 
+class RegenerateInvoicesRequest(BaseModel):
+    date_from: datetime
+    date_to: datetime
+    force: bool = False
+
+class CrewAssignmentPair(BaseModel):
+    job_id: str
+    crew_id: str
+
+class BatchAssignCrewRequest(BaseModel):
+    # Either explicit pairs, or auto=True to match unassigned jobs (all, or only job_ids) to available crew
+    assignments: List[CrewAssignmentPair] = []
+    auto: bool = False
+    job_ids: Optional[List[str]] = None
+    dry_run: bool = False
+
+
+def filter_jobs(query, date_column, status: Optional[str], crew_id: Optional[str],
+                date_from: Optional[datetime], date_to: Optional[datetime], model=Job):
+    """Apply the optional status / crew / date range list filters to a Job (or JobDashboard) query"""
+    if status:
+        query = query.filter(model.status == status)
+    if crew_id:
+        query = query.filter(model.assigned_crew_id == crew_id)
+    if date_from:
+        query = query.filter(date_column >= date_from)
+    if date_to:
+        query = query.filter(date_column <= date_to)
+    return query
+
+def filter_jobs_sql(date_column: str, status: Optional[str], crew_id: Optional[str],
+                    date_from: Optional[datetime], date_to: Optional[datetime]):
+    """Raw SQL equivalent of filter_jobs() for queries over "jobs j" """
+    clauses = []
+    params = {}
+    if status:
+        clauses.append("AND j.status = :status")
+        params["status"] = status
+    if crew_id:
+        clauses.append("AND j.assigned_crew_id = :crew_id")
+        params["crew_id"] = crew_id
+    if date_from:
+        clauses.append(f"AND {date_column} >= :date_from")
+        params["date_from"] = date_from
+    if date_to:
+        clauses.append(f"AND {date_column} <= :date_to")
+        params["date_to"] = date_to
+    return " ".join(clauses), params
+
+# Payment list queries, shared by the paginated endpoints and the exports.
+# {filters} and {keyset} take filter_jobs_sql() / keyset_sql() fragments, {limit} an optional LIMIT.
+COMPLETED_PAYMENTS_SQL = """
+    SELECT 
+        j.id, j.property_address, j.service_type, j.quote_amount,
+        j.deposit_amount, j.remaining_amount, j.updated_at,
+        c.company_name, c.email
+    FROM jobs j
+    LEFT JOIN clients c ON c.id = j.client_id
+    WHERE j.status = 'job_completed' {filters} {keyset}
+    ORDER BY j.updated_at DESC NULLS FIRST, j.id DESC
+    {limit}
+"""
+
+PENDING_PAYMENTS_SQL = """
+    SELECT 
+        j.id, j.property_address, j.service_type, j.quote_amount,
+        j.deposit_amount, j.remaining_amount, j.status, c.full_name, c.email,
+        j.created_at
+    FROM jobs j
+    LEFT JOIN clients c ON c.id = j.client_id
+    WHERE j.status IN ('quote_accepted', 'deposit_paid', 'crew_assigned', 'crew_arrived', 'before_photo', 'clearance_in_progress', 'after_photo', 'work_completed', 'job_verified', 'payment_pending')
+        {filters} {keyset}
+    ORDER BY j.created_at DESC NULLS FIRST, j.id DESC
+    {limit}
+"""
+
+def completed_payment(r) -> dict:
+    """A COMPLETED_PAYMENTS_SQL row as returned by the API"""
+    service_type_name = reference_data.service_type_name(r[2], r[2])
+    
+    return {
+        "job_id": r[0],
+        "client_name": r[7] or "Unknown Client",
+        "client_email": r[8] or "",
+        "property_address": r[1],
+        "service_type": service_type_name,
+        "total_amount": float(r[3]) if r[3] else 0.0,
+        "deposit_paid": float(r[4]) if r[4] else 0.0,
+        "remaining_paid": float(r[5]) if r[5] else 0.0,
+        "completed_at": r[6].strftime("%m/%d/%Y") if r[6] else "",
+        "status": "Remaining Amount Paid"
+    }
+
+def pending_payment(r) -> dict:
+    """A PENDING_PAYMENTS_SQL row as returned by the API"""
+    service_type_name = reference_data.service_type_name(r[2], r[2])
+    
+    job_status = r[6]
+    deposit_amount = float(r[4]) if r[4] else 0.0
+    remaining_amount = float(r[5]) if r[5] else 0.0
+    total_amount = float(r[3]) if r[3] else 0.0
+    
+    # Calculate remaining amount if not set
+    if remaining_amount == 0.0 and total_amount > 0.0 and deposit_amount > 0.0:
+        remaining_amount = total_amount - deposit_amount
+    
+    # Determine payment status based on job status
+    if job_status == "quote_accepted":
+        payment_type = "Deposit Payment Pending"
+        amount_due = deposit_amount
+        status = "Pending"
+    elif job_status in ["deposit_paid", "crew_assigned", "crew_arrived", "before_photo", "clearance_in_progress", "after_photo", "work_completed", "job_verified"]:
+        payment_type = "Deposit Paid"
+        amount_due = 0.0
+        status = "Deposit Paid"
+    elif job_status == "payment_pending":
+        payment_type = "Remaining Amount Pending"
+        amount_due = remaining_amount
+        status = "Pending"
+    else:
+        payment_type = "Unknown"
+        amount_due = 0.0
+        status = "Unknown"
+    
+    return {
+        "job_id": r[0],
+        "client_name": r[7] or "Unknown Client",
+        "client_email": r[8] or "",
+        "property_address": r[1],
+        "service_type": service_type_name,
+        "total_amount": total_amount,
+        "deposit_amount": deposit_amount,
+        "remaining_amount": remaining_amount,
+        "amount_due": amount_due,
+        "payment_type": payment_type,
+        "status": status
+    }
 
 
 @router.get("/admin/dashboard/active-jobs", response_model=List[ActiveJobResponse], tags=["Admin"])
-async def get_active_jobs_dashboard(
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+def get_active_jobs_dashboard(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    status: Optional[str] = None,
+    crew_id: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    admin: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_read_db)
 ):
-    admin = db.query(Admin).filter(Admin.email == current_user.get("sub")).first()
-    if not admin:
-        raise HTTPException(status_code=403, detail="Admin access required")
+    # Read the precomputed dashboard projection (see app.core.job_state) for open jobs
+    query = db.query(JobDashboard).filter(
+        JobDashboard.status.notin_(CLOSED_STATUSES)
+    )
+    query = filter_jobs(query, JobDashboard.created_at, status, crew_id, date_from, date_to, model=JobDashboard)
+    rows, next_cursor = paginate(query, JobDashboard.created_at, JobDashboard.job_id, cursor, limit)
+    set_next_cursor(response, next_cursor)
     
-    # Get all jobs that are not completed or cancelled
-    jobs = db.query(Job).filter(
-        Job.status.notin_(["job_completed", "cancelled"])
-    ).order_by(Job.created_at.desc()).all()
+    return [
+        {
+            "job_id": row.job_id,
+            "client": row.client_name,
+            "property": row.property_address,
+            "crew": row.crew_name,
+            "status": row.status_label,
+            "action": row.action
+        }
+        for row in rows
+    ]
+
+@router.get("/admin/dashboard/summary", tags=["Admin"], summary="Get Dashboard Summary Counts")
+def get_dashboard_summary(
+    admin: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_read_db)
+):
+    """Job totals per dashboard bucket, read from the incrementally maintained counters"""
+    return summary_counts(db)
+
+@router.post("/admin/events/token", tags=["Admin"], summary="Get a Token for Opening the Job Events Stream")
+def create_job_events_token(admin: Principal = Depends(get_current_admin)):
+    """
+    Short-lived token for GET /api/admin/events/jobs?token=..., for browsers' EventSource
+
+    EventSource cannot send the Authorization header. The token is only
+    checked when the stream is opened, so it expires after
+    STREAM_TOKEN_EXPIRE_SECONDS; fetch a new one before reconnecting.
+    """
+    return {
+        "token": create_stream_token({"sub": admin.email, "role": "Admin"}),
+        "expires_in": STREAM_TOKEN_EXPIRE_SECONDS
+    }
+
+@router.get("/admin/events/jobs", tags=["Admin"], summary="Live Job Status Events (Server-Sent Events)")
+async def stream_job_events(
+    request: Request,
+    admin: Principal = Depends(get_stream_admin)
+):
+    """
+    Server-Sent Events stream of job status changes for the live job board
+
+    Each event is a "job_status" message with the job id, previous and new
+    status and the dashboard label/action, so clients can patch their view
+    instead of polling the list endpoints. A comment line is sent every
+    15 seconds to keep proxies from closing an idle connection.
+
+    Authenticated by the usual bearer token or, for a browser's
+    EventSource, by ?token= from POST /api/admin/events/token:
+
+        const { token } = await (await fetch("/api/admin/events/token", { method: "POST", headers })).json();
+        const events = new EventSource(`/api/admin/events/jobs?token=${encodeURIComponent(token)}`);
+
+    On an error event, close it and open a new one with a fresh token.
+    """
+    # async (unlike the other handlers) so waiting connections hold no thread pool slot
+    subscription = job_events.subscribe()
     
-    result = []
-    for job in jobs:
-        # Get client info from client backend database
-        client_name = "Client"
+    async def event_stream():
         try:
-            client_result = db.execute(
-                text("SELECT full_name FROM clients WHERE id::text = :id"),
-                {"id": job.client_id}
-            ).fetchone()
-            if client_result:
-                client_name = client_result[0]
-        except:
-            pass
-        
-        # Get assigned crew names
-        crew_names = "Not assigned"
-        if job.assigned_crew_id:
-            crew = db.query(Crew).filter(Crew.id == job.assigned_crew_id).first()
-            if crew:
-                crew_names = crew.full_name
-        
-        # Determine status and action based on job workflow
-        if job.status == "job_created" and not job.assigned_crew_id:
-            # New request needs quote
-            status_display = "Needs Quote"
-            action = "Create Quote"
-        elif job.status == "quote_sent":
-            # Quote sent, waiting for client approval
-            status_display = "Quote Sent"
-            action = "No action needed"
-        elif job.status == "quote_accepted":
-            # Waiting for deposit payment
-            status_display = "Awaiting Deposit"
-            action = "Wait for Payment"
-        elif job.status == "deposit_paid":
-            # Ready to assign crew
-            status_display = "Deposit Paid"
-            action = "Assign Crew"
-        elif job.status == "deposit_paid":
-            # Crew assigned
-            status_display = "Crew Assigned"
-            action = "No action needed"
-        elif job.status in ["crew_arrived", "before_photo", "clearance_in_progress", "after_photo"]:
-            # Crew working on site
-            status_display = "Work In Progress"
-            action = "No action needed"
-        elif job.status == "work_completed":
-            # Work done, needs final price
-            status_display = "Work Done - Set Price"
-            action = "Set Final Price"
-        else:
-            status_display = job.status
-            action = "Review"
-        
-        result.append({
-            "job_id": job.id,
-            "client": client_name,
-            "property": job.property_address,
-            "crew": crew_names,
-            "status": status_display,
-            "action": action
-        })
-    
-    return result
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(subscription.queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"id: {message['id']}\nevent: {message['type']}\ndata: {json.dumps(message, default=str)}\n\n"
+        finally:
+            job_events.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.get("/admin/crew/pending", response_model=List[PendingCrewResponse], tags=["Admin"], summary="Get All Pending User Approvals")
-async def get_pending_crew(
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+def get_pending_crew(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    status: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    admin: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_read_db)
 ):
-    admin = db.query(Admin).filter(Admin.email == current_user.get("sub")).first()
-    if not admin:
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
-    pending_crew = db.query(Crew).filter(Crew.is_approved == False).all()
+    query = db.query(Crew).filter(Crew.is_approved == False)
+    if status:
+        query = query.filter(Crew.status == status)
+    if date_from:
+        query = query.filter(Crew.created_at >= date_from)
+    if date_to:
+        query = query.filter(Crew.created_at <= date_to)
+    pending_crew, next_cursor = paginate(query, Crew.created_at, Crew.id, cursor, limit)
+    set_next_cursor(response, next_cursor)
     
     return [
         {
@@ -230,120 +416,86 @@ async def get_pending_crew(
     ]
 
 @router.get("/admin/crew/pending/{crew_id}", response_model=PendingCrewDetailResponse, tags=["Admin"])
-async def get_pending_crew_by_id(
+def get_pending_crew_by_id(
     crew_id: str,
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    admin: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_read_db)
 ):
-    admin = db.query(Admin).filter(Admin.email == current_user.get("sub")).first()
-    if not admin:
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
     crew = db.query(Crew).filter(Crew.id == crew_id, Crew.is_approved == False).first()
     if not crew:
         raise HTTPException(status_code=404, detail="Pending crew not found")
     
+    business_address = db.query(Admin.business_address).filter(Admin.id == admin.id).scalar()
+    
     return {
         "id": crew.id,
         "full_name": crew.full_name,
         "email": crew.email,
         "phone_number": crew.phone_number or "",
-        "address": admin.business_address if admin.business_address else "",
+        "address": business_address if business_address else "",
         "role": "Crew",
         "applied": crew.created_at.strftime("%m/%d/%Y") if crew.created_at else ""
     }
 
 @router.put("/admin/crew/{crew_id}/approve", tags=["Admin"])
-async def approve_crew(
+def approve_crew(
     crew_id: str,
-    current_user: dict = Depends(get_current_user),
+    admin: Principal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    admin = db.query(Admin).filter(Admin.email == current_user.get("sub")).first()
-    if not admin:
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
     crew = db.query(Crew).filter(Crew.id == crew_id).first()
     if not crew:
         raise HTTPException(status_code=404, detail="Crew not found")
     
     crew.is_approved = True
     db.commit()
+    principal_cache.invalidate(crew.email)
+    crew_index.invalidate()
     
     return {"message": f"Crew {crew.full_name} approved successfully"}
 
 @router.delete("/admin/crew/{crew_id}/reject", tags=["Admin"])
-async def reject_crew(
+def reject_crew(
     crew_id: str,
-    current_user: dict = Depends(get_current_user),
+    admin: Principal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    admin = db.query(Admin).filter(Admin.email == current_user.get("sub")).first()
-    if not admin:
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
     crew = db.query(Crew).filter(Crew.id == crew_id).first()
     if not crew:
         raise HTTPException(status_code=404, detail="Crew not found")
     
     db.delete(crew)
     db.commit()
+    principal_cache.invalidate(crew.email)
+    crew_index.invalidate()
     
     return {"message": f"Crew {crew.full_name} rejected and removed"}
 
 @router.get("/admin/quotes", response_model=List[QuoteResponse], tags=["Admin"], summary="Get All Quotes Created")
-async def get_all_quotes(
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+def get_all_quotes(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    admin: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_read_db)
 ):
-    admin = db.query(Admin).filter(Admin.email == current_user.get("sub")).first()
-    if not admin:
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
     # Get all jobs - only job_created status (awaiting quotes)
-    jobs = db.query(Job).filter(
+    query = db.query(Job).filter(
         Job.status == "job_created"
-    ).order_by(Job.created_at.desc()).all()
+    )
+    query = filter_jobs(query, Job.created_at, None, None, date_from, date_to)
+    jobs, next_cursor = paginate(query, Job.created_at, Job.id, cursor, limit)
+    set_next_cursor(response, next_cursor)
+    
+    refs = JobRefs(db, jobs)
     
     result = []
     for job in jobs:
-        client_name = "Client"
-        try:
-            client_result = db.execute(
-                text("SELECT full_name FROM clients WHERE id = :id"),
-                {"id": job.client_id}
-            ).fetchone()
-            if client_result:
-                client_name = client_result[0]
-        except:
-            pass
-        
-        # Get service type name
-        service_type_name = job.service_type
-        try:
-            service_result = db.execute(
-                text("SELECT name FROM service_types WHERE id = :id"),
-                {"id": job.service_type}
-            ).fetchone()
-            if service_result:
-                service_type_name = service_result[0]
-        except:
-            pass
-        
-        # Get urgency level name and SLA hours
-        urgency_name = ""
-        sla_hours = ""
-        if job.urgency_level:
-            try:
-                urgency_result = db.execute(
-                    text("SELECT name, sla_hours FROM urgency_levels WHERE id = :id"),
-                    {"id": job.urgency_level}
-                ).fetchone()
-                if urgency_result:
-                    urgency_name = urgency_result[0]
-                    sla_hours = f"{urgency_result[1]}hr"
-            except:
-                pass
+        client_name = refs.client_field(job, "full_name", "Client")
+        service_type_name = refs.service_type_name(job)
+        urgency_name, sla_hours = refs.urgency(job)
         
         result.append({
             "quote_id": job.id,
@@ -365,31 +517,20 @@ async def get_all_quotes(
     return result
 
 @router.get("/admin/quotes/sent", tags=["Admin"], summary="Get All Sent Quotes Awaiting Client Response")
-async def get_sent_quotes(
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+def get_sent_quotes(
+    admin: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_read_db)
 ):
-    admin = db.query(Admin).filter(Admin.email == current_user.get("sub")).first()
-    if not admin:
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
     # Get all jobs with quote_sent status
     jobs = db.query(Job).filter(
         Job.status == "quote_sent"
     ).order_by(Job.created_at.desc()).all()
     
+    refs = JobRefs(db, jobs)
+    
     result = []
     for job in jobs:
-        client_name = "Client"
-        try:
-            client_result = db.execute(
-                text("SELECT company_name FROM clients WHERE id = :id"),
-                {"id": job.client_id}
-            ).fetchone()
-            if client_result:
-                client_name = client_result[0]
-        except:
-            pass
+        client_name = refs.client_field(job, "company_name", "Client")
         
         # Calculate remaining amount
         total_amount = job.quote_amount if job.quote_amount else 0.0
@@ -397,14 +538,9 @@ async def get_sent_quotes(
         remaining_amount = total_amount - deposit_amount
         
         # Get admin who sent the quote
-        quoted_by = "Admin"
-        if job.assigned_by:
-            admin_user = db.query(Admin).filter(Admin.id == job.assigned_by).first()
-            if admin_user:
-                quoted_by = admin_user.full_name if hasattr(admin_user, 'full_name') else "Admin"
+        quoted_by = refs.admin_name(job)
         
         # Calculate valid until (24 hours from sent time)
-        from datetime import timedelta
         valid_until = ""
         if job.updated_at:
             valid_until_date = job.updated_at + timedelta(hours=24)
@@ -426,41 +562,31 @@ async def get_sent_quotes(
     return result
 
 @router.get("/admin/quotes/accepted", tags=["Admin"], summary="Get All Accepted Quotes")
-async def get_accepted_quotes(
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+def get_accepted_quotes(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    status: Optional[str] = None,
+    crew_id: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    admin: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_read_db)
 ):
-    admin = db.query(Admin).filter(Admin.email == current_user.get("sub")).first()
-    if not admin:
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
-    # Get all jobs (for debugging)
-    all_jobs = db.query(Job).all()
-    print(f"Total jobs in database: {len(all_jobs)}")
-    for j in all_jobs:
-        print(f"Job {j.id}: status={j.status}")
-    
     # Get all jobs that are accepted (including verified jobs awaiting final payment)
-    jobs = db.query(Job).filter(
+    query = db.query(Job).filter(
         Job.status.in_(["quote_accepted", "deposit_paid", "crew_assigned", "crew_arrived", "before_photo", "clearance_in_progress", "after_photo", "work_completed", "job_verified", "payment_pending"])
-    ).order_by(Job.updated_at.desc()).all()
+    )
+    query = filter_jobs(query, Job.updated_at, status, crew_id, date_from, date_to)
+    jobs, next_cursor = paginate(query, Job.updated_at, Job.id, cursor, limit)
+    set_next_cursor(response, next_cursor)
     
-    print(f"Filtered accepted jobs: {len(jobs)}")
+    refs = JobRefs(db, jobs)
     
     result = []
     for job in jobs:
-        client_name = "Client"
-        client_email = ""
-        try:
-            client_result = db.execute(
-                text("SELECT full_name, email FROM clients WHERE id = :id"),
-                {"id": job.client_id}
-            ).fetchone()
-            if client_result:
-                client_name = client_result[0]
-                client_email = client_result[1] if len(client_result) > 1 else ""
-        except:
-            pass
+        client_name = refs.client_field(job, "full_name", "Client")
+        client_email = refs.client_field(job, "email", "")
         
         total_amount = job.quote_amount if job.quote_amount else 0.0
         deposit_amount = job.deposit_amount if job.deposit_amount else 0.0
@@ -470,23 +596,13 @@ async def get_accepted_quotes(
         payment_status = "Pending"
         paid_on = ""
         deposit_paid_amount = 0.0
-        try:
-            payment_result = db.execute(
-                text("SELECT payment_status, paid_at FROM payments WHERE job_id = :job_id AND payment_type = 'deposit' AND payment_status = 'succeeded'"),
-                {"job_id": job.id}
-            ).fetchone()
-            if payment_result:
-                payment_status = "Paid"
-                paid_on = payment_result[1].isoformat() if payment_result[1] else ""
-                deposit_paid_amount = deposit_amount
-        except:
-            pass
+        if refs.deposit_paid(job):
+            paid_at = refs.deposit_paid_at(job)
+            payment_status = "Paid"
+            paid_on = paid_at.isoformat() if paid_at else ""
+            deposit_paid_amount = deposit_amount
         
-        quoted_by = "Admin"
-        if job.assigned_by:
-            admin_user = db.query(Admin).filter(Admin.id == job.assigned_by).first()
-            if admin_user:
-                quoted_by = admin_user.full_name if hasattr(admin_user, 'full_name') else "Admin"
+        quoted_by = refs.admin_name(job)
         
         quoted_on = job.created_at.isoformat() if job.created_at else ""
         accepted_on = job.updated_at.isoformat() if job.updated_at else ""
@@ -511,27 +627,22 @@ async def get_accepted_quotes(
     return result
 
 @router.post("/admin/quotes/{job_id}/send", tags=["Admin"], summary="Send Quote to Client")
-async def send_quote(
+def send_quote(
     job_id: str,
     quote_data: SendQuoteRequest,
-    current_user: dict = Depends(get_current_user),
+    admin: Principal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    admin = db.query(Admin).filter(Admin.email == current_user.get("sub")).first()
-    if not admin:
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
     job = db.query(Job).filter(Job.id == job_id).first()
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    if job.status != "job_created":
-        raise HTTPException(status_code=400, detail="Quote already sent for this job")
+    check_transition(job, "send_quote", "Quote already sent for this job")
     
     job.quote_amount = quote_data.quote_amount
     job.deposit_amount = quote_data.deposit_amount
     job.quote_notes = quote_data.quote_notes
-    job.status = "quote_sent"
+    transition(db, job, "send_quote")
     
     db.commit()
     
@@ -544,23 +655,12 @@ async def send_quote(
     }
 
 @router.get("/admin/crew/available", response_model=List[AvailableCrewResponse], tags=["Admin"], summary="Get Available Crew Members")
-async def get_available_crew(
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+def get_available_crew(
+    admin: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_read_db)
 ):
-    admin = db.query(Admin).filter(Admin.email == current_user.get("sub")).first()
-    if not admin:
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
-    crew_members = db.query(Crew).filter(
-        Crew.is_approved == True,
-        Crew.status == "available"
-    ).all()
-    
     result = []
-    for crew in crew_members:
-        total_jobs = db.query(Job).filter(Job.assigned_crew_id == crew.id).count()
-        
+    for crew, total_jobs, _ in available_crew_with_job_counts(db):
         result.append({
             "id": crew.id,
             "full_name": crew.full_name,
@@ -572,34 +672,34 @@ async def get_available_crew(
     return result
 
 @router.post("/admin/jobs/{job_id}/assign-crew/{crew_id}", tags=["Admin"], summary="Assign Crew to Job")
-async def assign_crew_to_job(
+def assign_crew_to_job(
     job_id: str,
     crew_id: str,
-    current_user: dict = Depends(get_current_user),
+    admin: Principal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    admin = db.query(Admin).filter(Admin.email == current_user.get("sub")).first()
-    if not admin:
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
     job = db.query(Job).filter(Job.id == job_id).first()
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
 
-    if job.status != "deposit_paid":
-        raise HTTPException(status_code=400, detail="Deposit must be paid before assigning crew")
+    check_transition(job, "assign_crew", "Deposit must be paid before assigning crew")
     
     crew = db.query(Crew).filter(Crew.id == crew_id, Crew.is_approved == True).first()
     if not crew:
         raise HTTPException(status_code=404, detail="Approved crew not found")
     
+    if crew.status != "available" or not claim_crew(db, [crew]):
+        raise HTTPException(status_code=409, detail="Crew is no longer available")
+    
     job.assigned_crew_id = crew_id
     job.assigned_by = admin.id
-    job.status = "crew_assigned"
-    crew.status = "assigned"
+    transition(db, job, "assign_crew")
+    if job.latitude is not None and job.longitude is not None:
+        crew.last_latitude, crew.last_longitude = job.latitude, job.longitude
     
     db.commit()
+    crew_index.invalidate()
     
     return {
         "message": "Crew assigned successfully",
@@ -609,16 +709,62 @@ async def assign_crew_to_job(
         "status": job.status
     }
 
+@router.post("/admin/jobs/assign-crew/batch", tags=["Admin"], summary="Assign Crew to Many Jobs")
+def assign_crew_batch(
+    request: BatchAssignCrewRequest,
+    admin: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    Assign many jobs in one transaction, with a result per job
+
+    With auto=true the server picks the pairs: unassigned deposit_paid
+    jobs are matched to available crew (at most one job each) so that the
+    total recommender score is lowest (app.core.assignment). Invalid pairs
+    are reported and skipped; dry_run=true validates (and solves) without
+    assigning anything.
+    """
+    scores = {}
+    if request.auto:
+        jobs = unassigned_jobs(db, request.job_ids)
+        solution = solve_assignments(db, jobs)
+        pairs = []
+        unmatched = []
+        for job in jobs:
+            if solution.get(job.id):
+                candidate, value = solution[job.id]
+                pairs.append((job.id, candidate.id))
+                scores[job.id] = round(value, 2)
+            else:
+                unmatched.append({"job_id": job.id, "crew_id": "", "status": "rejected", "detail": "No available crew"})
+    else:
+        if not request.assignments:
+            raise HTTPException(status_code=400, detail="Provide assignments, or set auto to true")
+        pairs = [(pair.job_id, pair.crew_id) for pair in request.assignments]
+        unmatched = []
+    
+    results = apply_assignments(db, pairs, admin.id, request.dry_run)
+    if not request.dry_run:
+        db.commit()
+        crew_index.invalidate()
+    
+    for result in results:
+        if result["job_id"] in scores:
+            result["score"] = scores[result["job_id"]]
+    results += unmatched
+    return {
+        "assigned": sum(1 for result in results if result["status"] == "assigned"),
+        "rejected": sum(1 for result in results if result["status"] == "rejected"),
+        "dry_run": request.dry_run,
+        "results": results
+    }
+
 @router.get("/admin/jobs/unassigned/{job_id}", tags=["Admin"], summary="Get Unassigned Job Details by ID")
-async def get_unassigned_job_by_id(
+def get_unassigned_job_by_id(
     job_id: str,
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    admin: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_read_db)
 ):
-    admin = db.query(Admin).filter(Admin.email == current_user.get("sub")).first()
-    if not admin:
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
     job = db.query(Job).filter(Job.id == job_id).first()
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
@@ -626,55 +772,19 @@ async def get_unassigned_job_by_id(
     if job.status != "deposit_paid" or job.assigned_crew_id is not None:
         raise HTTPException(status_code=400, detail="Job must have deposit paid and no crew assigned")
     
-    client_name = "Client"
-    try:
-        client_result = db.execute(
-            text("SELECT company_name FROM clients WHERE id = :id"),
-            {"id": job.client_id}
-        ).fetchone()
-        if client_result:
-            client_name = client_result[0]
-    except:
-        pass
-    
-    service_type_name = job.service_type
-    try:
-        service_result = db.execute(
-            text("SELECT name FROM service_types WHERE id = :id"),
-            {"id": job.service_type}
-        ).fetchone()
-        if service_result:
-            service_type_name = service_result[0]
-    except:
-        pass
-    
-    urgency_name = ""
+    client = fetch_clients(db, [job.client_id]).get(client_key(job.client_id))
+    client_name = client["company_name"] if client and client["company_name"] else "Client"
+    
+    service_type_name = reference_data.service_type_name(job.service_type, job.service_type)
+    
     sla_hours = ""
-    if job.urgency_level:
-        try:
-            urgency_result = db.execute(
-                text("SELECT name, sla_hours FROM urgency_levels WHERE id = :id"),
-                {"id": job.urgency_level}
-            ).fetchone()
-            if urgency_result:
-                urgency_name = urgency_result[0]
-                sla_hours = f"{urgency_result[1]}hr"
-        except:
-            pass
+    urgency = reference_data.urgency_level(job.urgency_level)
+    if urgency:
+        sla_hours = f"{urgency['sla_hours']}hr"
     
     # Get available crew
-    crew_members = db.query(Crew).filter(
-        Crew.is_approved == True,
-        Crew.status == "available"
-    ).all()
-    
     available_crew = []
-    for crew in crew_members:
-        total_jobs = db.query(Job).filter(
-            Job.assigned_crew_id == crew.id,
-            Job.status == "job_completed"
-        ).count()
-        
+    for crew, _, total_jobs in available_crew_with_job_counts(db):
         available_crew.append({
             "id": crew.id,
             "full_name": crew.full_name,
@@ -685,6 +795,7 @@ async def get_unassigned_job_by_id(
     
     return {
         "job_id": job.id,
+        "client_name": client_name,
         "property_address": job.property_address,
         "service_type": service_type_name,
         "sla_hours": sla_hours,
@@ -692,45 +803,21 @@ async def get_unassigned_job_by_id(
     }
 
 @router.get("/admin/jobs/unassigned", response_model=List[UnassignedJobResponse], tags=["Admin"], summary="Get Unassigned Jobs")
-async def get_unassigned_jobs(
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+def get_unassigned_jobs(
+    admin: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_read_db)
 ):
-    admin = db.query(Admin).filter(Admin.email == current_user.get("sub")).first()
-    if not admin:
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
     jobs = db.query(Job).filter(
         Job.status == "deposit_paid",
         Job.assigned_crew_id.is_(None)
     ).order_by(Job.created_at.desc()).all()
     
+    refs = JobRefs(db, jobs)
+    
     result = []
     for job in jobs:
-        # Get service type name
-        service_type_name = job.service_type
-        try:
-            service_result = db.execute(
-                text("SELECT name FROM service_types WHERE id = :id"),
-                {"id": job.service_type}
-            ).fetchone()
-            if service_result:
-                service_type_name = service_result[0]
-        except:
-            pass
-        
-        # Get SLA hours from urgency level
-        sla_hours = ""
-        if job.urgency_level:
-            try:
-                urgency_result = db.execute(
-                    text("SELECT sla_hours FROM urgency_levels WHERE id = :id"),
-                    {"id": job.urgency_level}
-                ).fetchone()
-                if urgency_result:
-                    sla_hours = f"{urgency_result[0]}hr"
-            except:
-                pass
+        service_type_name = refs.service_type_name(job)
+        _, sla_hours = refs.urgency(job)
         
         result.append({
             "job_id": job.id,
@@ -743,31 +830,17 @@ async def get_unassigned_jobs(
     return result
 
 @router.get("/admin/jobs/{job_id}/available-crew", response_model=List[AvailableCrewResponse], tags=["Admin"], summary="Get Available Crew for Job")
-async def get_available_crew_for_job(
+def get_available_crew_for_job(
     job_id: str,
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    admin: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_read_db)
 ):
-    admin = db.query(Admin).filter(Admin.email == current_user.get("sub")).first()
-    if not admin:
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
     job = db.query(Job).filter(Job.id == job_id).first()
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    crew_members = db.query(Crew).filter(
-        Crew.is_approved == True,
-        Crew.status == "available"
-    ).all()
-    
     result = []
-    for crew in crew_members:
-        total_jobs = db.query(Job).filter(
-            Job.assigned_crew_id == crew.id,
-            Job.status == "job_completed"
-        ).count()
-        
+    for crew, _, total_jobs in available_crew_with_job_counts(db):
         result.append({
             "id": crew.id,
             "full_name": crew.full_name,
@@ -778,39 +851,109 @@ async def get_available_crew_for_job(
     
     return result
 
+@router.get("/admin/jobs/{job_id}/recommended-crew", tags=["Admin"], summary="Get Recommended Crew for Job")
+def get_recommended_crew_for_job(
+    job_id: str,
+    limit: int = Query(5, ge=1, le=50),
+    admin: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Crew ranked for the job by distance, current load, rating and SLA urgency, best first
+
+    Distance is from where each crew member was last assigned a job (or
+    their home location); the ranking reads the in-process crew index
+    (app.core.crew_recommender), not the crew table.
+    """
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return crew_index.recommend(job, limit, db)
+
 # ============ JOB VERIFICATION ENDPOINTS ============
 
-@router.get("/admin/verification/jobs", response_model=List[JobVerificationListResponse], tags=["Admin"], summary="Get All Jobs Pending Verification")
-async def get_jobs_pending_verification(
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+@router.get("/admin/sla/jobs", tags=["Admin"], summary="Get Jobs At Risk of / Breaching SLA")
+def get_sla_jobs(
+    state: str = "at_risk",
+    crew_id: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    admin: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_read_db)
+):
+    """Open jobs that are at risk or breached, nearest (or longest overdue) deadline first"""
+    check_sla_filter(state)
+    now = datetime.utcnow()
+    query = db.query(Job).filter(sla_filter(state, now))
+    query = filter_jobs(query, Job.created_at, None, crew_id, None, None)
+    jobs = query.order_by(Job.sla_deadline, Job.id).limit(limit).all()
+    
+    refs = JobRefs(db, jobs)
+    
+    result = []
+    for job in jobs:
+        time_remaining, _ = countdown(job, now)
+        result.append({
+            "job_id": job.id,
+            "client": refs.client_field(job, "full_name", "Client"),
+            "property_address": job.property_address,
+            "service_type": refs.service_type_name(job),
+            "crew": refs.crew_name(job, "Not assigned"),
+            "status": job.status,
+            "sla_deadline": job.sla_deadline.isoformat(),
+            "sla_state": state,
+            "time_remaining": time_remaining
+        })
+    
+    return result
+
+@router.get("/admin/sla/summary", tags=["Admin"], summary="Get Open Job SLA Counts")
+def get_sla_summary(
+    admin: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_read_db)
+):
+    """Open jobs at risk and breached right now (index range counts on ix_jobs_open_sla_deadline)"""
+    now = datetime.utcnow()
+    return {
+        state: db.query(func.count(Job.id)).filter(sla_filter(state, now)).scalar() or 0
+        for state in SLA_FILTER_STATES
+    }
+
+@router.get("/admin/sla/escalations", tags=["Admin"], summary="Get SLA Escalations Sent to Admins")
+def get_sla_escalations(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    admin: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_read_db)
 ):
-    admin = db.query(Admin).filter(Admin.email == current_user.get("sub")).first()
-    if not admin:
-        raise HTTPException(status_code=403, detail="Admin access required")
+    rows, next_cursor = paginate(db.query(SlaEscalation), SlaEscalation.escalated_at, SlaEscalation.id, cursor, limit)
+    set_next_cursor(response, next_cursor)
     
+    return [
+        {
+            "job_id": row.job_id,
+            "level": row.level,
+            "sla_deadline": row.sla_deadline.isoformat(),
+            "escalated_at": row.escalated_at.isoformat() if row.escalated_at else ""
+        }
+        for row in rows
+    ]
+
+@router.get("/admin/verification/jobs", response_model=List[JobVerificationListResponse], tags=["Admin"], summary="Get All Jobs Pending Verification")
+def get_jobs_pending_verification(
+    admin: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_read_db)
+):
     jobs = db.query(Job).filter(Job.status == "work_completed").order_by(Job.updated_at.desc()).all()
     
+    refs = JobRefs(db, jobs)
+    
     result = []
     for job in jobs:
-        client_name = "Unknown Client"
-        try:
-            client_result = db.execute(
-                text("SELECT company_name FROM clients WHERE id = :id"),
-                {"id": job.client_id}
-            ).fetchone()
-            if client_result:
-                client_name = client_result[0]
-        except:
-            pass
-        
-        crew_name = "Unknown Crew"
-        if job.assigned_crew_id:
-            crew = db.query(Crew).filter(Crew.id == job.assigned_crew_id).first()
-            if crew:
-                crew_name = crew.full_name
-        
-        photos_count = db.query(JobPhoto).filter(JobPhoto.job_id == job.id).count()
+        client_name = refs.client_field(job, "company_name", "Unknown Client")
+        crew_name = refs.crew_name(job, "Unknown Crew")
+        photos_count = refs.photo_count(job)
         
         result.append({
             "job_id": job.id,
@@ -826,15 +969,11 @@ async def get_jobs_pending_verification(
     return result
 
 @router.get("/admin/verification/jobs/{job_id}", response_model=JobVerificationDetailResponse, tags=["Admin"], summary="Get Job Verification Details")
-async def get_job_verification_details(
+def get_job_verification_details(
     job_id: str,
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    admin: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_read_db)
 ):
-    admin = db.query(Admin).filter(Admin.email == current_user.get("sub")).first()
-    if not admin:
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
     job = db.query(Job).filter(Job.id == job_id).first()
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
@@ -842,16 +981,8 @@ async def get_job_verification_details(
     if job.status != "work_completed":
         raise HTTPException(status_code=400, detail="Job is not pending verification")
     
-    client_name = "Unknown Client"
-    try:
-        client_result = db.execute(
-            text("SELECT company_name FROM clients WHERE id = :id"),
-            {"id": job.client_id}
-        ).fetchone()
-        if client_result:
-            client_name = client_result[0]
-    except:
-        pass
+    client = fetch_clients(db, [job.client_id]).get(client_key(job.client_id))
+    client_name = client["company_name"] if client and client["company_name"] else "Unknown Client"
     
     crew_name = "Unknown Crew"
     crew_id = ""
@@ -861,16 +992,7 @@ async def get_job_verification_details(
             crew_name = crew.full_name
             crew_id = crew.id
     
-    service_type_name = job.service_type
-    try:
-        service_result = db.execute(
-            text("SELECT name FROM service_types WHERE id = :id"),
-            {"id": job.service_type}
-        ).fetchone()
-        if service_result:
-            service_type_name = service_result[0]
-    except:
-        pass
+    service_type_name = reference_data.service_type_name(job.service_type, job.service_type)
     
     before_photos = db.query(JobPhoto).filter(
         JobPhoto.job_id == job_id,
@@ -884,7 +1006,7 @@ async def get_job_verification_details(
     
     # Calculate work duration and SLA status
     work_duration = "N/A"
-    sla_status = "SLA Met"
+    sla_status = "SLA Breached" if sla_state(job) == "breached" else "SLA Met"
     if job.created_at and job.updated_at:
         duration = job.updated_at - job.created_at
         hours = int(duration.total_seconds() // 3600)
@@ -926,23 +1048,16 @@ async def get_job_verification_details(
     }
 
 @router.post("/admin/verification/jobs/{job_id}/approve", tags=["Admin"], summary="Approve Job and Complete Verification")
-async def approve_job_verification(
+def approve_job_verification(
     job_id: str,
-    current_user: dict = Depends(get_current_user),
+    admin: Principal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    admin = db.query(Admin).filter(Admin.email == current_user.get("sub")).first()
-    if not admin:
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
     job = db.query(Job).filter(Job.id == job_id).first()
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    if job.status != "work_completed":
-        raise HTTPException(status_code=400, detail="Job is not pending verification")
-    
-    job.status = "job_verified"
+    transition(db, job, "approve_verification", "Job is not pending verification")
     
     if job.assigned_crew_id:
         crew = db.query(Crew).filter(Crew.id == job.assigned_crew_id).first()
@@ -950,6 +1065,7 @@ async def approve_job_verification(
             crew.status = "available"
     
     db.commit()
+    crew_index.invalidate()
     
     return {
         "message": "Job verified successfully",
@@ -958,23 +1074,16 @@ async def approve_job_verification(
     }
 
 @router.post("/admin/verification/jobs/{job_id}/reject", tags=["Admin"], summary="Reject Job Verification")
-async def reject_job_verification(
+def reject_job_verification(
     job_id: str,
-    current_user: dict = Depends(get_current_user),
+    admin: Principal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    admin = db.query(Admin).filter(Admin.email == current_user.get("sub")).first()
-    if not admin:
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
     job = db.query(Job).filter(Job.id == job_id).first()
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    if job.status != "work_completed":
-        raise HTTPException(status_code=400, detail="Job is not pending verification")
-    
-    job.status = "clearance_in_progress"
+    transition(db, job, "reject_verification", "Job is not pending verification")
     
     db.commit()
     
@@ -985,32 +1094,29 @@ async def reject_job_verification(
     }
 
 @router.post("/admin/verification/jobs/{job_id}/send-payment-request", tags=["Admin"], summary="Send Final Price and Payment Request")
-async def send_payment_request(
+def send_payment_request(
     job_id: str,
     request: SendFinalPriceRequest,
-    current_user: dict = Depends(get_current_user),
+    admin: Principal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    admin = db.query(Admin).filter(Admin.email == current_user.get("sub")).first()
-    if not admin:
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
     job = db.query(Job).filter(Job.id == job_id).first()
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    if job.status != "job_verified":
-        raise HTTPException(status_code=400, detail="Job must be verified before sending payment request")
+    check_transition(job, "send_payment_request", "Job must be verified before sending payment request")
     
     deposit_paid = job.deposit_amount if job.deposit_amount else 0.0
     final_price = deposit_paid + request.remaining_amount
     
     job.quote_amount = final_price
     job.remaining_amount = request.remaining_amount
-    job.status = "payment_pending"
+    transition(db, job, "send_payment_request")
     
     db.commit()
     
+    invoice_pipeline.enqueue(job.id, generated_by=admin.id)
+    
     return {
         "message": "Payment request sent to client successfully",
         "job_id": job.id,
@@ -1022,135 +1128,314 @@ async def send_payment_request(
 
 
 @router.get("/admin/payments/completed", tags=["Admin"], summary="Get Completed Payments")
-async def get_completed_payments(
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+def get_completed_payments(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    crew_id: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    admin: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_read_db)
 ):
     """Get all completed payments (fully paid jobs)"""
-    admin = db.query(Admin).filter(Admin.email == current_user.get("sub")).first()
-    if not admin:
-        raise HTTPException(status_code=403, detail="Admin access required")
+    filters, params = filter_jobs_sql("j.updated_at", None, crew_id, date_from, date_to)
+    keyset, keyset_params = keyset_sql("j.updated_at", "j.id", cursor)
+    params.update(keyset_params)
+    params["limit"] = limit + 1
     
     try:
-        query = text("""
-            SELECT 
-                j.id, j.property_address, j.service_type, j.quote_amount,
-                j.deposit_amount, j.remaining_amount, j.updated_at,
-                c.company_name, c.email
-            FROM jobs j
-            LEFT JOIN clients c ON j.client_id::uuid = c.id
-            WHERE j.status = 'job_completed'
-            ORDER BY j.updated_at DESC
-        """)
-        results = db.execute(query).fetchall()
+        query = text(COMPLETED_PAYMENTS_SQL.format(filters=filters, keyset=keyset, limit="LIMIT :limit"))
+        results, next_cursor = next_cursor_sql(db.execute(query, params).fetchall(), limit, 6, 0)
+        set_next_cursor(response, next_cursor)
         
-        payments = []
-        for r in results:
-            service_type_name = r[2]
-            try:
-                service_result = db.execute(
-                    text("SELECT name FROM service_types WHERE id = :id"),
-                    {"id": r[2]}
-                ).fetchone()
-                if service_result:
-                    service_type_name = service_result[0]
-            except:
-                pass
-            
-            payments.append({
-                "job_id": r[0],
-                "client_name": r[7] or "Unknown Client",
-                "client_email": r[8] or "",
-                "property_address": r[1],
-                "service_type": service_type_name,
-                "total_amount": float(r[3]) if r[3] else 0.0,
-                "deposit_paid": float(r[4]) if r[4] else 0.0,
-                "remaining_paid": float(r[5]) if r[5] else 0.0,
-                "completed_at": r[6].strftime("%m/%d/%Y") if r[6] else "",
-                "status": "Remaining Amount Paid"
-            })
+        payments = [completed_payment(r) for r in results]
         
         return payments
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
 @router.get("/admin/payments/pending", tags=["Admin"], summary="Get Pending Payments")
-async def get_pending_payments(
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+def get_pending_payments(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    status: Optional[str] = None,
+    crew_id: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    admin: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_read_db)
 ):
     """Get all pending payments (deposit and remaining)"""
-    admin = db.query(Admin).filter(Admin.email == current_user.get("sub")).first()
-    if not admin:
-        raise HTTPException(status_code=403, detail="Admin access required")
+    filters, params = filter_jobs_sql("j.created_at", status, crew_id, date_from, date_to)
+    keyset, keyset_params = keyset_sql("j.created_at", "j.id", cursor)
+    params.update(keyset_params)
+    params["limit"] = limit + 1
     
     try:
         # Get jobs with all payment-related statuses
-        query = text("""
-            SELECT 
-                j.id, j.property_address, j.service_type, j.quote_amount,
-                j.deposit_amount, j.remaining_amount, j.status, c.full_name, c.email
-            FROM jobs j
-            LEFT JOIN clients c ON j.client_id::uuid = c.id
-            WHERE j.status IN ('quote_accepted', 'deposit_paid', 'crew_assigned', 'crew_arrived', 'before_photo', 'clearance_in_progress', 'after_photo', 'work_completed', 'job_verified', 'payment_pending')
-            ORDER BY j.created_at DESC
-        """)
-        results = db.execute(query).fetchall()
+        query = text(PENDING_PAYMENTS_SQL.format(filters=filters, keyset=keyset, limit="LIMIT :limit"))
+        results, next_cursor = next_cursor_sql(db.execute(query, params).fetchall(), limit, 9, 0)
+        set_next_cursor(response, next_cursor)
         
-        payments = []
-        for r in results:
-            service_type_name = r[2]
-            try:
-                service_result = db.execute(
-                    text("SELECT name FROM service_types WHERE id = :id"),
-                    {"id": r[2]}
-                ).fetchone()
-                if service_result:
-                    service_type_name = service_result[0]
-            except:
-                pass
-            
-            job_status = r[6]
-            deposit_amount = float(r[4]) if r[4] else 0.0
-            remaining_amount = float(r[5]) if r[5] else 0.0
-            total_amount = float(r[3]) if r[3] else 0.0
-            
-            # Calculate remaining amount if not set
-            if remaining_amount == 0.0 and total_amount > 0.0 and deposit_amount > 0.0:
-                remaining_amount = total_amount - deposit_amount
-            
-            # Determine payment status based on job status
-            if job_status == "quote_accepted":
-                payment_type = "Deposit Payment Pending"
-                amount_due = deposit_amount
-                status = "Pending"
-            elif job_status in ["deposit_paid", "crew_assigned", "crew_arrived", "before_photo", "clearance_in_progress", "after_photo", "work_completed", "job_verified"]:
-                payment_type = "Deposit Paid"
-                amount_due = 0.0
-                status = "Deposit Paid"
-            elif job_status == "payment_pending":
-                payment_type = "Remaining Amount Pending"
-                amount_due = remaining_amount
-                status = "Pending"
-            else:
-                payment_type = "Unknown"
-                amount_due = 0.0
-                status = "Unknown"
-            
-            payments.append({
-                "job_id": r[0],
-                "client_name": r[7] or "Unknown Client",
-                "client_email": r[8] or "",
-                "property_address": r[1],
-                "service_type": service_type_name,
-                "total_amount": total_amount,
-                "deposit_amount": deposit_amount,
-                "remaining_amount": remaining_amount,
-                "amount_due": amount_due,
-                "payment_type": payment_type,
-                "status": status
-            })
+        payments = [pending_payment(r) for r in results]
         
         return payments
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+
+# Exports stream every matching row with a server-side cursor, one batch in memory at a time
+
+JOB_EXPORT_COLUMNS = [
+    "job_id", "status", "service_type", "property_address", "client_name", "client_email", "crew_name",
+    "quote_amount", "deposit_amount", "remaining_amount", "rating", "created_at", "updated_at"
+]
+COMPLETED_PAYMENT_EXPORT_COLUMNS = [
+    "job_id", "client_name", "client_email", "property_address", "service_type",
+    "total_amount", "deposit_paid", "remaining_paid", "completed_at", "status"
+]
+PENDING_PAYMENT_EXPORT_COLUMNS = [
+    "job_id", "client_name", "client_email", "property_address", "service_type",
+    "total_amount", "deposit_amount", "remaining_amount", "amount_due", "payment_type", "status"
+]
+CREW_EXPORT_COLUMNS = [
+    "crew_id", "full_name", "email", "phone_number", "status", "is_approved", "total_jobs", "completed_jobs", "created_at"
+]
+
+def stream_sql(db: Session, sql: str, params: dict):
+    return db.execute(text(sql).execution_options(yield_per=EXPORT_BATCH_SIZE), params)
+
+@router.get("/admin/exports/jobs", tags=["Admin"], summary="Export Jobs (CSV or NDJSON)")
+def export_jobs(
+    request: Request,
+    fmt: str = Query("csv", alias="format"),
+    status: Optional[str] = None,
+    crew_id: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    admin: Principal = Depends(get_current_admin)
+):
+    def rows(db: Session):
+        query = filter_jobs(db.query(Job), Job.created_at, status, crew_id, date_from, date_to)
+        query = query.order_by(Job.created_at.desc(), Job.id.desc()).yield_per(EXPORT_BATCH_SIZE)
+        for jobs in batched(query):
+            refs = JobRefs(db, jobs)
+            for job in jobs:
+                yield {
+                    "job_id": job.id,
+                    "status": job.status,
+                    "service_type": refs.service_type_name(job),
+                    "property_address": job.property_address,
+                    "client_name": refs.client_field(job, "full_name"),
+                    "client_email": refs.client_field(job, "email"),
+                    "crew_name": refs.crew_name(job, ""),
+                    "quote_amount": job.quote_amount,
+                    "deposit_amount": job.deposit_amount,
+                    "remaining_amount": job.remaining_amount,
+                    "rating": job.rating,
+                    "created_at": job.created_at,
+                    "updated_at": job.updated_at,
+                }
+
+    return export_response("jobs", fmt, JOB_EXPORT_COLUMNS, rows, read_session_factory(request))
+
+@router.get("/admin/exports/payments/completed", tags=["Admin"], summary="Export Completed Payments (CSV or NDJSON)")
+def export_completed_payments(
+    request: Request,
+    fmt: str = Query("csv", alias="format"),
+    crew_id: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    admin: Principal = Depends(get_current_admin)
+):
+    filters, params = filter_jobs_sql("j.updated_at", None, crew_id, date_from, date_to)
+    sql = COMPLETED_PAYMENTS_SQL.format(filters=filters, keyset="", limit="")
+
+    def rows(db: Session):
+        for r in stream_sql(db, sql, params):
+            yield completed_payment(r)
+
+    return export_response("payments-completed", fmt, COMPLETED_PAYMENT_EXPORT_COLUMNS, rows, read_session_factory(request))
+
+@router.get("/admin/exports/payments/pending", tags=["Admin"], summary="Export Pending Payments (CSV or NDJSON)")
+def export_pending_payments(
+    request: Request,
+    fmt: str = Query("csv", alias="format"),
+    status: Optional[str] = None,
+    crew_id: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    admin: Principal = Depends(get_current_admin)
+):
+    filters, params = filter_jobs_sql("j.created_at", status, crew_id, date_from, date_to)
+    sql = PENDING_PAYMENTS_SQL.format(filters=filters, keyset="", limit="")
+
+    def rows(db: Session):
+        for r in stream_sql(db, sql, params):
+            yield pending_payment(r)
+
+    return export_response("payments-pending", fmt, PENDING_PAYMENT_EXPORT_COLUMNS, rows, read_session_factory(request))
+
+@router.get("/admin/exports/crew", tags=["Admin"], summary="Export Crew (CSV or NDJSON)")
+def export_crew(
+    request: Request,
+    fmt: str = Query("csv", alias="format"),
+    is_approved: Optional[bool] = None,
+    status: Optional[str] = None,
+    admin: Principal = Depends(get_current_admin)
+):
+    def rows(db: Session):
+        query = db.query(Crew)
+        if is_approved is not None:
+            query = query.filter(Crew.is_approved == is_approved)
+        if status:
+            query = query.filter(Crew.status == status)
+        query = query.order_by(Crew.created_at.desc(), Crew.id.desc()).yield_per(EXPORT_BATCH_SIZE)
+        for crew_members in batched(query):
+            counts = fetch_crew_job_counts(db, [crew.id for crew in crew_members])
+            for crew in crew_members:
+                total_jobs, completed_jobs = counts.get(crew.id, (0, 0))
+                yield {
+                    "crew_id": crew.id,
+                    "full_name": crew.full_name,
+                    "email": crew.email,
+                    "phone_number": crew.phone_number,
+                    "status": crew.status,
+                    "is_approved": bool(crew.is_approved),
+                    "total_jobs": total_jobs,
+                    "completed_jobs": completed_jobs,
+                    "created_at": crew.created_at,
+                }
+
+    return export_response("crew", fmt, CREW_EXPORT_COLUMNS, rows, read_session_factory(request))
+
+
+@router.get("/admin/invoices/{job_id}/download", tags=["Admin"], summary="Download Job Invoice")
+def download_invoice(
+    job_id: str,
+    admin: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """Serve the job's invoice, rendering it only if missing or out of date"""
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if job.status not in INVOICE_STATUSES:
+        raise HTTPException(status_code=400, detail="Job has not been invoiced yet")
+    
+    pdf, pdf_url = invoice_pipeline.pdf_for(db, job, generated_by=admin.id)
+    if pdf is not None:
+        return Response(
+            content=pdf,
+            media_type="application/pdf",
+            headers={"Content-Disposition": f'inline; filename="invoice-{job.id}.pdf"'}
+        )
+    if pdf_url:
+        return RedirectResponse(pdf_url)
+    
+    raise HTTPException(status_code=500, detail="Failed to generate invoice")
+
+@router.post("/admin/invoices/regenerate", tags=["Admin"], summary="Regenerate Invoices for Date Range")
+def regenerate_invoices(
+    request: RegenerateInvoicesRequest,
+    admin: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """Regenerate invoices of payment_pending / job_completed jobs updated in the range"""
+    if request.date_from > request.date_to:
+        raise HTTPException(status_code=400, detail="date_from must be before date_to")
+    
+    summary = invoice_pipeline.regenerate_range(
+        db, request.date_from, request.date_to, generated_by=admin.id, force=request.force
+    )
+    
+    return {
+        "message": "Invoices regenerated",
+        "jobs": summary["jobs"],
+        "generated": len(summary["generated"]),
+        "unchanged": summary["unchanged"],
+        "failed": summary["failed"]
+    }
+
+@router.get("/admin/system/invoices", tags=["Admin"], summary="Get Invoice Pipeline Stats")
+def get_invoice_pipeline_stats(
+    admin: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    return invoice_pipeline.stats()
+
+@router.get("/admin/system/reference-data", tags=["Admin"], summary="Get Reference Data Cache Stats")
+def get_reference_data_stats(
+    admin: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    return {
+        "ttl_seconds": reference_data.ttl_seconds,
+        "tables": reference_data.stats()
+    }
+
+@router.post("/admin/system/reference-data/invalidate", tags=["Admin"], summary="Reload Reference Data")
+def invalidate_reference_data(
+    table: Optional[str] = None,
+    admin: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """Drop cached service types / urgency levels / service levels after they are edited"""
+    if table and table not in REFERENCE_TABLES:
+        raise HTTPException(status_code=400, detail=f"Unknown reference table: {table}")
+    
+    reference_data.invalidate(table)
+    
+    return {"message": "Reference data invalidated", "tables": [table] if table else list(REFERENCE_TABLES)}
+
+@router.get("/admin/system/mail-queue", tags=["Admin"], summary="Get Outbound Mail Queue Stats")
+def get_mail_queue_stats(
+    admin: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    return mail_queue.stats()
+
+@router.get("/admin/system/sla-escalations", tags=["Admin"], summary="Get SLA Escalation Monitor Stats")
+def get_sla_escalation_stats(
+    admin: Principal = Depends(get_current_admin)
+):
+    return sla_monitor.stats()
+
+@router.get("/admin/system/crew-index", tags=["Admin"], summary="Get Crew Recommendation Index Stats")
+def get_crew_index_stats(
+    admin: Principal = Depends(get_current_admin)
+):
+    return crew_index.stats()
+
+@router.get("/admin/system/db-pool", tags=["Admin"], summary="Get Database Connection Pool Stats")
+def get_db_pool_stats(
+    admin: Principal = Depends(get_current_admin)
+):
+    """Checkout waits, connections in use and overflow, for sizing DB_POOL_SIZE / DB_MAX_OVERFLOW"""
+    return {
+        **pool_metrics.stats(),
+        "replica": replica_pool_metrics.stats() if replica_router.replica is not None else None
+    }
+
+@router.get("/admin/system/db-replica", tags=["Admin"], summary="Get Read Replica Routing Stats")
+def get_db_replica_stats(
+    admin: Principal = Depends(get_current_admin)
+):
+    return replica_router.stats()
+
+@router.get("/admin/system/password-hashing", tags=["Admin"], summary="Get Password Hashing Pool Stats")
+def get_password_hashing_stats(
+    admin: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    return password_hasher.stats()
+
+@router.get("/admin/system/job-events", tags=["Admin"], summary="Get Live Job Event Stats")
+def get_job_event_stats(
+    admin: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    return job_events.stats()
@@ -0,0 +1,78 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.database.replica import get_read_db
+from app.core.security import Principal, get_current_admin
+from app.core.lookups import fetch_crew
+from app.core.analytics import (
+    PERIODS, revenue_series, revenue_by_service_type, sla_summary, crew_performance, rollup_refresher
+)
+from typing import Optional
+from datetime import date
+
+router = APIRouter()
+
+# All reports read the rollup tables maintained by app.core.analytics, never jobs itself,
+# through get_read_db so they can be served by the read replica
+
+
+def check_period(period: Optional[str]):
+    if period is not None and period not in PERIODS:
+        raise HTTPException(status_code=400, detail=f"period must be one of: {', '.join(PERIODS)}")
+
+
+@router.get("/admin/analytics/revenue", tags=["Analytics"], summary="Revenue and Collections by Day/Week/Month")
+def get_revenue(
+    period: str = "day",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    service_type: Optional[str] = None,
+    admin: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_read_db)
+):
+    """Completed jobs, revenue, deposits collected and remaining amounts collected per period"""
+    check_period(period)
+    return revenue_series(db, period, date_from, date_to, service_type)
+
+
+@router.get("/admin/analytics/service-types", tags=["Analytics"], summary="Revenue by Service Type")
+def get_revenue_by_service_type(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    admin: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_read_db)
+):
+    return revenue_by_service_type(db, date_from, date_to)
+
+
+@router.get("/admin/analytics/crew", tags=["Analytics"], summary="Jobs Completed and Average Rating per Crew")
+def get_crew_performance(
+    admin: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_read_db)
+):
+    rows = crew_performance(db)
+    crew = fetch_crew(db, [row["crew_id"] for row in rows])
+    for row in rows:
+        member = crew.get(row["crew_id"])
+        row["crew_name"] = member.full_name if member else "Unknown"
+    return rows
+
+
+@router.get("/admin/analytics/sla", tags=["Analytics"], summary="SLA Met / Breached Rates")
+def get_sla_rates(
+    period: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    service_type: Optional[str] = None,
+    admin: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_read_db)
+):
+    """Overall rates, or one row per period when period is given"""
+    check_period(period)
+    return sla_summary(db, period, date_from, date_to, service_type)
+
+
+@router.get("/admin/system/analytics", tags=["Admin"], summary="Get Analytics Rollup Refresh Stats")
+def get_analytics_stats(
+    admin: Principal = Depends(get_current_admin)
+):
+    return rollup_refresher.stats()
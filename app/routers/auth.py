@@ -4,7 +4,7 @@ from sqlalchemy.orm import Session
 from app.database.db import get_db
 from app.models.crew import Crew, Admin
 from app.schemas.auth import AdminRegister, LoginRequest, TokenResponse, UserResponse, RefreshTokenRequest, UpdateProfile, ForgotPasswordRequest, VerifyForgotOTPRequest, ResetPasswordRequest
-from app.core.security import hash_password, verify_password, create_access_token, create_refresh_token, verify_refresh_token, get_current_user
+from app.core.security import hash_password, verify_password_and_update, create_access_token, create_refresh_token, verify_refresh_token, get_current_user, principal_cache
 from app.core.email import send_admin_notification, send_approval_email, send_otp_email
 from app.core.storage import storage
 from typing import Optional, List
@@ -12,7 +12,7 @@ from typing import Optional, List
 router = APIRouter()
 
 @router.post("/register/crew", response_model=UserResponse, status_code=status.HTTP_201_CREATED, tags=["Authentication"])
-async def register_crew(
+def register_crew(
     email: str = Form(None),
     full_name: str = Form(None),
     password: str = Form(None),
@@ -46,35 +46,20 @@ async def register_crew(
     # Upload documents to Utho storage
     crew_id = new_user.id
     
-    if drivers_license and drivers_license.filename:
-        url = storage.upload_crew_document(drivers_license.file, crew_id, "drivers_license", drivers_license.filename)
-        if url:
-            new_user.drivers_license = url
-            print(f"Uploaded drivers_license: {url}")
-    
-    if dbs_certificate and dbs_certificate.filename:
-        url = storage.upload_crew_document(dbs_certificate.file, crew_id, "dbs_certificate", dbs_certificate.filename)
-        if url:
-            new_user.dbs_certificate = url
-            print(f"Uploaded dbs_certificate: {url}")
-    
-    if proof_of_address and proof_of_address.filename:
-        url = storage.upload_crew_document(proof_of_address.file, crew_id, "proof_of_address", proof_of_address.filename)
-        if url:
-            new_user.proof_of_address = url
-            print(f"Uploaded proof_of_address: {url}")
-    
-    if insurance_certificate and insurance_certificate.filename:
-        url = storage.upload_crew_document(insurance_certificate.file, crew_id, "insurance_certificate", insurance_certificate.filename)
-        if url:
-            new_user.insurance_certificate = url
-            print(f"Uploaded insurance_certificate: {url}")
-    
-    if right_to_work and right_to_work.filename:
-        url = storage.upload_crew_document(right_to_work.file, crew_id, "right_to_work", right_to_work.filename)
+    documents = {
+        "drivers_license": drivers_license,
+        "dbs_certificate": dbs_certificate,
+        "proof_of_address": proof_of_address,
+        "insurance_certificate": insurance_certificate,
+        "right_to_work": right_to_work,
+    }
+    urls = storage.upload_crew_documents(
+        {doc_type: (upload.file, upload.filename) for doc_type, upload in documents.items() if upload and upload.filename},
+        crew_id
+    )
+    for doc_type, url in urls.items():
         if url:
-            new_user.right_to_work = url
-            print(f"Uploaded right_to_work: {url}")
+            setattr(new_user, doc_type, url)
     
     db.commit()
     db.refresh(new_user)
@@ -109,12 +94,17 @@ def register_admin(admin_data: AdminRegister, db: Session = Depends(get_db)):
 def login_crew(login_data: LoginRequest, db: Session = Depends(get_db)):
     user = db.query(Crew).filter(Crew.email == login_data.email).first()
     
-    if not user or not verify_password(login_data.password, user.password_hash):
+    valid, new_hash = verify_password_and_update(login_data.password, user.password_hash) if user else (False, None)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
         )
     
+    if new_hash:
+        user.password_hash = new_hash
+        db.commit()
+    
     if not user.is_approved:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -130,12 +120,17 @@ def login_crew(login_data: LoginRequest, db: Session = Depends(get_db)):
 def login_admin(login_data: LoginRequest, db: Session = Depends(get_db)):
     user = db.query(Admin).filter(Admin.email == login_data.email).first()
     
-    if not user or not verify_password(login_data.password, user.password_hash):
+    valid, new_hash = verify_password_and_update(login_data.password, user.password_hash) if user else (False, None)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
         )
     
+    if new_hash:
+        user.password_hash = new_hash
+        db.commit()
+    
     access_token = create_access_token({"sub": user.email, "role": "Admin"})
     refresh_token = create_refresh_token({"sub": user.email, "role": "Admin"})
     
@@ -200,7 +195,7 @@ def get_crew_profile(current_user: dict = Depends(get_current_user), db: Session
     }
 
 @router.patch("/crew/profile", tags=["Crew"])
-async def update_crew_profile(
+def update_crew_profile(
     full_name: str = Form(None),
     phone_number: str = Form(None),
     address: str = Form(None),
@@ -220,6 +215,7 @@ async def update_crew_profile(
     
     db.commit()
     db.refresh(crew)
+    principal_cache.invalidate(crew.email)
     return {
         "id": crew.id,
         "email": crew.email,
@@ -450,7 +446,7 @@ def get_admin_profile(current_user: dict = Depends(get_current_user), db: Sessio
     }
 
 @router.patch("/admin/profile", tags=["Admin"])
-async def update_admin_profile(
+def update_admin_profile(
     organization_name: str = Form(None),
     phone_number: str = Form(None),
     contact_person: str = Form(None),
@@ -476,6 +472,7 @@ async def update_admin_profile(
     
     db.commit()
     db.refresh(admin)
+    principal_cache.invalidate(admin.email)
     
     return {
         "id": admin.id,
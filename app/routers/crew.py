@@ -1,20 +1,24 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Form
 from sqlalchemy.orm import Session
 from app.database.db import get_db
+from app.database.replica import get_read_db
 from app.models.crew import Crew, Admin
 from app.schemas.crew import CrewResponse
-from app.core.security import get_current_user
+from app.core.security import Principal, get_current_user, get_current_crew, principal_cache
+from app.core.crew_recommender import crew_index
 from typing import List, Optional
 
 router = APIRouter()
 
 @router.patch("/crew/profile", tags=["Crew"])
-async def update_crew_profile(
+def update_crew_profile(
     full_name: Optional[str] = Form(None),
     phone_number: Optional[str] = Form(None),
     bank_name: Optional[str] = Form(None),
     account_number: Optional[str] = Form(None),
     sort_code: Optional[str] = Form(None),
+    home_latitude: Optional[float] = Form(None, ge=-90, le=90),
+    home_longitude: Optional[float] = Form(None, ge=-180, le=180),
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -32,9 +36,14 @@ async def update_crew_profile(
         crew.account_number = account_number
     if sort_code:
         crew.sort_code = sort_code
+    if home_latitude is not None and home_longitude is not None:
+        crew.home_latitude = home_latitude
+        crew.home_longitude = home_longitude
     
     db.commit()
     db.refresh(crew)
+    principal_cache.invalidate(crew.email)
+    crew_index.invalidate()
     
     return {
         "message": "Profile updated successfully",
@@ -45,14 +54,16 @@ async def update_crew_profile(
             "phone_number": crew.phone_number,
             "bank_name": crew.bank_name,
             "account_number": crew.account_number,
-            "sort_code": crew.sort_code
+            "sort_code": crew.sort_code,
+            "home_latitude": crew.home_latitude,
+            "home_longitude": crew.home_longitude
         }
     }
 
 @router.get("/crew/profile", tags=["Crew"])
-async def get_crew_profile(
+def get_crew_profile(
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     crew = db.query(Crew).filter(Crew.email == current_user.get("sub")).first()
     if not crew:
@@ -71,14 +82,10 @@ async def get_crew_profile(
     }
 
 @router.get("/crew/admin-info", tags=["Crew"], summary="Get Admin Organization Info")
-async def get_admin_info(
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+def get_admin_info(
+    crew: Principal = Depends(get_current_crew),
+    db: Session = Depends(get_read_db)
 ):
-    crew = db.query(Crew).filter(Crew.email == current_user.get("sub")).first()
-    if not crew:
-        raise HTTPException(status_code=403, detail="Crew access required")
-    
     admin = db.query(Admin).first()
     if not admin:
         return {"organization_name": "", "department": ""}
@@ -1,82 +1,75 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
 from sqlalchemy.orm import Session
 from app.database.db import get_db
+from app.database.replica import get_read_db
 from app.models.job import Job
 from app.models.crew import Admin, Crew
+from app.models.photo import JobPhoto
 from app.schemas.job import JobResponse, ClientJobResponse
 from app.schemas.crew import AssignCrewRequest
-from app.core.security import get_current_user
+from app.core.security import Principal, get_current_crew
 from app.core.storage import storage
-from typing import List
+from app.core.reference_data import reference_data
+from app.core.job_state import check_transition, transition
+from app.core.crew_recommender import crew_index
+from app.core.sla import check_sla_filter, sla_filter, sla_state, countdown
+from typing import List, Optional
+from datetime import datetime
 import random
 
 router = APIRouter()
 
+
+def save_job_photos(db: Session, job: Job, results: List[dict], photo_type: str, event: str) -> List[str]:
+    """
+    Record uploaded photos and move the job on, in one commit
+
+    If the transition or the commit fails (e.g. 409 because another
+    request changed the job meanwhile) the uploaded objects are deleted
+    again, so storage never holds photos the database does not know of.
+
+    Returns:
+        URLs of the photos saved
+    """
+    uploaded_files = [result["url"] for result in results if result["url"]]
+    try:
+        for url in uploaded_files:
+            db.add(JobPhoto(job_id=job.id, photo_url=url, type=photo_type))
+        transition(db, job, event)
+        db.commit()
+    except Exception:
+        db.rollback()
+        storage.delete_files(uploaded_files)
+        raise
+    return uploaded_files
+
 # ============ CREW ENDPOINTS ============
 
 @router.get("/crew/jobs", tags=["Crew"], summary="My Jobs")
-async def get_crew_jobs(
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+def get_crew_jobs(
+    sla: Optional[str] = None,
+    crew: Principal = Depends(get_current_crew),
+    db: Session = Depends(get_read_db)
 ):
-    from sqlalchemy import text
-    from datetime import datetime, timedelta
-    
-    crew = db.query(Crew).filter(Crew.email == current_user.get("sub")).first()
-    if not crew:
-        raise HTTPException(status_code=403, detail="Crew access required")
-    
-    jobs = db.query(Job).filter(Job.assigned_crew_id == crew.id).order_by(Job.created_at.desc()).all()
-    
+    """The crew member's jobs with their SLA countdown; ?sla=at_risk|breached lists only those"""
+    check_sla_filter(sla)
+    query = db.query(Job).filter(Job.assigned_crew_id == crew.id)
+    if sla:
+        query = query.filter(sla_filter(sla))
+    jobs = query.order_by(Job.created_at.desc()).all()
+    
+    now = datetime.utcnow()
     result = []
     for job in jobs:
-        # Get SLA hours from service level
-        sla_hours = 24  # default
-        try:
-            sla_result = db.execute(
-                text("SELECT sla_hours FROM service_levels WHERE id = :id"),
-                {"id": job.service_level}
-            ).fetchone()
-            if sla_result:
-                sla_hours = sla_result[0]
-        except:
-            pass
-        
-        # Calculate SLA deadline
-        sla_deadline = job.created_at + timedelta(hours=sla_hours)
-        now = datetime.utcnow()
-        
-        if job.status == "job_completed":
-            # Job completed - check if completed within SLA time
-            completion_time = job.updated_at
-            if completion_time <= sla_deadline:
-                time_remaining = "SLA Met"
-                countdown_timer = "On Time"
-            else:
-                time_remaining = "SLA Breached"
-                countdown_timer = "Overdue"
-        else:
-            # Job in progress - calculate remaining time
-            time_diff = sla_deadline - now
-            if time_diff.total_seconds() > 0:
-                hours_left = int(time_diff.total_seconds() // 3600)
-                minutes_left = int((time_diff.total_seconds() % 3600) // 60)
-                time_remaining = f"{hours_left}h {minutes_left}m"
-                countdown_timer = "On Time"
-            else:
-                # Overdue
-                time_diff = now - sla_deadline
-                hours_over = int(time_diff.total_seconds() // 3600)
-                minutes_over = int((time_diff.total_seconds() % 3600) // 60)
-                time_remaining = f"-{hours_over}h {minutes_over}m"
-                countdown_timer = "Overdue"
-        
+        time_remaining, countdown_timer = countdown(job, now)
         result.append({
             "job_id": job.id,
             "property_address": job.property_address,
             "scheduled_date": job.preferred_date if job.preferred_date else "",
             "scheduled_time": job.preferred_time if job.preferred_time else "",
             "status": job.status,
+            "sla_deadline": job.sla_deadline.isoformat() if job.sla_deadline else "",
+            "sla_state": sla_state(job, now) or "",
             "time_remaining": time_remaining,
             "countdown_timer": countdown_timer
         })
@@ -84,17 +77,13 @@ async def get_crew_jobs(
     return result
 
 @router.get("/crew/jobs/{job_id}", tags=["Crew"], summary="Get Job Details by ID")
-async def get_crew_job_by_id(
+def get_crew_job_by_id(
     job_id: str,
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    crew: Principal = Depends(get_current_crew),
+    db: Session = Depends(get_read_db)
 ):
     from app.models.client import Client
     
-    crew = db.query(Crew).filter(Crew.email == current_user.get("sub")).first()
-    if not crew:
-        raise HTTPException(status_code=403, detail="Crew access required")
-    
     job = db.query(Job).filter(Job.id == job_id).first()
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
@@ -110,17 +99,7 @@ async def get_crew_job_by_id(
             client_name = client.full_name
     
     # Get service type name
-    service_type_name = "Emergency Clearance"
-    if job.service_type:
-        try:
-            service_result = db.execute(
-                text("SELECT name FROM service_types WHERE id = :id"),
-                {"id": job.service_type}
-            ).fetchone()
-            if service_result:
-                service_type_name = service_result[0]
-        except:
-            pass
+    service_type_name = reference_data.service_type_name(job.service_type, "Emergency Clearance")
     
     return {
         "job_id": job.id,
@@ -132,15 +111,11 @@ async def get_crew_job_by_id(
     }
 
 @router.patch("/crew/jobs/{job_id}/arrive", tags=["Crew"])
-async def crew_arrive(
+def crew_arrive(
     job_id: str,
-    current_user: dict = Depends(get_current_user),
+    crew: Principal = Depends(get_current_crew),
     db: Session = Depends(get_db)
 ):
-    crew = db.query(Crew).filter(Crew.email == current_user.get("sub")).first()
-    if not crew:
-        raise HTTPException(status_code=403, detail="Crew access required")
-    
     job = db.query(Job).filter(Job.id == job_id).first()
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
@@ -148,24 +123,17 @@ async def crew_arrive(
     if job.assigned_crew_id != crew.id:
         raise HTTPException(status_code=403, detail="This job is not assigned to you")
     
-    if job.status != "crew_assigned":
-        raise HTTPException(status_code=400, detail=f"Job must be in crew_assigned status. Current status: {job.status}")
-    
-    job.status = "crew_arrived"
+    transition(db, job, "crew_arrive", f"Job must be in crew_assigned status. Current status: {job.status}")
     db.commit()
     return {"message": "Crew arrived", "status": job.status}
 
 @router.post("/crew/jobs/{job_id}/upload-before-photo", tags=["Crew"])
-async def upload_before_photo(
+def upload_before_photo(
     job_id: str,
     photos: List[UploadFile] = File(default=[]),
-    current_user: dict = Depends(get_current_user),
+    crew: Principal = Depends(get_current_crew),
     db: Session = Depends(get_db)
 ):
-    crew = db.query(Crew).filter(Crew.email == current_user.get("sub")).first()
-    if not crew:
-        raise HTTPException(status_code=403, detail="Crew access required")
-    
     job = db.query(Job).filter(Job.id == job_id).first()
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
@@ -173,39 +141,22 @@ async def upload_before_photo(
     if job.assigned_crew_id != crew.id:
         raise HTTPException(status_code=403, detail="This job is not assigned to you")
     
-    if job.status != "crew_arrived":
-        raise HTTPException(status_code=400, detail=f"Job must be in crew_arrived status. Current status: {job.status}")
-    
-    from app.models.photo import JobPhoto
-    uploaded_files = []
-    for photo in photos:
-        if photo.filename:
-            photo_url = storage.upload_job_photo(photo.file, job_id, "before", photo.filename)
-            if photo_url:
-                uploaded_files.append(photo_url)
-                job_photo = JobPhoto(
-                    job_id=job_id,
-                    photo_url=photo_url,
-                    type="before"
-                )
-                db.add(job_photo)
+    check_transition(job, "upload_before_photos", f"Job must be in crew_arrived status. Current status: {job.status}")
     
-    job.status = "before_photo"
-    db.commit()
+    results = storage.upload_job_photos(
+        [(photo.file, photo.filename) for photo in photos if photo.filename], job_id, "before"
+    )
+    uploaded_files = save_job_photos(db, job, results, "before", "upload_before_photos")
     
-    return {"message": "Before photos uploaded", "status": job.status, "uploaded_count": len(uploaded_files)}
+    return {"message": "Before photos uploaded", "status": job.status, "uploaded_count": len(uploaded_files), "files": results}
 
 @router.post("/crew/jobs/{job_id}/upload-after-photo", tags=["Crew"])
-async def upload_after_photo(
+def upload_after_photo(
     job_id: str,
     photos: List[UploadFile] = File(default=[]),
-    current_user: dict = Depends(get_current_user),
+    crew: Principal = Depends(get_current_crew),
     db: Session = Depends(get_db)
 ):
-    crew = db.query(Crew).filter(Crew.email == current_user.get("sub")).first()
-    if not crew:
-        raise HTTPException(status_code=403, detail="Crew access required")
-    
     job = db.query(Job).filter(Job.id == job_id).first()
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
@@ -213,37 +164,20 @@ async def upload_after_photo(
     if job.assigned_crew_id != crew.id:
         raise HTTPException(status_code=403, detail="This job is not assigned to you")
     
-    if job.status != "before_photo":
-        raise HTTPException(status_code=400, detail=f"Job must be in before_photo status. Current status: {job.status}")
+    check_transition(job, "upload_after_photos", f"Job must be in before_photo status. Current status: {job.status}")
     
-    from app.models.photo import JobPhoto
-    uploaded_files = []
-    for photo in photos:
-        if photo.filename:
-            photo_url = storage.upload_job_photo(photo.file, job_id, "after", photo.filename)
-            if photo_url:
-                uploaded_files.append(photo_url)
-                job_photo = JobPhoto(
-                    job_id=job_id,
-                    photo_url=photo_url,
-                    type="after"
-                )
-                db.add(job_photo)
-    
-    job.status = "after_photo"
-    db.commit()
-    return {"message": "After photos uploaded", "status": job.status, "uploaded_count": len(uploaded_files)}
+    results = storage.upload_job_photos(
+        [(photo.file, photo.filename) for photo in photos if photo.filename], job_id, "after"
+    )
+    uploaded_files = save_job_photos(db, job, results, "after", "upload_after_photos")
+    return {"message": "After photos uploaded", "status": job.status, "uploaded_count": len(uploaded_files), "files": results}
 
 @router.patch("/crew/jobs/{job_id}/complete-work", tags=["Crew"])
-async def complete_work(
+def complete_work(
     job_id: str,
-    current_user: dict = Depends(get_current_user),
+    crew: Principal = Depends(get_current_crew),
     db: Session = Depends(get_db)
 ):
-    crew = db.query(Crew).filter(Crew.email == current_user.get("sub")).first()
-    if not crew:
-        raise HTTPException(status_code=403, detail="Crew access required")
-    
     job = db.query(Job).filter(Job.id == job_id).first()
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
@@ -251,8 +185,7 @@ async def complete_work(
     if job.assigned_crew_id != crew.id:
         raise HTTPException(status_code=403, detail="This job is not assigned to you")
     
-    if job.status != "after_photo":
-        raise HTTPException(status_code=400, detail="Job must be in after_photo status")
+    check_transition(job, "complete_work", "Job must be in after_photo status")
     
     # Count photos
     from app.models.photo import JobPhoto
@@ -266,9 +199,10 @@ async def complete_work(
         JobPhoto.type == "after"
     ).count()
     
-    job.status = "work_completed"
-    crew.status = "available"
+    transition(db, job, "complete_work")
+    db.query(Crew).filter(Crew.id == crew.id).update({Crew.status: "available"})
     db.commit()
+    crew_index.invalidate()
     
     return {
         "message": "Work completed successfully",
@@ -280,14 +214,10 @@ async def complete_work(
     }
 
 @router.get("/crew/ratings", tags=["Crew"])
-async def get_crew_ratings(
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+def get_crew_ratings(
+    crew: Principal = Depends(get_current_crew),
+    db: Session = Depends(get_read_db)
 ):
-    crew = db.query(Crew).filter(Crew.email == current_user.get("sub")).first()
-    if not crew:
-        raise HTTPException(status_code=403, detail="Crew access required")
-    
     from sqlalchemy import text, func
     
     # Get all completed jobs with ratings
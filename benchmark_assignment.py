@@ -0,0 +1,79 @@
+"""
+Benchmark automatic batch crew assignment
+
+Solves batches of synthetic deposit_paid jobs against synthetic crew
+(no database needed) with the Hungarian solver and compares the total
+score with assigning each job greedily, in order, to its best free crew.
+The solver is also checked against every permutation on small random
+cost matrices.
+
+Usage: python benchmark_assignment.py [crew] [jobs per batch ...]
+"""
+
+import itertools
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from app.models.job import Job
+from app.core.assignment import min_cost_assignment, solve_assignments
+from app.core.crew_recommender import crew_index
+
+from benchmark_recommender import LATITUDES, LONGITUDES, synthetic_crew
+
+CREW = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+BATCHES = [int(size) for size in sys.argv[2:]] or [10, 50, 100, 200]
+
+
+def check_against_permutations(rng: random.Random, trials: int = 200) -> int:
+    failures = 0
+    for _ in range(trials):
+        rows = rng.randint(1, 5)
+        columns = rng.randint(rows, 6)
+        costs = [[rng.uniform(-10, 100) for _ in range(columns)] for _ in range(rows)]
+        chosen = min_cost_assignment(costs)
+        total = sum(costs[row][column] for row, column in enumerate(chosen))
+        best = min(
+            sum(costs[row][column] for row, column in enumerate(permutation))
+            for permutation in itertools.permutations(range(columns), rows)
+        )
+        if len(set(chosen)) != rows or abs(total - best) > 1e-6:
+            failures += 1
+    return failures
+
+
+def greedy_total(jobs: list) -> float:
+    taken = set()
+    total = 0.0
+    for job in jobs:
+        for value, _, candidate in crew_index.rank(job, len(jobs), statuses=("available",)):
+            if candidate.id not in taken:
+                taken.add(candidate.id)
+                total += value
+                break
+    return total
+
+
+if __name__ == "__main__":
+    rng = random.Random(11)
+    failures = check_against_permutations(rng)
+    print(f"solver vs brute force on small matrices: {failures} failures")
+
+    crew_index.ttl_seconds = 10 ** 9
+    crew_index.build(synthetic_crew(rng)[:CREW])
+    now = datetime.utcnow()
+    for size in BATCHES:
+        jobs = [
+            Job(id=f"job-{n}", latitude=rng.uniform(*LATITUDES), longitude=rng.uniform(*LONGITUDES),
+                status="deposit_paid", created_at=now, sla_deadline=now + timedelta(hours=rng.choice((1, 8, 24))))
+            for n in range(size)
+        ]
+        started = time.perf_counter()
+        solution = solve_assignments(None, jobs)
+        elapsed = (time.perf_counter() - started) * 1000
+        matched = [entry for entry in solution.values() if entry]
+        optimal = sum(value for _, value in matched)
+        print(f"{size:4d} jobs / {CREW} crew: solved in {elapsed:8.1f} ms, {len(matched)} assigned, "
+              f"total score {optimal:9.1f} (greedy {greedy_total(jobs):9.1f})")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,68 @@
+"""
+Benchmark login password verification: inline bcrypt vs the bounded hashing pool
+
+Simulates a burst of logins arriving on the request thread pool while
+lightweight requests keep coming in, and reports logins/sec plus the
+latency of the lightweight requests in both modes.
+
+Usage: python benchmark_password_hashing.py [logins] [request_threads]
+"""
+
+import json
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.security import pwd_context, password_hasher, BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS
+
+LOGINS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+REQUEST_THREADS = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+
+PASSWORD = "correct horse battery staple"
+STORED_HASH = pwd_context.hash(PASSWORD)
+PAYLOAD = {"jobs": [{"id": i, "status": "crew_assigned", "address": "1 High Street"} for i in range(200)]}
+
+
+def light_request():
+    started = time.perf_counter()
+    json.loads(json.dumps(PAYLOAD))
+    return time.perf_counter() - started
+
+
+def run(label, verify):
+    stop = threading.Event()
+    light_latencies = []
+
+    def light_traffic():
+        while not stop.is_set():
+            light_latencies.append(light_request())
+            time.sleep(0.005)
+
+    background = [threading.Thread(target=light_traffic) for _ in range(4)]
+    for thread in background:
+        thread.start()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=REQUEST_THREADS) as requests:
+        results = list(requests.map(lambda _: verify(PASSWORD, STORED_HASH), range(LOGINS)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    for thread in background:
+        thread.join()
+
+    assert all(results)
+    latencies_ms = sorted(latency * 1000 for latency in light_latencies)
+    p95 = latencies_ms[int(len(latencies_ms) * 0.95) - 1] if latencies_ms else 0.0
+    print(f"{label:<8} {LOGINS / elapsed:8.1f} logins/sec   "
+          f"other requests: median {statistics.median(latencies_ms):6.2f} ms, p95 {p95:6.2f} ms")
+
+
+if __name__ == "__main__":
+    print(f"{LOGINS} logins on {REQUEST_THREADS} request threads, bcrypt rounds={BCRYPT_ROUNDS}, "
+          f"hashing workers={PASSWORD_HASH_WORKERS}")
+    run("inline", pwd_context.verify)
+    run("pooled", password_hasher.verify)
+    print(password_hasher.stats())
@@ -0,0 +1,84 @@
+"""
+Benchmark crew recommendations against scoring every crew member
+
+Builds the in-process crew index from synthetic crew spread over Great
+Britain (no database needed), then ranks crew for random jobs and
+reports p50/p99 latency. Each ranking is checked against a brute-force
+scan of the same pool of nearest crew.
+
+Usage: python benchmark_recommender.py [crew] [jobs]
+"""
+
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from app.models.job import Job
+from app.core.crew_recommender import CrewCandidate, CANDIDATE_POOL_FACTOR, crew_index, distance_km, score
+
+CREW = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+JOBS = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+LIMIT = 5
+
+# Rough bounding box of Great Britain
+LATITUDES = (50.0, 58.5)
+LONGITUDES = (-5.5, 1.7)
+
+
+def synthetic_crew(rng: random.Random) -> list:
+    crew = []
+    for n in range(CREW):
+        located = rng.random() > 0.05
+        crew.append(CrewCandidate(
+            f"crew-{n}", f"Crew {n}", rng.choice(("available", "assigned")),
+            rng.uniform(*LATITUDES) if located else None,
+            rng.uniform(*LONGITUDES) if located else None,
+            "last_job" if located else None,
+            rng.choice((0, 0, 0, 1, 2)),
+            rng.choice((None, 3.5, 4.0, 4.5, 5.0))
+        ))
+    return crew
+
+
+def brute_force(crew: list, job: Job, urgency: str) -> list:
+    located = [
+        (distance_km(job.latitude, job.longitude, c.latitude, c.longitude), c)
+        for c in crew if c.latitude is not None
+    ]
+    pool = sorted(located, key=lambda pair: (pair[0], pair[1].id))[:LIMIT * CANDIDATE_POOL_FACTOR]
+    if len(pool) < LIMIT * CANDIDATE_POOL_FACTOR:
+        pool += [(None, c) for c in crew if c.latitude is None]
+    ranked = sorted(pool, key=lambda pair: (score(pair[0], pair[1], urgency), pair[1].id))[:LIMIT]
+    return [c.id for _, c in ranked]
+
+
+if __name__ == "__main__":
+    rng = random.Random(7)
+    crew = synthetic_crew(rng)
+    # Never rebuild from the database mid-run
+    crew_index.ttl_seconds = 10 ** 9
+    started = time.perf_counter()
+    crew_index.build(crew)
+    print(f"{CREW} crew indexed in {(time.perf_counter() - started) * 1000:.1f} ms ({crew_index.stats()['cells']} cells)")
+
+    now = datetime.utcnow()
+    timings = []
+    mismatches = 0
+    for n in range(JOBS):
+        job = Job(
+            id=f"job-{n}", latitude=rng.uniform(*LATITUDES), longitude=rng.uniform(*LONGITUDES), status="deposit_paid",
+            created_at=now, sla_deadline=now + timedelta(hours=rng.choice((1, 8, 24)))
+        )
+        started = time.perf_counter()
+        ranked = crew_index.recommend(job, LIMIT)
+        timings.append((time.perf_counter() - started) * 1000)
+        if [row["crew_id"] for row in ranked] != brute_force(crew, job, ranked[0]["sla_state"]):
+            mismatches += 1
+
+    timings.sort()
+    print(f"{JOBS} recommendations: p50 {statistics.median(timings):.3f} ms, "
+          f"p99 {timings[int(len(timings) * 0.99) - 1]:.3f} ms, max {timings[-1]:.3f} ms")
+    print(f"rankings different from brute force: {mismatches}")
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,195 @@
+"""
+Benchmark light request latency while photo uploads are in flight
+
+Serves the real /crew/jobs/{job_id} and /crew/jobs/{job_id}/upload-before-photo
+handlers from a scratch SQLite database. The storage layer is replaced by
+a stand-in whose uploads block for UPLOAD_SECONDS, as boto3 does. Auth is
+replaced by a fixed crew member, and reference data comes from a filled
+cache. Requests go through httpx's in-process ASGI transport, so the app
+runs on this event loop.
+
+CONCURRENT_UPLOADS clients post photos back to back, each to a fresh job,
+while one client times LIGHT_REQUESTS GETs of one job, one after
+another. This runs three times:
+  - idle: no uploads, for reference
+  - before: handlers wrapped in async def, as they were before they
+    became plain def. The blocking upload then runs on the event loop.
+  - after: the handlers as they are, run on the worker thread pool
+During "before" every GET waits behind the uploads on the loop; during
+"after" its p50/p99 should stay close to "idle".
+
+Usage: python benchmark_request_latency.py [concurrent uploads] [light requests] [upload seconds]
+"""
+
+import asyncio
+import functools
+import itertools
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+from anyio import to_thread
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.reference_data import REFERENCE_TABLES, reference_data
+from app.core.security import Principal, get_current_crew
+from app.database.db import Base, get_db
+from app.database.replica import get_read_db
+from app.models import analytics, client, crew as crew_models, invoice, job as job_models, job_dashboard, photo, sla
+from app.routers import job as job_router
+
+CONCURRENT_UPLOADS = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+LIGHT_REQUESTS = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+UPLOAD_SECONDS = float(sys.argv[3]) if len(sys.argv) > 3 else 0.1
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "40"))
+
+CREW = Principal(
+    id="bench-crew", email="bench-crew@example.com", role="Crew", full_name="Bench Crew", is_approved=True
+)
+LIGHT_JOB_ID = "bench-light-job"
+PHOTO = b"\xff\xd8" + b"0" * 200_000
+
+
+class StandInStorage:
+    """Uploads that block like boto3 against a slow link, without sending anything"""
+
+    def upload_job_photos(self, files, job_id: str, photo_type: str):
+        time.sleep(UPLOAD_SECONDS)
+        return [
+            {"filename": filename, "url": f"https://storage.example.com/job_photos/{job_id}/{photo_type}/{filename}"}
+            for _, filename in files
+        ]
+
+    def delete_files(self, file_urls) -> int:
+        return len(file_urls)
+
+
+def as_async(endpoint):
+    """The handler declared async def, so FastAPI calls it on the event loop"""
+    @functools.wraps(endpoint)
+    async def handler(*args, **kwargs):
+        return endpoint(*args, **kwargs)
+    return handler
+
+
+def make_app(Session, blocking_on_loop: bool) -> FastAPI:
+    def get_session():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    wrap = as_async if blocking_on_loop else (lambda endpoint: endpoint)
+    app = FastAPI()
+    app.add_api_route("/crew/jobs/{job_id}", wrap(job_router.get_crew_job_by_id), methods=["GET"])
+    app.add_api_route(
+        "/crew/jobs/{job_id}/upload-before-photo", wrap(job_router.upload_before_photo), methods=["POST"]
+    )
+    app.dependency_overrides = {
+        get_db: get_session,
+        get_read_db: get_session,
+        get_current_crew: lambda: CREW,
+    }
+    return app
+
+
+def seed(Session):
+    with Session() as db:
+        db.add(crew_models.Crew(
+            id=CREW.id, email=CREW.email, full_name=CREW.full_name, password_hash="x",
+            is_approved=True, status="assigned"
+        ))
+        db.add(job_models.Job(
+            id=LIGHT_JOB_ID, service_type="void", property_address="1 High Street",
+            preferred_date="2026-01-01", preferred_time="09:00", status="crew_assigned",
+            assigned_crew_id=CREW.id
+        ))
+        db.commit()
+
+
+def arrived_job(Session, job_id: str) -> str:
+    """A fresh job waiting for its before photos (every upload moves its job on)"""
+    with Session() as db:
+        db.add(job_models.Job(
+            id=job_id, service_type="void", property_address="1 High Street",
+            preferred_date="2026-01-01", preferred_time="09:00", status="crew_arrived",
+            assigned_crew_id=CREW.id
+        ))
+        db.commit()
+    return job_id
+
+
+async def upload_loop(client, Session, job_ids, done: asyncio.Event, statuses: list):
+    while not done.is_set():
+        job_id = await asyncio.to_thread(arrived_job, Session, next(job_ids))
+        response = await client.post(
+            f"/crew/jobs/{job_id}/upload-before-photo",
+            files=[("photos", ("photo.jpg", PHOTO, "image/jpeg"))]
+        )
+        statuses.append(response.status_code)
+
+
+async def run(app: FastAPI, Session, job_ids, uploads: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        done = asyncio.Event()
+        statuses = []
+        uploaders = [asyncio.create_task(upload_loop(client, Session, job_ids, done, statuses)) for _ in range(uploads)]
+        # Let the uploads get going first
+        await asyncio.sleep(UPLOAD_SECONDS if uploads else 0)
+
+        latencies = []
+        for _ in range(LIGHT_REQUESTS):
+            started = time.perf_counter()
+            response = await client.get(f"/crew/jobs/{LIGHT_JOB_ID}")
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.text
+
+        done.set()
+        await asyncio.gather(*uploaders)
+
+    latencies.sort()
+    return {
+        "p50": statistics.median(latencies) * 1000,
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "uploads": len(statuses),
+        "failed_uploads": sum(1 for status in statuses if status != 200),
+    }
+
+
+async def main():
+    to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    reference_data._tables = {name: {} for name in REFERENCE_TABLES}
+    reference_data._expires_at = {name: float("inf") for name in REFERENCE_TABLES}
+
+    path = os.path.join(tempfile.mkdtemp(), "latency.db")
+    engine = create_engine(
+        f"sqlite:///{path}", connect_args={"check_same_thread": False, "timeout": 30},
+        pool_size=THREADPOOL_SIZE, max_overflow=0
+    )
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    seed(Session)
+    job_ids = (f"bench-job-{n}" for n in itertools.count())
+
+    job_router.storage = StandInStorage()
+
+    print(
+        f"{LIGHT_REQUESTS} GET /crew/jobs/{{job_id}} during {CONCURRENT_UPLOADS} concurrent uploads "
+        f"of {UPLOAD_SECONDS * 1000:.0f} ms each (thread pool {THREADPOOL_SIZE})"
+    )
+    print(f"{'':<8} {'p50 ms':>10} {'p99 ms':>10} {'uploads':>10}")
+    for label, blocking_on_loop, uploads in (("idle", False, 0), ("before", True, CONCURRENT_UPLOADS), ("after", False, CONCURRENT_UPLOADS)):
+        result = await run(make_app(Session, blocking_on_loop), Session, job_ids, uploads)
+        failed = f" ({result['failed_uploads']} failed)" if result["failed_uploads"] else ""
+        print(f"{label:<8} {result['p50']:>10.1f} {result['p99']:>10.1f} {result['uploads']:>10}{failed}", flush=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
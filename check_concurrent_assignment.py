@@ -0,0 +1,286 @@
+"""
+Check that concurrent crew assignments never double book a job or a crew member
+
+Two races, each through the assign-crew endpoint with one session per
+thread and all threads released at once:
+  - many crew for one job: for each job, ASSIGNERS threads try to assign
+    it a different available crew member. Exactly one must succeed and
+    the stored crew and dashboard row must be the winner's.
+  - one crew for many jobs: for each crew member, ASSIGNERS threads try
+    to assign them to a different job. At most one must succeed, and the
+    crew member must end up on exactly the winning job.
+The losers must get 409 (or 400 when they read the job after the
+winner committed).
+
+Then, once per kind of interference, a batch assignment of two jobs
+during which another writer changes one of them: the client backend
+cancelling it (status only) or another request editing it (version
+bump). The batch must still return per-pair results, with only the
+changed job rejected, and must not write its crew or bump its version.
+
+Uses CHECK_DATABASE_URL when set (a Postgres database migrated to head;
+the seeded rows are deleted afterwards), otherwise a temporary SQLite file.
+
+Usage: python check_concurrent_assignment.py [rounds] [assigners per round]
+Exits 1 if anything was double booked.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event, update
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.database.db import Base
+from app.models import analytics, client, crew as crew_models, invoice, job as job_models, job_dashboard, photo, sla
+from app.routers.admin import BatchAssignCrewRequest, assign_crew_batch, assign_crew_to_job
+
+ROUNDS = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+ASSIGNERS = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+PREFIX = "cas-check-"
+
+# Batch race -> (values another writer sets on one of the batch's jobs mid-batch, expected version afterwards)
+BATCH_RACES = {
+    # The client backend cancels the job; it does not bump version
+    "cancelled": ({"status": "cancelled"}, 1),
+    # Another request changes the job, bumping version
+    "edited": ({"version": job_models.Job.version + 1}, 2),
+}
+
+
+class CheckAdmin:
+    id = f"{PREFIX}admin"
+
+
+def make_engine():
+    url = os.getenv("CHECK_DATABASE_URL")
+    if url:
+        return create_engine(url, pool_size=ASSIGNERS, max_overflow=0)
+    path = os.path.join(tempfile.mkdtemp(), "assignments.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False, "timeout": 30})
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def crew_id(scenario: str, n: int, k: int) -> str:
+    return f"{PREFIX}{scenario}-crew-{n}-{k}"
+
+
+def job_id(scenario: str, n: int, k: int) -> str:
+    return f"{PREFIX}{scenario}-job-{n}-{k}"
+
+
+def seed(Session):
+    """Per round: one job and ASSIGNERS crew ("job" race), one crew and ASSIGNERS jobs ("crew" race)"""
+    now = datetime.utcnow()
+    with Session() as db:
+        for n in range(ROUNDS):
+            crew_ids = [crew_id("job", n, k) for k in range(ASSIGNERS)] + [crew_id("crew", n, 0)]
+            job_ids = [job_id("job", n, 0)] + [job_id("crew", n, k) for k in range(ASSIGNERS)]
+            for id in crew_ids:
+                db.add(crew_models.Crew(
+                    id=id, email=f"{id}@example.com", full_name=id, password_hash="x",
+                    is_approved=True, status="available"
+                ))
+            for id in job_ids:
+                db.add(job_models.Job(
+                    id=id, service_type="void", property_address="1 High Street",
+                    preferred_date="2026-01-01", preferred_time="09:00", status="deposit_paid",
+                    created_at=now, sla_deadline=now + timedelta(hours=24)
+                ))
+        db.commit()
+
+
+def seed_batch(Session):
+    """Per batch race: two deposit_paid jobs and two available crew"""
+    now = datetime.utcnow()
+    with Session() as db:
+        for race in BATCH_RACES:
+            for k in range(2):
+                id = crew_id(f"batch-{race}", 0, k)
+                db.add(crew_models.Crew(
+                    id=id, email=f"{id}@example.com", full_name=id, password_hash="x",
+                    is_approved=True, status="available"
+                ))
+                db.add(job_models.Job(
+                    id=job_id(f"batch-{race}", 0, k), service_type="void", property_address="1 High Street",
+                    preferred_date="2026-01-01", preferred_time="09:00", status="deposit_paid",
+                    created_at=now, sla_deadline=now + timedelta(hours=24)
+                ))
+        db.commit()
+
+
+def batch_race(engine, Session, race: str) -> list:
+    """Assign both of the race's jobs in one batch while another writer changes the first; returns failures"""
+    values, expected_version = BATCH_RACES[race]
+    scenario = f"batch-{race}"
+    changed, other = job_id(scenario, 0, 0), job_id(scenario, 0, 1)
+    changed_crew, other_crew = crew_id(scenario, 0, 0), crew_id(scenario, 0, 1)
+    interfered = []
+
+    def interfere(orm_execute_state):
+        # Just before the batch's first write (claiming the crew), after it loaded the jobs
+        if orm_execute_state.is_update and not interfered:
+            interfered.append(True)
+            with engine.begin() as conn:
+                conn.execute(update(job_models.Job).where(job_models.Job.id == changed).values(**values))
+
+    db = Session()
+    event.listen(db, "do_orm_execute", interfere)
+    request = BatchAssignCrewRequest(assignments=[
+        {"job_id": changed, "crew_id": changed_crew}, {"job_id": other, "crew_id": other_crew}
+    ])
+    try:
+        results = {result["job_id"]: result for result in assign_crew_batch(request, admin=CheckAdmin, db=db)["results"]}
+    except (HTTPException, StaleDataError) as e:
+        db.rollback()
+        return [f"{scenario}: the whole batch failed ({type(e).__name__}) instead of rejecting one pair"]
+    finally:
+        db.close()
+
+    failures = []
+    if (results[changed]["status"], results[changed]["detail"]) != ("rejected", "Job was changed by another request"):
+        failures.append(f"{scenario}: changed job reported {results[changed]['status']} {results[changed]['detail']!r}")
+    if results[other]["status"] != "assigned":
+        failures.append(f"{scenario}: other job reported {results[other]['status']} {results[other]['detail']!r}")
+    with Session() as db:
+        job = db.get(job_models.Job, changed)
+        if job.assigned_crew_id or job.assigned_by or job.version != expected_version:
+            failures.append(
+                f"{scenario}: changed job stored crew {job.assigned_crew_id}, "
+                f"assigned by {job.assigned_by}, version {job.version} (expected {expected_version})"
+            )
+        if db.get(crew_models.Crew, changed_crew).status != "available":
+            failures.append(f"{scenario}: crew of the changed job was not released")
+        job = db.get(job_models.Job, other)
+        if (job.status, job.assigned_crew_id) != ("crew_assigned", other_crew):
+            failures.append(f"{scenario}: other job stored {job.status} / {job.assigned_crew_id}")
+    return failures
+
+
+def cleanup(Session):
+    with Session() as db:
+        job_ids = db.query(job_models.Job.id).filter(job_models.Job.id.like(f"{PREFIX}%"))
+        db.query(job_dashboard.JobDashboard).filter(job_dashboard.JobDashboard.job_id.in_(job_ids)).delete(
+            synchronize_session=False
+        )
+        db.query(job_models.Job).filter(job_models.Job.id.like(f"{PREFIX}%")).delete(synchronize_session=False)
+        db.query(crew_models.Crew).filter(crew_models.Crew.id.like(f"{PREFIX}%")).delete(synchronize_session=False)
+        db.commit()
+
+
+def assign(Session, barrier, job: str, crew: str) -> int:
+    barrier.wait()
+    db = Session()
+    try:
+        assign_crew_to_job(job, crew, admin=CheckAdmin, db=db)
+        return 200
+    except HTTPException as e:
+        db.rollback()
+        return e.status_code
+    except StaleDataError:
+        # Mapped to 409 by the app's exception handler
+        db.rollback()
+        return 409
+    finally:
+        db.close()
+
+
+def race(pool, Session, attempts: list, statuses: dict) -> list:
+    """Run the (job, crew) attempts at once; returns the ones that succeeded"""
+    barrier = threading.Barrier(len(attempts))
+    futures = {pool.submit(assign, Session, barrier, job, crew): (job, crew) for job, crew in attempts}
+    won = []
+    for future, attempt in futures.items():
+        status = future.result()
+        statuses[status] += 1
+        if status == 200:
+            won.append(attempt)
+    return won
+
+
+if __name__ == "__main__":
+    engine = make_engine()
+    Session = sessionmaker(bind=engine, autoflush=False)
+    seed(Session)
+    seed_batch(Session)
+
+    statuses = {"job": defaultdict(int), "crew": defaultdict(int)}
+    winners = {"job": {}, "crew": {}}
+    started = time.perf_counter()
+    failures = []
+    try:
+        with ThreadPoolExecutor(ASSIGNERS) as pool:
+            for n in range(ROUNDS):
+                attempts = [(job_id("job", n, 0), crew_id("job", n, k)) for k in range(ASSIGNERS)]
+                winners["job"][n] = race(pool, Session, attempts, statuses["job"])
+                attempts = [(job_id("crew", n, k), crew_id("crew", n, 0)) for k in range(ASSIGNERS)]
+                winners["crew"][n] = race(pool, Session, attempts, statuses["crew"])
+        elapsed = time.perf_counter() - started
+
+        with Session() as db:
+            jobs = {job.id: job for job in db.query(job_models.Job).filter(job_models.Job.id.like(f"{PREFIX}%"))}
+            rows = {
+                row.job_id: row
+                for row in db.query(job_dashboard.JobDashboard).filter(job_dashboard.JobDashboard.job_id.in_(jobs))
+            }
+            crew = {member.id: member for member in db.query(crew_models.Crew).filter(
+                crew_models.Crew.id.like(f"{PREFIX}%")
+            )}
+            crew_jobs = defaultdict(list)
+            for job in jobs.values():
+                if job.assigned_crew_id:
+                    crew_jobs[job.assigned_crew_id].append(job.id)
+
+            for n in range(ROUNDS):
+                # Many crew for one job
+                won = winners["job"][n]
+                job = jobs[job_id("job", n, 0)]
+                if len(won) != 1:
+                    failures.append(f"{job.id}: {len(won)} successful assignments")
+                elif job.assigned_crew_id != won[0][1] or job.status != "crew_assigned":
+                    failures.append(f"{job.id}: stored {job.assigned_crew_id} ({job.status}), winner was {won[0][1]}")
+                elif job.id in rows and rows[job.id].status != job.status:
+                    failures.append(f"{job.id}: dashboard row is {rows[job.id].status}")
+
+                # One crew for many jobs
+                won = winners["crew"][n]
+                member = crew_id("crew", n, 0)
+                if len(won) > 1:
+                    failures.append(f"{member}: {len(won)} successful assignments")
+                elif sorted(crew_jobs.get(member, [])) != [job for job, _ in won]:
+                    failures.append(f"{member}: on jobs {crew_jobs.get(member, [])}, winner was {won}")
+                elif won and crew[member].status != "assigned":
+                    failures.append(f"{member}: status is {crew[member].status}")
+
+            for member, assigned in crew_jobs.items():
+                if len(assigned) > 1:
+                    failures.append(f"{member}: assigned to {len(assigned)} jobs")
+
+        batch_failures = []
+        for race in BATCH_RACES:
+            batch_failures += batch_race(engine, Session, race)
+    finally:
+        cleanup(Session)
+
+    print(f"{ROUNDS} rounds x {ASSIGNERS} concurrent assigners ({engine.dialect.name}) in {elapsed:.1f} s")
+    for scenario, label in (("job", "many crew for one job"), ("crew", "one crew for many jobs")):
+        counts = ", ".join(f"{status}: {count}" for status, count in sorted(statuses[scenario].items()))
+        print(f"{label}: {counts}")
+    for failure in failures:
+        print(f"DOUBLE BOOKED {failure}")
+    print(f"double bookings: {len(failures)}")
+    for race in BATCH_RACES:
+        failed = [failure for failure in batch_failures if failure.startswith(f"batch-{race}:")]
+        print(f"batch with a job {race} mid-batch: {'FAIL' if failed else 'ok'}")
+    for failure in batch_failures:
+        print(f"BATCH {failure}")
+    sys.exit(1 if failures or batch_failures else 0)
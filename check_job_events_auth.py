@@ -0,0 +1,146 @@
+"""
+Check how the live job events stream (SSE) is authenticated
+
+Serves the admin router from a scratch SQLite database holding one
+admin and one crew member. Requests are driven straight through ASGI,
+so the stream can be read up to its first chunk and then disconnected.
+Checks that:
+  - an admin's access token gets a stream token from POST /admin/events/token,
+  - the stream opens with ?token=<stream token>, as a browser's
+    EventSource does, and with the Authorization header, as before,
+  - it is refused without a token, with an access token in the URL,
+    with an expired stream token and with a crew member's stream token,
+  - a stream token is not accepted as a bearer token anywhere else.
+
+Usage: python check_job_events_auth.py
+Exits 1 if any check fails.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core import security
+from app.core.reference_data import REFERENCE_TABLES, reference_data
+from app.core.security import create_access_token, create_stream_token
+from app.database.db import Base, get_db
+from app.database.replica import get_read_db
+from app.models import analytics, client, crew as crew_models, invoice, job, job_dashboard, photo, sla
+from app.routers import admin
+
+ADMIN_EMAIL = "events-admin@example.com"
+CREW_EMAIL = "events-crew@example.com"
+
+
+def make_app() -> FastAPI:
+    path = os.path.join(tempfile.mkdtemp(), "events.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    with Session() as db:
+        db.add(crew_models.Admin(id="events-admin", email=ADMIN_EMAIL, full_name="Events Admin", password_hash="x"))
+        db.add(crew_models.Crew(
+            id="events-crew", email=CREW_EMAIL, full_name="Events Crew", password_hash="x",
+            is_approved=True, status="available"
+        ))
+        db.commit()
+
+    def get_session():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(admin.router, prefix="/api")
+    app.dependency_overrides = {get_db: get_session, get_read_db: get_session}
+    return app
+
+
+async def call(app: FastAPI, method: str, url: str, token: str = None):
+    """(status, body up to the first chunk) of one request, disconnecting once that has arrived"""
+    path, _, query = url.partition("?")
+    headers = [(b"authorization", f"Bearer {token}".encode())] if token else []
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": query.encode(), "headers": headers,
+        "client": ("127.0.0.1", 50000), "server": ("check", 80),
+    }
+    disconnected = asyncio.Event()
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    messages = asyncio.Queue()
+    task = asyncio.create_task(app(scope, receive, messages.put))
+    start = await asyncio.wait_for(messages.get(), 10)
+    body = b""
+    while True:
+        message = await asyncio.wait_for(messages.get(), 10)
+        body += message.get("body", b"")
+        if body or not message.get("more_body"):
+            break
+    disconnected.set()
+    try:
+        await asyncio.wait_for(task, 5)
+    except asyncio.TimeoutError:
+        pass
+    return start["status"], body.decode()
+
+
+async def main(check):
+    app = make_app()
+    access_token = create_access_token({"sub": ADMIN_EMAIL, "role": "Admin"})
+
+    status, body = await call(app, "POST", "/api/admin/events/token", access_token)
+    check("an admin gets a stream token", status == 200 and "token" in json.loads(body))
+    stream_token = json.loads(body).get("token") if status == 200 else None
+
+    status, body = await call(app, "GET", f"/api/admin/events/jobs?token={stream_token}")
+    check("the stream opens with ?token=<stream token>", status == 200 and body.startswith("retry:"))
+    status, body = await call(app, "GET", "/api/admin/events/jobs", access_token)
+    check("the stream opens with the Authorization header", status == 200 and body.startswith("retry:"))
+
+    status, _ = await call(app, "GET", "/api/admin/events/jobs")
+    check("the stream is refused without a token", status == 401)
+    status, _ = await call(app, "GET", f"/api/admin/events/jobs?token={access_token}")
+    check("the stream is refused with an access token in the URL", status == 401)
+    security.STREAM_TOKEN_EXPIRE_SECONDS, expire_seconds = -1, security.STREAM_TOKEN_EXPIRE_SECONDS
+    expired_token = create_stream_token({"sub": ADMIN_EMAIL, "role": "Admin"})
+    security.STREAM_TOKEN_EXPIRE_SECONDS = expire_seconds
+    status, _ = await call(app, "GET", f"/api/admin/events/jobs?token={expired_token}")
+    check("the stream is refused with an expired stream token", status == 401)
+    crew_token = create_stream_token({"sub": CREW_EMAIL, "role": "Crew"})
+    status, _ = await call(app, "GET", f"/api/admin/events/jobs?token={crew_token}")
+    check("the stream is refused with a crew member's stream token", status == 403)
+
+    status, _ = await call(app, "GET", "/api/admin/dashboard/summary", stream_token)
+    check("a stream token is not a bearer token elsewhere", status == 401)
+
+
+if __name__ == "__main__":
+    failures = []
+
+    def check(description: str, ok: bool):
+        print(f"{'ok  ' if ok else 'FAIL'} {description}")
+        if not ok:
+            failures.append(description)
+
+    reference_data._tables = {name: {} for name in REFERENCE_TABLES}
+    reference_data._expires_at = {name: float("inf") for name in REFERENCE_TABLES}
+    asyncio.run(main(check))
+    sys.exit(1 if failures else 0)
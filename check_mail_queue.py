@@ -0,0 +1,251 @@
+"""
+Check the outbound mail queue against a local SMTP stub
+
+Runs a small SMTP server on 127.0.0.1, with STARTTLS using a throwaway
+self-signed certificate (made with the openssl command) and AUTH. It
+points SMTP_* at that server and drives a MailQueue with its own spool
+in a temporary directory:
+  - delivery: queued messages arrive with their recipient and subject
+    and leave the spool
+  - connection reuse: a second batch is sent over the connections the
+    first one opened (at most MAIL_POOL_SIZE), without opening new ones
+  - dropped connections: the server drops every idle pooled connection;
+    the next message must still go out on its first attempt, over one
+    newly opened connection
+  - retry with backoff: a recipient refused twice with 451 is delivered
+    on the third attempt, each retry waiting at least twice as long as
+    the one before
+  - dead-lettering: a recipient always refused with 550 is marked dead
+    after MAIL_MAX_ATTEMPTS attempts and not tried again
+
+Usage: python check_mail_queue.py
+Exits 1 if any check fails.
+"""
+
+import email
+import os
+import socket
+import socketserver
+import sqlite3
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+from app.core import mail_queue as mail_queue_module
+from app.core.mail_queue import MailQueue
+
+POOL_SIZE = 2
+RETRY_BASE_SECONDS = 0.5
+MAX_ATTEMPTS = 3
+# Recipients starting "flaky" are refused with 451 this many times, then accepted
+FLAKY_FAILURES = 2
+
+
+class StubSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, tls_context: ssl.SSLContext):
+        super().__init__(("127.0.0.1", 0), StubSMTPHandler)
+        self.tls_context = tls_context
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.open_sockets = set()
+        self.received = []
+        self.recipient_attempts = defaultdict(list)
+
+    def drop_all(self):
+        """Close every open connection from the server side, as an SMTP server does with idle clients"""
+        with self.lock:
+            sockets, self.open_sockets = self.open_sockets, set()
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+                sock.close()
+            except OSError:
+                pass
+
+
+class StubSMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        with self.server.lock:
+            self.server.connections += 1
+            self.server.open_sockets.add(self.connection)
+        try:
+            self.converse()
+        except (OSError, ValueError):
+            # Dropped by drop_all or by the client
+            pass
+
+    def converse(self):
+        tls = False
+        data = None
+        self.reply("220 stub ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            line = line.decode().rstrip("\r\n")
+            if data is not None:
+                if line == ".":
+                    with self.server.lock:
+                        self.server.received.append(email.message_from_string("\r\n".join(data)))
+                    data = None
+                    self.reply("250 queued")
+                else:
+                    data.append(line[1:] if line.startswith("..") else line)
+                continue
+
+            command, _, argument = line.partition(" ")
+            command = command.upper()
+            if command == "EHLO":
+                self.reply("250-stub")
+                self.reply("250 AUTH PLAIN LOGIN" if tls else "250 STARTTLS")
+            elif command == "STARTTLS":
+                self.reply("220 ready")
+                with self.server.lock:
+                    self.server.open_sockets.discard(self.connection)
+                    self.connection = self.server.tls_context.wrap_socket(self.connection, server_side=True)
+                    self.server.open_sockets.add(self.connection)
+                self.rfile = self.connection.makefile("rb")
+                self.wfile = self.connection.makefile("wb", buffering=0)
+                tls = True
+            elif command == "AUTH":
+                self.reply("235 authenticated")
+            elif command == "RCPT":
+                self.reply(self.recipient_reply(argument.split(":", 1)[1].strip("<> ")))
+            elif command == "DATA":
+                data = []
+                self.reply("354 go ahead")
+            elif command == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("250 ok")
+
+    def recipient_reply(self, address: str) -> str:
+        with self.server.lock:
+            attempts = self.server.recipient_attempts[address]
+            attempts.append(time.monotonic())
+        if address.startswith("bounce"):
+            return "550 no such mailbox"
+        if address.startswith("flaky") and len(attempts) <= FLAKY_FAILURES:
+            return "451 try again later"
+        return "250 ok"
+
+
+def tls_context(directory: str) -> ssl.SSLContext:
+    cert, key = os.path.join(directory, "stub.crt"), os.path.join(directory, "stub.key")
+    try:
+        subprocess.run(
+            ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+             "-subj", "/CN=localhost", "-keyout", key, "-out", cert],
+            check=True, capture_output=True
+        )
+    except (OSError, subprocess.CalledProcessError) as e:
+        sys.exit(f"Could not make a certificate for the SMTP stub with openssl: {e}")
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    return context
+
+
+def wait_for(queue: MailQueue, condition, timeout: float = 30) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        # As enqueue() does, so retries are picked up as soon as they are due
+        queue._wakeup.set()
+        time.sleep(0.05)
+    return False
+
+
+def spooled(spool_path: str, to_addr: str):
+    """(status, attempts, last_error) of the spooled message to to_addr, or None once sent"""
+    with sqlite3.connect(spool_path) as conn:
+        return conn.execute("SELECT status, attempts, last_error FROM outbox WHERE to_addr = ?", (to_addr,)).fetchone()
+
+
+if __name__ == "__main__":
+    failures = []
+
+    def check(description: str, ok: bool):
+        print(f"{'ok  ' if ok else 'FAIL'} {description}")
+        if not ok:
+            failures.append(description)
+
+    directory = tempfile.mkdtemp()
+    server = StubSMTPServer(tls_context(directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    os.environ.update({
+        "SMTP_SERVER": "127.0.0.1", "SMTP_PORT": str(server.server_address[1]),
+        "SMTP_USER": "check@example.com", "SMTP_PASSWORD": "check",
+    })
+    mail_queue_module.MAIL_RETRY_BASE_SECONDS = RETRY_BASE_SECONDS
+    mail_queue_module.MAIL_MAX_ATTEMPTS = MAX_ATTEMPTS
+
+    spool_path = os.path.join(directory, "spool.db")
+    queue = MailQueue(spool_path, POOL_SIZE)
+    queue.start()
+    try:
+        # ---- delivery and connection reuse ----
+        for n in range(6):
+            queue.enqueue(f"crew-{n}@example.com", f"Message {n}", "Hello", "Check email")
+        check("a first batch is delivered", wait_for(queue, lambda: queue.sent == 6))
+        check("every message arrives with its recipient and subject", sorted(
+            (message["To"], message["Subject"]) for message in server.received
+        ) == [(f"crew-{n}@example.com", f"Message {n}") for n in range(6)])
+        check("delivered messages leave the spool", queue.spool.counts() == {})
+        opened = server.connections
+        check(f"at most {POOL_SIZE} connections are opened", 1 <= opened <= POOL_SIZE)
+
+        for n in range(6, 10):
+            queue.enqueue(f"crew-{n}@example.com", f"Message {n}", "Hello", "Check email")
+        check("a second batch is delivered", wait_for(queue, lambda: queue.sent == 10))
+        check("the second batch reuses the pooled connections", server.connections == opened)
+
+        # ---- connections dropped by the server while idle ----
+        with queue._pool.connection():
+            with queue._pool.connection():
+                pass
+        server.drop_all()
+        opened = server.connections
+        queue.enqueue("after-drop@example.com", "After drop", "Hello", "Check email")
+        check("a message is delivered after the server dropped the pool", wait_for(queue, lambda: queue.sent == 11))
+        check("it goes out on its first attempt", queue.failed == 0)
+        check("over one newly opened connection", server.connections == opened + 1)
+
+        # ---- retry with backoff, and dead-lettering ----
+        queue.enqueue("flaky@example.com", "Flaky", "Hello", "Check email")
+        queue.enqueue("bounce@example.com", "Bounce", "Hello", "Check email")
+        check("a refused message is delivered once accepted", wait_for(queue, lambda: queue.sent == 12))
+        attempts = server.recipient_attempts["flaky@example.com"]
+        gaps = [later - earlier for earlier, later in zip(attempts, attempts[1:])]
+        check(f"it took {FLAKY_FAILURES + 1} attempts", len(attempts) == FLAKY_FAILURES + 1)
+        check(
+            "each retry waited out its backoff (" + ", ".join(f"{gap:.2f} s" for gap in gaps) + ")",
+            all(gap >= RETRY_BASE_SECONDS * 2 ** k for k, gap in enumerate(gaps))
+        )
+
+        check("an always-refused message is marked dead", wait_for(
+            queue, lambda: (spooled(spool_path, "bounce@example.com") or ("",))[0] == "dead"
+        ))
+        status, attempts, last_error = spooled(spool_path, "bounce@example.com")
+        check(f"after {MAX_ATTEMPTS} attempts", attempts == MAX_ATTEMPTS)
+        check("with the server's refusal as its last error", "550" in (last_error or ""))
+        time.sleep(RETRY_BASE_SECONDS * 2 ** MAX_ATTEMPTS)
+        check("a dead message is not tried again", len(server.recipient_attempts["bounce@example.com"]) == MAX_ATTEMPTS)
+        check("the queue reports it", queue.stats()["dead"] == 1 and queue.stats()["pending"] == 0)
+    finally:
+        queue.stop()
+        server.shutdown()
+
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,164 @@
+"""
+Check concurrent job photo uploads against a local S3 stand-in (moto)
+
+Needs moto (pip install "moto[s3]"); nothing is sent to Utho.
+  - upload_job_photos: uploads a batch with one small file, one file big
+    enough for a multipart upload, and one file that fails while being
+    read. The result must list every file in input order, with url None
+    only for the failed one, and the bucket must hold exactly the other
+    two with their full contents.
+  - upload_before_photo: another request changes the job while its
+    photos are uploading, so the transition fails with 409. The photos
+    already uploaded must be deleted again and no JobPhoto rows kept.
+
+Usage: python check_photo_uploads.py
+Exits 1 if any check fails.
+"""
+
+import io
+import os
+import sys
+import tempfile
+
+try:
+    from moto import mock_aws
+except ImportError:
+    sys.exit("moto is not installed: pip install \"moto[s3]\"")
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+from app.core import storage as storage_module
+from app.database.db import Base
+from app.models import analytics, client, crew as crew_models, invoice, job as job_models, job_dashboard, photo, sla
+from app.routers import job as job_router
+
+MB = 1024 * 1024
+
+# Set after the app's imports, which load .env over the environment
+STAND_IN_ENVIRONMENT = {
+    "UTHO_ACCESS_KEY": "check", "UTHO_SECRET_KEY": "check", "UTHO_BUCKET_NAME": "check-photos",
+    "UTHO_ENDPOINT_URL": "https://s3.us-east-1.amazonaws.com", "UTHO_REGION": "us-east-1",
+}
+
+
+class FailingFile(io.BytesIO):
+    """A file whose read fails part of the way through, like a dropped mobile upload"""
+
+    def read(self, size=-1):
+        raise IOError("connection reset while reading upload")
+
+
+class RacingFile(io.BytesIO):
+    """A file that, on its first read, lets another request move the job on"""
+
+    def __init__(self, data: bytes, on_read):
+        super().__init__(data)
+        self.on_read = on_read
+
+    def read(self, size=-1):
+        if self.on_read:
+            self.on_read()
+            self.on_read = None
+        return super().read(size)
+
+
+class StandInUpload:
+    def __init__(self, file, filename: str):
+        self.file = file
+        self.filename = filename
+
+
+class StandInCrew:
+    id = "photo-check-crew"
+
+
+def bucket_objects(storage) -> dict:
+    response = storage.s3_client.list_objects_v2(Bucket=storage.bucket_name)
+    return {
+        item["Key"]: storage.s3_client.get_object(Bucket=storage.bucket_name, Key=item["Key"])["Body"].read()
+        for item in response.get("Contents", [])
+    }
+
+
+def clear_bucket(storage):
+    for key in bucket_objects(storage):
+        storage.s3_client.delete_object(Bucket=storage.bucket_name, Key=key)
+
+
+def object_key(storage, url: str) -> str:
+    return url.split(f"{storage.bucket_name}/", 1)[1]
+
+
+if __name__ == "__main__":
+    failures = []
+
+    def check(description: str, ok: bool):
+        print(f"{'ok  ' if ok else 'FAIL'} {description}")
+        if not ok:
+            failures.append(description)
+
+    os.environ.update(STAND_IN_ENVIRONMENT)
+    # S3's smallest multipart part is 5 MB
+    storage_module.UPLOAD_MULTIPART_THRESHOLD_MB = storage_module.UPLOAD_CHUNK_SIZE_MB = 5
+
+    with mock_aws():
+        storage = storage_module.UthoStorage()
+        storage.s3_client.create_bucket(Bucket=storage.bucket_name)
+
+        # ---- upload_job_photos with one failing file ----
+        small = b"small photo" * 100
+        large = os.urandom(12 * MB)
+        results = storage.upload_job_photos(
+            [(io.BytesIO(small), "small.jpg"), (FailingFile(b"x" * 1024), "broken.jpg"), (io.BytesIO(large), "large.jpg")],
+            "photo-check-job", "before"
+        )
+        check("one result per file, in input order", [r["filename"] for r in results] == ["small.jpg", "broken.jpg", "large.jpg"])
+        check("only the failed file has no url", [r["url"] is not None for r in results] == [True, False, True])
+        stored = bucket_objects(storage)
+        check("the bucket holds exactly the uploaded files", sorted(stored) == sorted(
+            object_key(storage, r["url"]) for r in results if r["url"]
+        ))
+        check("the small file arrived whole", stored.get(object_key(storage, results[0]["url"])) == small)
+        check("the multipart file arrived whole", stored.get(object_key(storage, results[2]["url"])) == large)
+        clear_bucket(storage)
+
+        # ---- upload_before_photo losing the transition ----
+        path = os.path.join(tempfile.mkdtemp(), "photos.db")
+        engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+        with Session() as db:
+            db.add(job_models.Job(
+                id="photo-check-job", service_type="void", property_address="1 High Street",
+                preferred_date="2026-01-01", preferred_time="09:00", status="crew_arrived",
+                assigned_crew_id=StandInCrew.id
+            ))
+            db.commit()
+
+        def concurrent_change():
+            with engine.begin() as conn:
+                conn.execute(update(job_models.Job).where(job_models.Job.id == "photo-check-job").values(
+                    status="cancelled", version=job_models.Job.version + 1
+                ))
+
+        job_router.storage = storage
+        photos = [
+            StandInUpload(RacingFile(small, concurrent_change), "first.jpg"),
+            StandInUpload(io.BytesIO(small), "second.jpg"),
+        ]
+        db = Session()
+        try:
+            job_router.upload_before_photo("photo-check-job", photos=photos, crew=StandInCrew, db=db)
+            status = 200
+        except HTTPException as e:
+            status = e.status_code
+        finally:
+            db.close()
+        check("the upload loses the transition with 409", status == 409)
+        check("the uploaded photos are deleted again", bucket_objects(storage) == {})
+        with Session() as db:
+            check("no photo rows are kept", db.query(photo.JobPhoto).count() == 0)
+
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,216 @@
+"""
+Check that the admin list endpoints issue a constant number of queries
+
+Seeds a temporary SQLite database with N rows of every kind a list
+endpoint shows (jobs in each status with their clients, crew, photos
+and deposit payments), calls each endpoint and counts the statements it
+runs with a before_cursor_execute listener; then does the same with
+10 x N rows. A list endpoint that resolves its references with one query
+per table runs the same number of statements for both sizes; one that
+queries per row (N+1) runs more for the larger one.
+
+Reference data (service types, urgency levels) is served from the
+in-process cache, which is filled up front so it is not counted.
+
+Usage: python check_query_counts.py [N]
+Exits 1 if any endpoint's query count depends on the number of rows.
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+
+from fastapi import Response
+from sqlalchemy import DateTime, create_engine, event, text
+from sqlalchemy.dialects.sqlite.pysqlite import _SQLite_pysqliteTimeStamp
+from sqlalchemy.orm import Session
+
+from app.core.job_state import project_jobs
+from app.core.pagination import MAX_PAGE_SIZE
+from app.core.reference_data import REFERENCE_TABLES, reference_data
+from app.database.db import Base
+from app.models import analytics, client as client_models, crew as crew_models, invoice, job as job_models, job_dashboard, photo, sla
+from app.routers import admin
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+ADMIN_ID = "check-admin"
+
+# Statuses seeded N times each; the second value is whether the job has a crew
+JOB_STATUSES = (
+    ("job_created", False),
+    ("quote_sent", False),
+    ("quote_accepted", False),
+    ("deposit_paid", False),
+    ("crew_assigned", True),
+    ("work_completed", True),
+    ("job_completed", True),
+)
+
+# Not mapped here: owned by the client backend
+PAYMENTS_DDL = """
+    CREATE TABLE payments (
+        id VARCHAR PRIMARY KEY, job_id VARCHAR, payment_type VARCHAR, payment_status VARCHAR, paid_at DATETIME
+    )
+"""
+
+
+class CheckAdmin:
+    id = ADMIN_ID
+
+
+def paged(endpoint):
+    """Call a paginated endpoint for one page big enough to hold every row"""
+    def call(db):
+        return endpoint(Response(), limit=MAX_PAGE_SIZE, admin=CheckAdmin, db=db)
+    return call
+
+
+def unpaged(endpoint):
+    def call(db):
+        return endpoint(admin=CheckAdmin, db=db)
+    return call
+
+
+# Endpoint -> (call, rows it should return for N seeded rows per status)
+ENDPOINTS = {
+    "get_active_jobs_dashboard": (paged(admin.get_active_jobs_dashboard), 6),
+    "get_all_quotes": (paged(admin.get_all_quotes), 1),
+    "get_sent_quotes": (unpaged(admin.get_sent_quotes), 1),
+    "get_accepted_quotes": (paged(admin.get_accepted_quotes), 4),
+    "get_unassigned_jobs": (unpaged(admin.get_unassigned_jobs), 1),
+    "get_pending_crew": (paged(admin.get_pending_crew), 1),
+    "get_available_crew": (unpaged(admin.get_available_crew), 1),
+    "get_jobs_pending_verification": (unpaged(admin.get_jobs_pending_verification), 1),
+    "get_completed_payments": (paged(admin.get_completed_payments), 1),
+    "get_pending_payments": (paged(admin.get_pending_payments), 4),
+}
+
+
+def fill_reference_data():
+    reference_data._tables = {
+        "service_types": {"st-1": {"id": "st-1", "name": "Full clearance"}},
+        "urgency_levels": {"ul-1": {"id": "ul-1", "name": "Standard", "sla_hours": 48}},
+        "service_levels": {},
+    }
+    reference_data._expires_at = {name: float("inf") for name in REFERENCE_TABLES}
+
+
+def make_engine(directory: str, n: int):
+    # Hand DATETIME columns back as datetimes to raw SQL too, as Postgres does
+    sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+    sqlite3.register_converter("DATETIME", lambda value: datetime.fromisoformat(value.decode()))
+    engine = create_engine(
+        f"sqlite:///{os.path.join(directory, f'queries-{n}.db')}",
+        connect_args={"detect_types": sqlite3.PARSE_DECLTYPES}, native_datetime=True
+    )
+    engine.dialect.colspecs = {**engine.dialect.colspecs, DateTime: _SQLite_pysqliteTimeStamp}
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text(PAYMENTS_DDL))
+    return engine
+
+
+def seed(db, n: int):
+    now = datetime.utcnow()
+    admin_row = crew_models.Admin(id=ADMIN_ID, email="admin@example.com", full_name="Check Admin", password_hash="x")
+    db.add(admin_row)
+
+    jobs = []
+    for k in range(n):
+        db.add(crew_models.Crew(
+            id=f"pending-{k}", email=f"pending-{k}@example.com", full_name=f"Pending {k}",
+            password_hash="x", is_approved=False, status="available", created_at=now
+        ))
+        db.add(crew_models.Crew(
+            id=f"available-{k}", email=f"available-{k}@example.com", full_name=f"Available {k}",
+            password_hash="x", is_approved=True, status="available", created_at=now
+        ))
+        for status, with_crew in JOB_STATUSES:
+            client_id = uuid.uuid4()
+            db.add(client_models.Client(
+                id=client_id, email=f"{client_id}@example.com", password="x",
+                full_name=f"Client {k}", company_name=f"Company {k}"
+            ))
+            crew_id = None
+            if with_crew:
+                crew_id = f"{status}-crew-{k}"
+                db.add(crew_models.Crew(
+                    id=crew_id, email=f"{crew_id}@example.com", full_name=crew_id,
+                    password_hash="x", is_approved=True, status="assigned", created_at=now
+                ))
+            job = job_models.Job(
+                id=f"{status}-{k}", client_id=client_id, service_type="st-1", urgency_level="ul-1",
+                property_address="1 High Street", preferred_date="2026-01-01", preferred_time="09:00",
+                status=status, assigned_crew_id=crew_id, assigned_by=ADMIN_ID,
+                quote_amount=500.0, deposit_amount=100.0,
+                created_at=now - timedelta(minutes=k), updated_at=now - timedelta(minutes=k)
+            )
+            db.add(job)
+            jobs.append(job)
+            if status == "work_completed":
+                for kind in ("before", "after"):
+                    db.add(photo.JobPhoto(job_id=job.id, photo_url=f"https://example.com/{job.id}/{kind}.jpg", type=kind))
+    db.flush()
+
+    for job in jobs:
+        if job.status != "job_created":
+            db.execute(
+                text(
+                    "INSERT INTO payments (id, job_id, payment_type, payment_status, paid_at) "
+                    "VALUES (:id, :job_id, 'deposit', 'succeeded', :paid_at)"
+                ),
+                {"id": str(uuid.uuid4()), "job_id": job.id, "paid_at": now}
+            )
+    project_jobs(db, jobs)
+    db.commit()
+
+
+def count_queries(engine, n: int) -> dict:
+    """Endpoint name -> (statements run, rows returned)"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with Session(engine, autoflush=False) as db:
+        seed(db, n)
+
+    counts = {}
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        for name, (call, _) in ENDPOINTS.items():
+            with Session(engine, autoflush=False) as db:
+                statements.clear()
+                rows = call(db)
+                counts[name] = (len(statements), len(rows))
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return counts
+
+
+if __name__ == "__main__":
+    sizes = (N, 10 * N)
+    if 10 * N * max(rows for _, rows in ENDPOINTS.values()) > MAX_PAGE_SIZE:
+        sys.exit(f"N={N} is too large: the largest list would not fit on one page of {MAX_PAGE_SIZE}")
+
+    fill_reference_data()
+    directory = tempfile.mkdtemp()
+    results = {n: count_queries(make_engine(directory, n), n) for n in sizes}
+
+    failures = []
+    print(f"{'endpoint':<32} " + " ".join(f"{f'queries @ {n}':>14}" for n in sizes))
+    for name, (_, rows_per_n) in ENDPOINTS.items():
+        counts = [results[n][name] for n in sizes]
+        print(f"{name:<32} " + " ".join(f"{queries:>14}" for queries, _ in counts))
+        for n, (_, rows) in zip(sizes, counts):
+            if rows != rows_per_n * n:
+                failures.append(f"{name}: returned {rows} rows for {n}, expected {rows_per_n * n}")
+        if len({queries for queries, _ in counts}) > 1:
+            failures.append(f"{name}: {' vs '.join(str(queries) for queries, _ in counts)} queries")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,192 @@
+"""
+Check that every hot router query is answered from an index
+
+Seeds jobs, crew, photos and invoices inside a transaction, runs
+EXPLAIN (FORMAT JSON) on each query with sequential scans discouraged,
+and rolls everything back. A query whose plan still contains a Seq Scan
+has no usable index, which usually means a migration is missing.
+
+Needs a Postgres database migrated to head (alembic upgrade head).
+Uses DATABASE_URL, or CHECK_DATABASE_URL when set.
+
+Usage: python check_query_plans.py
+Exits 1 if any query plan contains a sequential scan.
+"""
+
+import json
+import os
+import sys
+from datetime import datetime
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+
+from app.database.db import DATABASE_URL
+from app.models.crew import Crew, Admin
+from app.models.job import Job
+from app.models.photo import JobPhoto
+from app.models.invoice import Invoice
+from app.models.job_dashboard import JobDashboard
+from app.core.job_state import CLOSED_STATUSES
+from app.core.invoice_pipeline import INVOICE_STATUSES
+from app.core.sla import sla_filter, due_escalations
+
+ACCEPTED_STATUSES = ("quote_accepted", "deposit_paid", "crew_assigned", "crew_arrived", "before_photo",
+                     "clearance_in_progress", "after_photo", "work_completed", "job_verified", "payment_pending")
+PAGE = 101
+
+SEED = [
+    """INSERT INTO crew (id, email, full_name, password_hash, phone_number, is_approved, status, reset_token, created_at)
+       SELECT 'plan-crew-' || n, 'plan-crew-' || n || '@example.com', 'Crew ' || n, 'x', '07' || lpad(n::text, 9, '0'),
+              n % 5 <> 0, (ARRAY['available', 'assigned', 'unavailable'])[n % 3 + 1],
+              CASE WHEN n % 50 = 0 THEN md5(n::text) END, now() - n * interval '1 hour'
+       FROM generate_series(1, 2000) AS n""",
+    """INSERT INTO admins (id, email, full_name, password_hash, phone_number, reset_token)
+       SELECT 'plan-admin-' || n, 'plan-admin-' || n || '@example.com', 'Admin ' || n, 'x', '07' || lpad(n::text, 9, '0'),
+              CASE WHEN n % 50 = 0 THEN md5(n::text) END
+       FROM generate_series(1, 500) AS n""",
+    """INSERT INTO jobs (id, service_type, property_address, preferred_date, preferred_time, status,
+                        assigned_crew_id, rating, sla_deadline, created_at, updated_at)
+       SELECT 'plan-job-' || n, 'void', n || ' High Street', '2026-01-01', '09:00',
+              (ARRAY['job_created', 'quote_sent', 'quote_accepted', 'deposit_paid', 'crew_assigned', 'crew_arrived',
+                     'before_photo', 'clearance_in_progress', 'after_photo', 'work_completed', 'job_verified',
+                     'payment_pending', 'job_completed', 'job_completed', 'job_completed', 'job_completed'])[n % 16 + 1],
+              CASE WHEN n % 16 >= 4 THEN 'plan-crew-' || (n % 2000 + 1) END,
+              CASE WHEN n % 16 >= 12 THEN n % 5 + 1 END,
+              now() - n * interval '1 minute' + interval '24 hours',
+              now() - n * interval '1 minute', now() - n * interval '30 seconds'
+       FROM generate_series(1, 50000) AS n""",
+    """INSERT INTO job_photos (id, job_id, photo_url, type)
+       SELECT 'plan-photo-' || n, 'plan-job-' || (n / 4 + 1), 'https://example.com/' || n,
+              CASE WHEN n % 2 = 0 THEN 'before' ELSE 'after' END
+       FROM generate_series(1, 80000) AS n""",
+    """INSERT INTO invoices (id, job_id, invoice_number, amount, generated_by, generated_at)
+       SELECT 'plan-invoice-' || n, 'plan-job-' || n, 'PLAN-' || n, 100, 'plan-admin-1', now() - n * interval '1 minute'
+       FROM generate_series(1, 20000) AS n""",
+]
+
+ANALYZE = ["ANALYZE crew", "ANALYZE admins", "ANALYZE jobs", "ANALYZE job_photos", "ANALYZE invoices", "ANALYZE sla_escalations"]
+
+
+def orm_queries(session: Session) -> dict:
+    """The router queries, built the same way the routers build them"""
+    jobs = session.query(Job)
+    return {
+        "admin quotes (job_created)":
+            jobs.filter(Job.status == "job_created").order_by(Job.created_at.desc(), Job.id.desc()).limit(PAGE),
+        "admin sent quotes":
+            jobs.filter(Job.status == "quote_sent").order_by(Job.created_at.desc()),
+        "admin accepted jobs":
+            jobs.filter(Job.status.in_(ACCEPTED_STATUSES)).order_by(Job.updated_at.desc(), Job.id.desc()).limit(PAGE),
+        "admin unassigned jobs":
+            jobs.filter(Job.status == "deposit_paid", Job.assigned_crew_id.is_(None)).order_by(Job.created_at.desc()),
+        "admin verification queue":
+            jobs.filter(Job.status == "work_completed").order_by(Job.updated_at.desc()),
+        "admin dashboard":
+            session.query(JobDashboard).filter(JobDashboard.status.notin_(CLOSED_STATUSES))
+            .order_by(JobDashboard.created_at.desc(), JobDashboard.job_id.desc()).limit(PAGE),
+        "crew jobs":
+            jobs.filter(Job.assigned_crew_id == "plan-crew-7").order_by(Job.created_at.desc()),
+        "crew ratings":
+            jobs.filter(Job.assigned_crew_id == "plan-crew-7", Job.status == "job_completed", Job.rating.isnot(None)),
+        "admin SLA at risk":
+            jobs.filter(sla_filter("at_risk")).order_by(Job.sla_deadline, Job.id).limit(PAGE),
+        "admin SLA breached":
+            jobs.filter(sla_filter("breached")).order_by(Job.sla_deadline, Job.id).limit(PAGE),
+        "crew SLA breached":
+            jobs.filter(Job.assigned_crew_id == "plan-crew-7", sla_filter("breached")).order_by(Job.created_at.desc()),
+        "SLA escalation scan":
+            due_escalations(session, datetime.utcnow()).limit(PAGE),
+        "pending crew":
+            session.query(Crew).filter(Crew.is_approved == False)
+            .order_by(Crew.created_at.desc(), Crew.id.desc()).limit(PAGE),
+        "available crew":
+            session.query(Crew).filter(Crew.is_approved == True, Crew.status == "available").order_by(Crew.full_name),
+        "crew by reset token":
+            session.query(Crew).filter(Crew.reset_token == "0123456789abcdef"),
+        "crew by phone number":
+            session.query(Crew).filter(Crew.phone_number == "07000000042"),
+        "admin by reset token":
+            session.query(Admin).filter(Admin.reset_token == "0123456789abcdef"),
+        "admin by phone number":
+            session.query(Admin).filter(Admin.phone_number == "07000000042"),
+        "job photos by type":
+            session.query(JobPhoto).filter(JobPhoto.job_id == "plan-job-7", JobPhoto.type == "before"),
+        "latest invoice":
+            session.query(Invoice).filter(Invoice.job_id == "plan-job-7").order_by(Invoice.generated_at.desc()).limit(1),
+        "invoice regeneration":
+            session.query(Job.id).filter(
+                Job.status.in_(INVOICE_STATUSES),
+                Job.updated_at >= text("now() - interval '1 day'")
+            ).order_by(Job.updated_at, Job.id),
+    }
+
+
+# Raw SQL payment queries from app/routers/admin.py (they join the client backend's clients table)
+PAYMENT_QUERIES = {
+    "completed payments": """
+        SELECT j.id, c.company_name FROM jobs j
+        LEFT JOIN clients c ON c.id = j.client_id
+        WHERE j.status = 'job_completed'
+        ORDER BY j.updated_at DESC, j.id DESC LIMIT 101""",
+    "pending payments": f"""
+        SELECT j.id, c.full_name FROM jobs j
+        LEFT JOIN clients c ON c.id = j.client_id
+        WHERE j.status IN ({", ".join(f"'{status}'" for status in ACCEPTED_STATUSES)})
+        ORDER BY j.created_at DESC, j.id DESC LIMIT 101""",
+}
+
+
+def seq_scans(plan: dict) -> list:
+    """Relations read by a Seq Scan anywhere in the plan tree"""
+    found = [plan.get("Relation Name")] if plan.get("Node Type") == "Seq Scan" else []
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+def main() -> int:
+    engine = create_engine(os.getenv("CHECK_DATABASE_URL", DATABASE_URL))
+    if engine.dialect.name != "postgresql":
+        print(f"check_query_plans needs Postgres, got {engine.dialect.name}")
+        return 2
+
+    failures = 0
+    with engine.connect() as conn:
+        has_clients = inspect(conn).has_table("clients")
+        transaction = conn.begin()
+        try:
+            for statement in SEED + ANALYZE:
+                conn.execute(text(statement))
+            # Any seq scan left in a plan is one the planner had no index alternative for
+            conn.execute(text("SET LOCAL enable_seqscan = off"))
+
+            session = Session(bind=conn)
+            queries = {
+                name: str(query.statement.compile(conn, compile_kwargs={"literal_binds": True}))
+                for name, query in orm_queries(session).items()
+            }
+            if has_clients:
+                queries.update(PAYMENT_QUERIES)
+            else:
+                print("- payments queries skipped (no clients table)")
+
+            for name, sql in queries.items():
+                plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                scanned = sorted(set(seq_scans(plan[0]["Plan"])))
+                if scanned:
+                    failures += 1
+                    print(f"✗ {name}: sequential scan on {', '.join(scanned)}")
+                else:
+                    print(f"✓ {name}")
+        finally:
+            transaction.rollback()
+
+    print(f"\n{len(queries) - failures}/{len(queries)} queries use an index")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Check read-replica routing with two local SQLite databases as stand-ins
+
+Creates a "primary" and a "replica" database holding the same crew
+member under different names, points the read session factory at them
+and checks that:
+  - reads from get_read_db come from the replica,
+  - writes made through a replica-routed session land on the primary,
+  - a client's reads go to the primary for REPLICA_STICKY_SECONDS after
+    it wrote, while other clients keep reading from the replica,
+  - every read falls back to the primary while the replica lags.
+
+Usage: python check_replica_routing.py
+Exits 1 if any check fails.
+"""
+
+import os
+import sys
+import tempfile
+
+from sqlalchemy import create_engine, text
+
+from app.database.db import Base, SessionLocal
+from app.database import replica
+from app.models import analytics, client, crew as crew_models, invoice, job, job_dashboard, photo, sla
+
+
+class StandInRequest:
+    def __init__(self, token: str):
+        self.headers = {"authorization": f"Bearer {token}"}
+
+
+def make_engine(directory: str, name: str):
+    engine = create_engine(f"sqlite:///{os.path.join(directory, name)}.db")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(crew_models.Crew.__table__.insert(), {
+            "id": "crew-1", "email": "crew-1@example.com", "full_name": name, "password_hash": "x",
+            "is_approved": True, "status": "available"
+        })
+    return engine
+
+
+def read_name(token: str) -> str:
+    sessions = replica.get_read_db(StandInRequest(token))
+    db = next(sessions)
+    try:
+        return db.get(crew_models.Crew, "crew-1").full_name
+    finally:
+        sessions.close()
+
+
+if __name__ == "__main__":
+    directory = tempfile.mkdtemp()
+    primary, replica_engine = make_engine(directory, "primary"), make_engine(directory, "replica")
+    SessionLocal.configure(bind=primary)
+    replica.ReplicaSessionLocal.configure(bind=primary, replica=replica_engine)
+    router = replica.ReplicaRouter(replica_engine, max_lag_seconds=5, sticky_seconds=10)
+    replica.replica_router = router
+
+    failures = []
+
+    def check(description: str, ok: bool):
+        print(f"{'ok  ' if ok else 'FAIL'} {description}")
+        if not ok:
+            failures.append(description)
+
+    check("reads go to the replica", read_name("alice") == "replica")
+
+    sessions = replica.get_read_db(StandInRequest("alice"))
+    db = next(sessions)
+    db.get(crew_models.Crew, "crew-1").status = "assigned"
+    db.commit()
+    sessions.close()
+    with primary.connect() as conn:
+        check("writes go to the primary", conn.execute(text("SELECT status FROM crew")).scalar() == "assigned")
+    with replica_engine.connect() as conn:
+        check("the replica is not written to", conn.execute(text("SELECT status FROM crew")).scalar() == "available")
+
+    router.record_write(replica.client_key(StandInRequest("alice")))
+    check("the writer reads from the primary", read_name("alice") == "primary")
+    check("other clients still read from the replica", read_name("bob") == "replica")
+
+    router.max_lag_seconds = -1
+    check("reads fall back to the primary while the replica lags", read_name("bob") == "primary")
+
+    print(router.stats())
+    sys.exit(1 if failures else 0)
@@ -1,19 +1,42 @@
 #test2
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import auth, job, crew, workflow, admin
-from app.database.db import init_db, engine
+from app.routers import auth, job, crew, workflow, admin, analytics
+from app.database.db import init_db, engine, replica_engine
+from app.database.pool_metrics import pool_metrics, replica_pool_metrics
+from app.database.replica import SAFE_METHODS, client_key, replica_router
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.mail_queue import mail_queue
+from app.core.invoice_pipeline import invoice_pipeline
+from app.core.job_state import projection_reconciler
+from app.core.analytics import rollup_refresher
+from app.core.sla import sla_monitor
+from app.core.job_events import job_events, job_events_listener
+from app.core.metrics import RequestStats, app_metrics, pool_lines, query_stats, route_label
 from app.models.crew import Crew, Admin
 from app.models.job import Job
 from app.models.photo import JobPhoto
 from app.models.invoice import Invoice
+from app.models.job_dashboard import JobDashboard, DashboardCounter
+from app.models.analytics import JobRollupFact, DailyRollup, CrewRollup
+from app.models.sla import SlaEscalation
 from app.models.client import Client
 from sqlalchemy import text
+from sqlalchemy.orm.exc import StaleDataError
 from dotenv import load_dotenv
+from anyio import to_thread
+import hmac
+import os
+import time
 
 load_dotenv()
 
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "40"))
+# When set, /metrics requires "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
 app = FastAPI(
     title="Crew & Admin Management API",
     version="1.0.0",
@@ -33,14 +56,49 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 
+@app.middleware("http")
+async def track_replica_writes(request: Request, call_next):
+    response = await call_next(request)
+    # The client's next reads stay on the primary until the replica has caught up (see app.database.replica)
+    if request.method not in SAFE_METHODS:
+        replica_router.record_write(client_key(request))
+    return response
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    stats = RequestStats()
+    token = query_stats.set(stats)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        query_stats.reset(token)
+        app_metrics.observe_request(
+            request.method, route_label(request), status, time.perf_counter() - started, stats
+        )
+
+app_metrics.attach(engine)
+if replica_engine is not None:
+    app_metrics.attach(replica_engine)
+
+@app.exception_handler(StaleDataError)
+def stale_data_handler(request: Request, exc: StaleDataError):
+    # A job's version changed between reading and writing it (see app.core.job_state)
+    return JSONResponse(status_code=409, content={"detail": "Job was changed by another request. Reload it and try again."})
+
 app.include_router(auth.router, prefix="/api/auth")
 app.include_router(job.router, prefix="/api")
 app.include_router(crew.router, prefix="/api")
 app.include_router(workflow.router, prefix="/api")
 app.include_router(admin.router, prefix="/api")
+app.include_router(analytics.router, prefix="/api")
 
 @app.on_event("startup")
 def startup():
@@ -51,6 +109,44 @@ def startup():
         print("✓ table crated (using existing tables)")
     except Exception as e:
         print(f"✗ Database connection failed: {e}")
+    
+    mail_queue.start()
+    print("✓ Mail queue worker started")
+    
+    projection_reconciler.start()
+    print("✓ Dashboard projection reconciler started")
+    
+    rollup_refresher.start()
+    print("✓ Analytics rollup refresher started")
+    
+    if job_events.backend == "postgres":
+        job_events_listener.start()
+        print("✓ Job events listening on Postgres NOTIFY")
+
+@app.on_event("startup")
+async def configure_threadpool():
+    # Route handlers are sync (DB, S3 and SMTP clients all block), so Starlette
+    # runs them on this pool instead of the event loop
+    to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    print(f"✓ Request thread pool size: {THREADPOOL_SIZE}")
+
+@app.on_event("startup")
+async def start_sla_monitor():
+    # A task on this loop, so it needs an async handler
+    sla_monitor.start()
+    print("✓ SLA escalation monitor started")
+
+@app.on_event("shutdown")
+def shutdown():
+    mail_queue.stop()
+    projection_reconciler.stop()
+    rollup_refresher.stop()
+    job_events_listener.stop()
+    invoice_pipeline.shutdown()
+
+@app.on_event("shutdown")
+async def stop_sla_monitor():
+    await sla_monitor.stop()
 
 @app.get("/")
 def root():
@@ -70,6 +166,19 @@ def health_check():
         "api_type": "Crew & Admin Management"
     }
 
+@app.get("/metrics", include_in_schema=False)
+def metrics(request: Request):
+    """Prometheus text exposition of request, query and connection pool metrics"""
+    if METRICS_TOKEN and not hmac.compare_digest(
+        request.headers.get("authorization", ""), f"Bearer {METRICS_TOKEN}"
+    ):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    pools = {"primary": pool_metrics}
+    if replica_engine is not None:
+        pools["replica"] = replica_pool_metrics
+    lines = app_metrics.render() + pool_lines(pools)
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
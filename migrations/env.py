@@ -0,0 +1,49 @@
+from logging.config import fileConfig
+from alembic import context
+from app.database.db import Base, engine, DATABASE_URL
+# Register every model on Base.metadata
+from app.models import analytics, client, crew, invoice, job, job_dashboard, photo, sla  # noqa: F401
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+# Tables owned by the client backend; this service reads them but never migrates them
+CLIENT_BACKEND_TABLES = {"clients", "service_types", "urgency_levels", "service_levels", "payments"}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == "table" and name in CLIENT_BACKEND_TABLES:
+        return False
+    return True
+
+
+def run_migrations_offline():
+    context.configure(
+        url=DATABASE_URL,
+        target_metadata=target_metadata,
+        include_object=include_object,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
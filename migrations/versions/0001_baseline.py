@@ -0,0 +1,196 @@
+"""Baseline schema for the tables this service owns
+
+Replaces create_tables.py and the hand-run SQL scripts. Existing
+databases were built by those scripts, so every table is only created
+when missing, and columns the scripts added later (admins.phone_number,
+crew.address, invoices.content_hash, ...) are only added when missing;
+running this against a live database is a no-op apart from the gaps.
+
+The clients table and the reference tables belong to the client backend
+and are not managed here.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _admins():
+    return [
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("email", sa.String(), nullable=False, unique=True),
+        sa.Column("full_name", sa.String(), nullable=False),
+        sa.Column("password_hash", sa.String(), nullable=False),
+        sa.Column("organization_name", sa.String(), nullable=True),
+        sa.Column("phone_number", sa.String(), nullable=True),
+        sa.Column("contact_person", sa.String(), nullable=True),
+        sa.Column("department", sa.String(), nullable=True),
+        sa.Column("business_address", sa.String(), nullable=True),
+        sa.Column("reset_otp", sa.String(), nullable=True),
+        sa.Column("reset_otp_expiry", sa.DateTime(), nullable=True),
+        sa.Column("reset_token", sa.String(), nullable=True),
+        sa.Column("reset_token_expiry", sa.DateTime(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now()),
+    ]
+
+
+def _crew():
+    return [
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("email", sa.String(), nullable=False, unique=True),
+        sa.Column("full_name", sa.String(), nullable=False),
+        sa.Column("password_hash", sa.String(), nullable=False),
+        sa.Column("phone_number", sa.String(), nullable=True),
+        sa.Column("address", sa.String(), nullable=True),
+        sa.Column("drivers_license", sa.String(), nullable=True),
+        sa.Column("dbs_certificate", sa.String(), nullable=True),
+        sa.Column("proof_of_address", sa.String(), nullable=True),
+        sa.Column("insurance_certificate", sa.String(), nullable=True),
+        sa.Column("right_to_work", sa.String(), nullable=True),
+        sa.Column("is_approved", sa.Boolean(), server_default=sa.false()),
+        sa.Column("status", sa.String(), server_default="available"),
+        sa.Column("reset_otp", sa.String(), nullable=True),
+        sa.Column("reset_otp_expiry", sa.DateTime(), nullable=True),
+        sa.Column("reset_token", sa.String(), nullable=True),
+        sa.Column("reset_token_expiry", sa.DateTime(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now()),
+    ]
+
+
+def _jobs():
+    return [
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("client_id", sa.String(), nullable=True),
+        sa.Column("service_type", sa.String(), nullable=False),
+        sa.Column("property_address", sa.Text(), nullable=False),
+        sa.Column("preferred_date", sa.String(), nullable=False),
+        sa.Column("preferred_time", sa.String(), nullable=False),
+        sa.Column("property_photos", sa.Text(), nullable=True),
+        sa.Column("quote_amount", sa.Float(), nullable=True),
+        sa.Column("deposit_amount", sa.Float(), nullable=True),
+        sa.Column("remaining_amount", sa.Float(), nullable=True),
+        sa.Column("quote_notes", sa.Text(), nullable=True),
+        sa.Column("decline_reason", sa.Text(), nullable=True),
+        sa.Column("additional_information", sa.Text(), nullable=True),
+        sa.Column("urgency_level", sa.String(), nullable=True),
+        sa.Column("property_size", sa.String(), nullable=True),
+        sa.Column("van_loads", sa.Integer(), nullable=True),
+        sa.Column("furniture_items", sa.Integer(), nullable=True),
+        sa.Column("waste_types", sa.Text(), nullable=True),
+        sa.Column("status", sa.String(), server_default="job_created"),
+        sa.Column("assigned_crew_id", sa.String(), nullable=True),
+        sa.Column("assigned_by", sa.String(), nullable=True),
+        sa.Column("rating", sa.Float(), nullable=True),
+        sa.Column("latitude", sa.Float(), nullable=True),
+        sa.Column("longitude", sa.Float(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now()),
+    ]
+
+
+def _job_photos():
+    return [
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("job_id", sa.String(), nullable=False),
+        sa.Column("photo_url", sa.String(), nullable=False),
+        sa.Column("type", sa.String(), nullable=False),
+        sa.Column("timestamp", sa.DateTime(), server_default=sa.func.now()),
+    ]
+
+
+def _invoices():
+    return [
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("job_id", sa.String(), nullable=False),
+        sa.Column("client_id", sa.Uuid(), nullable=True),
+        sa.Column("invoice_number", sa.String(), nullable=False, unique=True),
+        sa.Column("pdf_path", sa.String(), nullable=True),
+        sa.Column("amount", sa.Numeric(10, 2), nullable=False),
+        sa.Column("status", sa.String(), server_default="generated"),
+        sa.Column("generated_by", sa.String(), nullable=False),
+        sa.Column("generated_at", sa.DateTime(), server_default=sa.func.now()),
+        sa.Column("content_hash", sa.String(), nullable=True),
+    ]
+
+
+def _job_dashboard():
+    return [
+        sa.Column("job_id", sa.String(), primary_key=True),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("status_label", sa.String(), nullable=False),
+        sa.Column("action", sa.String(), nullable=False),
+        sa.Column("client_name", sa.String(), nullable=False),
+        sa.Column("crew_name", sa.String(), nullable=False),
+        sa.Column("property_address", sa.Text(), nullable=True),
+        sa.Column("assigned_crew_id", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("job_updated_at", sa.DateTime(), nullable=True),
+        sa.Column("projected_at", sa.DateTime(), server_default=sa.func.now()),
+    ]
+
+
+def _dashboard_counters():
+    return [
+        sa.Column("bucket", sa.String(), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now()),
+    ]
+
+
+TABLES = {
+    "admins": _admins,
+    "crew": _crew,
+    "jobs": _jobs,
+    "job_photos": _job_photos,
+    "invoices": _invoices,
+    "job_dashboard": _job_dashboard,
+    "dashboard_counters": _dashboard_counters,
+}
+
+# Indexes the old create_all_tables.sql created, kept so every database starts from the same point
+LEGACY_INDEXES = [
+    ("idx_jobs_client_id", "jobs", ["client_id"]),
+    ("idx_jobs_status", "jobs", ["status"]),
+    ("idx_jobs_assigned_crew", "jobs", ["assigned_crew_id"]),
+    ("idx_invoices_job_id", "invoices", ["job_id"]),
+    ("idx_invoices_client_id", "invoices", ["client_id"]),
+    ("idx_job_photos_job_id", "job_photos", ["job_id"]),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    for name, columns in TABLES.items():
+        if not inspector.has_table(name):
+            op.create_table(name, *columns())
+            continue
+        existing = {column["name"] for column in inspector.get_columns(name)}
+        for column in columns():
+            if column.name not in existing:
+                # Only ever nullable columns were added after the fact
+                op.add_column(name, column)
+
+    for name, table, columns in LEGACY_INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+    op.create_index(
+        "idx_job_dashboard_open", "job_dashboard",
+        [sa.text("created_at DESC"), sa.text("job_id DESC")],
+        postgresql_where=sa.text("status NOT IN ('job_completed', 'cancelled')"),
+        if_not_exists=True
+    )
+
+
+def downgrade():
+    # No-op: the baseline reflects tables that existed before Alembic, so they are never dropped
+    pass
@@ -0,0 +1,77 @@
+"""Composite and partial indexes matched to the router queries
+
+Each index below serves a specific query (noted alongside it) so the
+filter and the ORDER BY are both answered from the index. The single
+column indexes they make redundant are dropped.
+
+Indexes are built CONCURRENTLY so writes to jobs and crew are not
+blocked while they build; that cannot run inside a transaction, hence
+the autocommit block.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# (name, table, columns, partial index predicate)
+INDEXES = [
+    # Quote queue, sent quotes, pending payments: status = ? ORDER BY created_at DESC, id DESC
+    ("ix_jobs_status_created_at", "jobs", ["status", "created_at DESC", "id DESC"], None),
+    # Accepted jobs, verification queue, completed payments, invoice regeneration:
+    # status = ? ORDER BY updated_at DESC, id DESC
+    ("ix_jobs_status_updated_at", "jobs", ["status", "updated_at DESC", "id DESC"], None),
+    # Crew job list and ratings, crew job counts: assigned_crew_id = ? ORDER BY created_at DESC
+    ("ix_jobs_assigned_crew_created_at", "jobs", ["assigned_crew_id", "created_at DESC"], None),
+    # Jobs ready to assign
+    ("ix_jobs_unassigned_deposit_paid", "jobs", ["created_at DESC"],
+     "status = 'deposit_paid' AND assigned_crew_id IS NULL"),
+    # Available crew: is_approved = ? AND status = ? ORDER BY full_name
+    ("ix_crew_approved_status_name", "crew", ["is_approved", "status", "full_name"], None),
+    # Pending crew approvals: is_approved = false ORDER BY created_at DESC, id DESC
+    ("ix_crew_pending_created_at", "crew", ["created_at DESC", "id DESC"], "is_approved = false"),
+    # Password reset and OTP lookups
+    ("ix_crew_reset_token", "crew", ["reset_token"], "reset_token IS NOT NULL"),
+    ("ix_crew_phone_number", "crew", ["phone_number"], "phone_number IS NOT NULL"),
+    ("ix_admins_reset_token", "admins", ["reset_token"], "reset_token IS NOT NULL"),
+    ("ix_admins_phone_number", "admins", ["phone_number"], "phone_number IS NOT NULL"),
+    # Before/after photos of a job
+    ("ix_job_photos_job_id_type", "job_photos", ["job_id", "type"], None),
+    # Latest invoice of a job
+    ("ix_invoices_job_id_generated_at", "invoices", ["job_id", "generated_at DESC"], None),
+]
+
+# Single column indexes covered by the leading column of a composite index above
+SUPERSEDED = [
+    ("idx_jobs_status", "jobs", ["status"]),
+    ("idx_jobs_assigned_crew", "jobs", ["assigned_crew_id"]),
+    ("idx_invoices_job_id", "invoices", ["job_id"]),
+    ("idx_job_photos_job_id", "job_photos", ["job_id"]),
+]
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name, table, [sa.text(column) for column in columns],
+                postgresql_where=sa.text(where) if where else None,
+                postgresql_concurrently=True,
+                if_not_exists=True
+            )
+        for name, table, _ in SUPERSEDED:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in SUPERSEDED:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+        for name, table, _, _ in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,73 @@
+"""Type jobs.client_id as uuid and add foreign keys to clients and jobs
+
+jobs.client_id was a varchar holding the client's uuid, so every join
+to clients.id needed a ::uuid cast on the jobs side and could not use
+the clients primary key for the join. Values that are not uuids could
+never have matched a client and become NULL.
+
+Foreign keys are added NOT VALID, which only checks new rows and does
+not scan the table, then validated when no existing row breaks them.
+If older rows do reference missing clients or jobs, the constraint is
+left NOT VALID and a message says how many rows to clean up first.
+
+The type change rewrites jobs and its indexes (idx_jobs_client_id
+included) under an exclusive lock, so run this off-peak.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+UUID_PATTERN = "^[0-9a-fA-F]{8}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{12}$"
+
+# (constraint, table, column, referenced table, ON DELETE)
+FOREIGN_KEYS = [
+    ("fk_jobs_client_id", "jobs", "client_id", "clients", "SET NULL"),
+    ("fk_invoices_client_id", "invoices", "client_id", "clients", "SET NULL"),
+    ("fk_invoices_job_id", "invoices", "job_id", "jobs", None),
+]
+
+
+def _add_foreign_key(bind, name, table, column, referenced, ondelete):
+    op.create_foreign_key(
+        name, table, referenced, [column], ["id"],
+        ondelete=ondelete, postgresql_not_valid=True
+    )
+    orphans = bind.execute(sa.text(
+        f"SELECT count(*) FROM {table} t WHERE t.{column} IS NOT NULL "
+        f"AND NOT EXISTS (SELECT 1 FROM {referenced} r WHERE r.id = t.{column})"
+    )).scalar()
+    if orphans:
+        print(f"{name} left NOT VALID: {orphans} {table} rows reference a missing {referenced} row")
+    else:
+        op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}")
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    op.alter_column(
+        "jobs", "client_id",
+        type_=sa.Uuid(),
+        postgresql_using=f"CASE WHEN client_id ~ '{UUID_PATTERN}' THEN client_id::uuid END"
+    )
+
+    # The clients table belongs to the client backend and may not exist on a fresh database
+    has_clients = sa.inspect(bind).has_table("clients")
+    for name, table, column, referenced, ondelete in FOREIGN_KEYS:
+        if referenced == "clients" and not has_clients:
+            continue
+        _add_foreign_key(bind, name, table, column, referenced, ondelete)
+
+
+def downgrade():
+    for name, table, _, _, _ in FOREIGN_KEYS:
+        op.execute(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {name}")
+    op.alter_column("jobs", "client_id", type_=sa.String(), postgresql_using="client_id::text")
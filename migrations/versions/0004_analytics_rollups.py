@@ -0,0 +1,62 @@
+"""Analytics rollup tables
+
+job_rollup_facts holds each job's current contribution; analytics_daily
+and analytics_crew hold the sums the reports read. All three are filled
+by the rollup refresher (app.core.analytics) on its first run.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "job_rollup_facts",
+        sa.Column("job_id", sa.String(), primary_key=True),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("service_type", sa.String(), nullable=True),
+        sa.Column("crew_id", sa.String(), nullable=True),
+        sa.Column("deposit_day", sa.Date(), nullable=True),
+        sa.Column("completed_day", sa.Date(), nullable=True),
+        sa.Column("revenue", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("deposit_collected", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("remaining_collected", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("rating", sa.Float(), nullable=True),
+        sa.Column("work_done_at", sa.DateTime(), nullable=True),
+        sa.Column("sla_met", sa.Boolean(), nullable=True),
+        sa.Column("job_updated_at", sa.DateTime(), nullable=True),
+    )
+    op.create_table(
+        "analytics_daily",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("service_type", sa.String(), primary_key=True),
+        sa.Column("jobs_completed", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("revenue", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("deposits_collected", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("remaining_collected", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("sla_met", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("sla_breached", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now()),
+    )
+    op.create_table(
+        "analytics_crew",
+        sa.Column("crew_id", sa.String(), primary_key=True),
+        sa.Column("jobs_completed", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("rating_sum", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("rating_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now()),
+    )
+
+
+def downgrade():
+    op.drop_table("analytics_crew")
+    op.drop_table("analytics_daily")
+    op.drop_table("job_rollup_facts")
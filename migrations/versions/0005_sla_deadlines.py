@@ -0,0 +1,45 @@
+"""Precomputed SLA deadlines on jobs
+
+jobs.sla_deadline is set from the urgency level's sla_hours when a quote
+is sent, and for every other job by the dashboard reconciler in batches
+(app.core.sla.backfill_deadlines), so this migration does not rewrite
+the table. jobs.work_completed_at records when the SLA clock stopped.
+
+The partial index serves the at risk / breached queries: only jobs whose
+clock is still running are indexed, and its predicate must stay in step
+with app.core.sla.SLA_STOPPED_STATUSES.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+OPEN_SLA_PREDICATE = (
+    "status NOT IN ('work_completed', 'job_verified', 'payment_pending', 'job_completed', 'cancelled')"
+)
+
+
+def upgrade():
+    op.add_column("jobs", sa.Column("sla_deadline", sa.DateTime(), nullable=True))
+    op.add_column("jobs", sa.Column("work_completed_at", sa.DateTime(), nullable=True))
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_jobs_open_sla_deadline", "jobs", ["sla_deadline"],
+            postgresql_where=sa.text(OPEN_SLA_PREDICATE),
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_jobs_open_sla_deadline", table_name="jobs", postgresql_concurrently=True, if_exists=True)
+    op.drop_column("jobs", "work_completed_at")
+    op.drop_column("jobs", "sla_deadline")
@@ -0,0 +1,38 @@
+"""SLA escalations
+
+One row per job and SLA level ("at_risk", "breached") notified by the
+escalation monitor (app.core.sla). The unique constraint keeps a level
+from being escalated twice and serves the monitor's anti-join.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "sla_escalations",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("job_id", sa.String(), sa.ForeignKey("jobs.id", name="fk_sla_escalations_job_id", ondelete="CASCADE"),
+                  nullable=False),
+        sa.Column("level", sa.String(), nullable=False),
+        sa.Column("sla_deadline", sa.DateTime(), nullable=False),
+        sa.Column("escalated_at", sa.DateTime(), server_default=sa.func.now()),
+        sa.UniqueConstraint("job_id", "level", name="uq_sla_escalations_job_level"),
+    )
+    op.create_index(
+        "ix_sla_escalations_escalated_at", "sla_escalations", [sa.text("escalated_at DESC"), sa.text("id DESC")]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_sla_escalations_escalated_at", table_name="sla_escalations")
+    op.drop_table("sla_escalations")
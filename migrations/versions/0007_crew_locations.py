@@ -0,0 +1,40 @@
+"""Crew home and last-assigned locations
+
+Positions for the crew recommender (app.core.crew_recommender). The
+last location is set on each assignment from then on; existing crew
+take it from the most recent job with coordinates they were assigned.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+COLUMNS = ("home_latitude", "home_longitude", "last_latitude", "last_longitude")
+
+
+def upgrade():
+    for name in COLUMNS:
+        op.add_column("crew", sa.Column(name, sa.Float(), nullable=True))
+    op.execute("""
+        UPDATE crew c
+        SET last_latitude = j.latitude, last_longitude = j.longitude
+        FROM (
+            SELECT DISTINCT ON (assigned_crew_id) assigned_crew_id, latitude, longitude
+            FROM jobs
+            WHERE assigned_crew_id IS NOT NULL AND latitude IS NOT NULL AND longitude IS NOT NULL
+            ORDER BY assigned_crew_id, created_at DESC
+        ) j
+        WHERE j.assigned_crew_id = c.id
+    """)
+
+
+def downgrade():
+    for name in reversed(COLUMNS):
+        op.drop_column("crew", name)
@@ -0,0 +1,27 @@
+"""Row version on jobs
+
+jobs.version is bumped by every update this service makes to a job, and
+each of those updates is conditional on the version it read
+(compare-and-set), so concurrent requests cannot overwrite each other:
+the loser gets 409. Adding a column with a constant default does not
+rewrite the table.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("jobs", sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+
+
+def downgrade():
+    op.drop_column("jobs", "version")